@@ -1,2 +1,4 @@
 from .min_cut import min_cut, cross_bd
 from .min_cut2 import min_cut as min_cut2
+from .max_min import max_min_fair
+from .multilevel import CutReport, compare_cuts, multilevel_cut
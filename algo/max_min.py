@@ -0,0 +1,45 @@
+import numpy as np
+
+EPS = 1e-9
+
+
+def max_min_fair(
+    incidence: np.ndarray, capacity: np.ndarray, demand: np.ndarray
+) -> np.ndarray:
+    """progressive filling: all unfrozen flows grow at the same pace, a flow is
+    frozen when it reaches its demand or one of its links is saturated.
+
+    arguments:
+    incidence -- L x F, 1 if flow f crosses link l
+    capacity -- L, link capacity
+    demand -- F, flow demand (np.inf for elastic flows)
+
+    return: F, max-min fair rates
+    """
+    incidence = np.asarray(incidence, dtype=np.float64)
+    capacity = np.asarray(capacity, dtype=np.float64)
+    remaining = capacity.copy()
+    demand = np.asarray(demand, dtype=np.float64)
+    n_link, n_flow = incidence.shape
+    assert remaining.shape == (n_link,) and demand.shape == (n_flow,)
+
+    rate = np.zeros(n_flow)
+    active = demand > EPS
+    # NOTE a flow over a zero-capacity link gets nothing
+    active &= ~(incidence[remaining <= EPS] > 0).any(axis=0)
+    while active.any():
+        n_active = incidence[:, active].sum(axis=1)
+        used = n_active > 0
+        delta = np.min(demand[active] - rate[active])
+        if used.any():
+            delta = min(delta, np.min(remaining[used] / n_active[used]))
+        if not np.isfinite(delta):
+            raise ValueError("unbounded elastic flow without links")
+        rate[active] += delta
+        remaining -= n_active * delta
+        saturated = used & (remaining <= EPS * np.maximum(capacity, 1))
+        frozen = rate >= demand - EPS
+        if saturated.any():
+            frozen |= (incidence[saturated] > 0).any(axis=0)
+        active &= ~frozen
+    return rate
@@ -2,7 +2,6 @@ import typing
 from collections import defaultdict, namedtuple
 from typing import NamedTuple
 
-import IPython
 from graph import ExecutionGraph
 from utils import gen_uuid
 
@@ -1,8 +1,7 @@
 import typing
-from collections import defaultdict, namedtuple
+from collections import defaultdict
 from typing import NamedTuple
 
-import IPython
 from graph import ExecutionGraph
 from utils import gen_uuid
 
@@ -14,6 +13,11 @@ class FlowGraphNode(NamedTuple):
     in_edges: typing.List[int]
 
 
+class QueueItem(NamedTuple):
+    node: str
+    edges: typing.List[int]
+
+
 class FlowGraphEdge:
     from_node: str
     to_node: str
@@ -40,7 +44,6 @@ class FlowGraph:
         self.edges = edges
 
     def shortest_path(self, s: str, t: str) -> typing.List[int]:
-        QueueItem = namedtuple("QueueItem", ["node", "edges"])
         queue: typing.List[QueueItem] = []
         queue.append(QueueItem(s, []))
         visited: typing.Dict[str, bool] = defaultdict(bool)
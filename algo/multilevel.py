@@ -0,0 +1,282 @@
+import random
+import time
+import typing
+
+import networkx as nx
+from graph import ExecutionGraph
+
+from .min_cut import cross_bd
+from .min_cut2 import min_cut as min_cut2
+
+S_SIDE = 1
+T_SIDE = -1
+
+
+class CoarseLevel(typing.NamedTuple):
+    g: nx.DiGraph
+    parent: typing.Dict[str, str]  # NOTE vertex of the finer level -> this level
+
+
+class CutReport(typing.NamedTuple):
+    uuid: str
+    vertices: int
+    min_cut_flow: int
+    min_cut_time: float  # in seconds
+    multilevel_flow: int
+    multilevel_time: float
+
+
+def flow_graph(g: ExecutionGraph) -> nx.DiGraph:
+    """the s-t problem of min_cut2: in vertices are pinned to S, sinks and the
+    out vertex of least upstream bd to T, other out vertices pay their
+    downstream bd if left in S. node weight counts the vertices"""
+    fg = nx.DiGraph()
+    out_vertices = sorted(g.get_out_vertices(), key=lambda v: v.upstream_bd)
+    pinned_t = set([v.uuid for v in out_vertices[:1]])
+    pinned_t |= set([v.uuid for v in out_vertices if v.type == "sink"])
+    for v in g.get_vertices():
+        fg.add_node(v.uuid, weight=1, pin=0, sink_cap=0)
+    for v in out_vertices:
+        if v.uuid not in pinned_t:
+            fg.nodes[v.uuid]["sink_cap"] = v.downstream_bd
+        else:
+            fg.nodes[v.uuid]["pin"] = T_SIDE
+    # NOTE in vertices win, as in min_cut2 the source side is the one reachable
+    for v in g.get_in_vertices():
+        fg.nodes[v.uuid]["pin"] = S_SIDE
+    for u, v, d in g.get_edges():
+        fg.add_edge(u, v, bd=int(d["unit_size"] * d["per_second"]))
+    return fg
+
+
+def heavy_edge_matching(
+    fg: nx.DiGraph, max_weight: int, rng: random.Random
+) -> typing.Dict[str, str]:
+    """match every vertex with the unmatched neighbor of heaviest bd (both
+    directions), never exceeding max_weight. pinned vertices stay alone, as a
+    cluster grown around a pin would force all its vertices onto that side"""
+    matched: typing.Dict[str, str] = {}
+    order = list(fg.nodes())
+    rng.shuffle(order)
+    for u in order:
+        if u in matched:
+            continue
+        weights: typing.Dict[str, int] = {}
+        for _, v, d in fg.out_edges(u, data=True):
+            weights[v] = weights.get(v, 0) + d["bd"]
+        for v, _, d in fg.in_edges(u, data=True):
+            weights[v] = weights.get(v, 0) + d["bd"]
+        best, best_bd = None, -1
+        for v, bd in weights.items():
+            if v in matched or v == u:
+                continue
+            if fg.nodes[u]["pin"] != 0 or fg.nodes[v]["pin"] != 0:
+                continue
+            if fg.nodes[u]["weight"] + fg.nodes[v]["weight"] > max_weight:
+                continue
+            if bd > best_bd:
+                best, best_bd = v, bd
+        matched[u] = u
+        if best is not None:
+            matched[best] = u
+    return matched
+
+
+def contract(fg: nx.DiGraph, parent: typing.Dict[str, str]) -> nx.DiGraph:
+    coarse = nx.DiGraph()
+    for vid, data in fg.nodes(data=True):
+        p = parent[vid]
+        if p not in coarse:
+            coarse.add_node(p, weight=0, pin=0, sink_cap=0)
+        node = coarse.nodes[p]
+        node["weight"] += data["weight"]
+        node["sink_cap"] += data["sink_cap"]
+        if data["pin"] != 0:
+            node["pin"] = data["pin"]
+    for u, v, d in fg.edges(data=True):
+        pu, pv = parent[u], parent[v]
+        if pu == pv:
+            continue
+        if coarse.has_edge(pu, pv):
+            coarse.edges[pu, pv]["bd"] += d["bd"]
+        else:
+            coarse.add_edge(pu, pv, bd=d["bd"])
+    return coarse
+
+
+def coarsen(
+    fg: nx.DiGraph, coarsest: int, rng: random.Random
+) -> typing.List[CoarseLevel]:
+    """levels from the finest (identity) to the coarsest, stop at coarsest
+    vertices or when matching no longer shrinks the graph by 10%"""
+    levels = [CoarseLevel(fg, {vid: vid for vid in fg.nodes()})]
+    max_weight = max(int(1.5 * fg.number_of_nodes() / coarsest), 2)
+    while levels[-1].g.number_of_nodes() > coarsest:
+        current = levels[-1].g
+        parent = heavy_edge_matching(current, max_weight, rng)
+        coarse = contract(current, parent)
+        if coarse.number_of_nodes() > 0.9 * current.number_of_nodes():
+            break
+        levels.append(CoarseLevel(coarse, parent))
+    return levels
+
+
+def initial_cut(fg: nx.DiGraph) -> typing.Dict[str, int]:
+    """exact s-t min cut of the coarsest graph"""
+    flow = nx.DiGraph()
+    flow.add_nodes_from(fg.nodes())
+    for u, v, d in fg.edges(data=True):
+        flow.add_edge(u, v, capacity=d["bd"])
+    s, t = ("s",), ("t",)
+    for vid, data in fg.nodes(data=True):
+        # NOTE edges without capacity are infinite in networkx
+        if data["pin"] == S_SIDE:
+            flow.add_edge(s, vid)
+        elif data["pin"] == T_SIDE:
+            flow.add_edge(vid, t)
+        elif data["sink_cap"] > 0:
+            flow.add_edge(vid, t, capacity=data["sink_cap"])
+    flow.add_nodes_from([s, t])
+    _, (s_side, _) = nx.minimum_cut(flow, s, t)
+    return {vid: S_SIDE if vid in s_side else T_SIDE for vid in fg.nodes()}
+
+
+def cut_bd(fg: nx.DiGraph, side: typing.Dict[str, int]) -> int:
+    bd = sum([d["bd"] for u, v, d in fg.edges(data=True) if side[u] > side[v]])
+    return bd + sum([d["sink_cap"] for vid, d in fg.nodes(data=True) if side[vid] > 0])
+
+
+def move_delta(fg: nx.DiGraph, side: typing.Dict[str, int], vid: str) -> int:
+    """change of the cut bd if vid switched side"""
+    # NOTE bd crossing the cut because of vid while it is in S
+    in_s = fg.nodes[vid]["sink_cap"]
+    in_s += sum([d["bd"] for _, v, d in fg.out_edges(vid, data=True) if side[v] < 0])
+    # NOTE ... and while it is in T
+    in_t = sum([d["bd"] for u, _, d in fg.in_edges(vid, data=True) if side[u] > 0])
+    return in_t - in_s if side[vid] == S_SIDE else in_s - in_t
+
+
+def refine(
+    fg: nx.DiGraph, side: typing.Dict[str, int], max_passes: int = 8
+) -> typing.Dict[str, int]:
+    """greedy boundary moves of unpinned vertices while the cut bd drops,
+    moving to T on ties as the edge side is the scarce one"""
+    for _ in range(max_passes):
+        moved = False
+        for vid in fg.nodes():
+            if fg.nodes[vid]["pin"] != 0:
+                continue
+            delta = move_delta(fg, side, vid)
+            if delta < 0 or (delta == 0 and side[vid] == S_SIDE):
+                side[vid] = -side[vid]
+                moved = True
+        if not moved:
+            break
+    return side
+
+
+def band_refine(
+    fg: nx.DiGraph, side: typing.Dict[str, int], depth: int = 3
+) -> typing.Dict[str, int]:
+    """flow-based refinement: unpinned vertices within depth hops of the cut
+    are cut exactly, the rest is merged into s & t by its side, so the cut
+    never gets worse than the projected one"""
+    band = set()
+    frontier = set()
+    for u, v in fg.edges():
+        if side[u] != side[v]:
+            frontier |= set([u, v])
+    for vid, data in fg.nodes(data=True):
+        if data["sink_cap"] > 0 and side[vid] == S_SIDE:
+            frontier.add(vid)
+    for _ in range(depth + 1):
+        frontier = set([vid for vid in frontier if fg.nodes[vid]["pin"] == 0])
+        band |= frontier
+        frontier = set(
+            [n for vid in frontier for n in nx.all_neighbors(fg, vid)]
+        ) - band
+    if len(band) == 0:
+        return side
+
+    s, t = ("s",), ("t",)
+
+    def terminal(vid):
+        if vid in band:
+            return vid
+        return s if side[vid] == S_SIDE else t
+
+    flow = nx.DiGraph()
+    flow.add_nodes_from([s, t])
+    flow.add_nodes_from(band)
+    for u, v, d in fg.edges(data=True):
+        tu, tv = terminal(u), terminal(v)
+        # NOTE edges into S or out of T never cross the cut from S to T
+        if tu == tv or tu == t or tv == s:
+            continue
+        if flow.has_edge(tu, tv):
+            flow.edges[tu, tv]["capacity"] += d["bd"]
+        else:
+            flow.add_edge(tu, tv, capacity=d["bd"])
+    for vid in band:
+        if fg.nodes[vid]["sink_cap"] > 0:
+            if flow.has_edge(vid, t):
+                flow.edges[vid, t]["capacity"] += fg.nodes[vid]["sink_cap"]
+            else:
+                flow.add_edge(vid, t, capacity=fg.nodes[vid]["sink_cap"])
+    _, (s_side, _) = nx.minimum_cut(flow, s, t)
+    for vid in band:
+        side[vid] = S_SIDE if vid in s_side else T_SIDE
+    return side
+
+
+def multilevel_cut(
+    g: ExecutionGraph, coarsest: int = 64, seed: int = 0, max_rounds: int = 4
+) -> typing.Tuple[typing.Set[str], typing.Set[str]]:
+    """drop-in for min_cut2 on large graphs: coarsen by heavy-edge matching,
+    cut the coarsest graph exactly, then at each finer level re-cut a band
+    around the projected cut (as long as the band moves the cut down, at most
+    max_rounds) and move single vertices greedily"""
+    rng = random.Random(seed)
+    levels = coarsen(flow_graph(g), coarsest, rng)
+    side = initial_cut(levels[-1].g)
+    for finer, level in zip(reversed(levels[:-1]), reversed(levels[1:])):
+        side = {vid: side[level.parent[vid]] for vid in finer.g.nodes()}
+        bd = cut_bd(finer.g, side)
+        for _ in range(max_rounds):
+            side = band_refine(finer.g, side)
+            refined_bd = cut_bd(finer.g, side)
+            if refined_bd >= bd:
+                break
+            bd = refined_bd
+        side = refine(finer.g, side)
+    s_cut = set([vid for vid, s in side.items() if s == S_SIDE])
+    return s_cut, set(side.keys()) - s_cut
+
+
+def compare_cuts(
+    graph_list: typing.List[ExecutionGraph], baseline_limit: int = None, **kwargs
+) -> typing.List[CutReport]:
+    """cut bd and runtime of multilevel_cut against min_cut2, the latter only
+    on graphs of at most baseline_limit vertices (-1 in the report otherwise)"""
+    reports = []
+    for g in graph_list:
+        min_cut_flow, min_cut_time = -1, -1.0
+        if baseline_limit is None or g.number_of_vertices() <= baseline_limit:
+            start = time.perf_counter()
+            s_cut, t_cut = min_cut2(g)
+            min_cut_time = time.perf_counter() - start
+            min_cut_flow = cross_bd(g, s_cut, t_cut)
+        start = time.perf_counter()
+        s_cut, t_cut = multilevel_cut(g, **kwargs)
+        multilevel_time = time.perf_counter() - start
+        reports.append(
+            CutReport(
+                g.uuid,
+                g.number_of_vertices(),
+                min_cut_flow,
+                min_cut_time,
+                cross_bd(g, s_cut, t_cut),
+                multilevel_time,
+            )
+        )
+    return reports
@@ -0,0 +1,31 @@
+import numpy as np
+
+from .max_min import max_min_fair
+
+
+def test_progressive_filling():
+    # NOTE f0 crosses l0 & l1, f1 only l0, f2 only l1
+    incidence = np.array([[1, 1, 0], [1, 0, 1]])
+    rates = max_min_fair(incidence, np.array([1, 2]), np.array([np.inf] * 3))
+    assert np.allclose(rates, [0.5, 0.5, 1.5])
+
+    # NOTE demand-limited flow leaves its share to the others
+    rates = max_min_fair(incidence, np.array([1, 2]), np.array([np.inf, 0.2, np.inf]))
+    assert np.allclose(rates, [0.8, 0.2, 1.2])
+
+    rates = max_min_fair(incidence, np.array([0, 2]), np.array([1, 1, 5]))
+    assert np.allclose(rates, [0, 0, 2])
+
+
+def test_capacity_respected():
+    rng = np.random.default_rng(0)
+    incidence = (rng.random((20, 100)) < 0.1).astype(float)
+    capacity = rng.integers(1, 100, 20).astype(float)
+    demand = rng.integers(1, 50, 100).astype(float)
+    rates = max_min_fair(incidence, capacity, demand)
+    assert np.all(rates <= demand + 1e-6)
+    assert np.all(incidence @ rates <= capacity + 1e-6)
+    # NOTE every flow is either satisfied or crosses a saturated link
+    saturated = incidence @ rates >= capacity - 1e-6
+    for f in range(100):
+        assert rates[f] >= demand[f] - 1e-6 or (incidence[saturated, f] > 0).any()
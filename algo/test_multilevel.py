@@ -0,0 +1,59 @@
+import random
+
+from graph import ExecutionGraph, Vertex
+
+from .min_cut import cross_bd
+from .multilevel import compare_cuts, flow_graph, initial_cut, multilevel_cut
+
+
+def layered_dag(name: str, n_rank: int, width: int, rng: random.Random):
+    """a source, n_rank - 2 ranks of up to width operators, sinks in the last"""
+    g = ExecutionGraph(name)
+    ranks = [[Vertex.from_spec(name + "-v0", "source", {"host": "h"}, 0, 0, 1, 0)]]
+    for r in range(1, n_rank):
+        vtype = "sink" if r == n_rank - 1 else "operator"
+        ranks.append(
+            [
+                Vertex.from_spec(
+                    "{}-v{}-{}".format(name, r, i), vtype, {}, 0, 0, 1, 0
+                )
+                for i in range(rng.randint(1, width))
+            ]
+        )
+    for v in sum(ranks, []):
+        g.add_vertex(v)
+    for up, rank in zip(ranks[:-1], ranks[1:]):
+        for v in rank:
+            for u in rng.sample(up, min(len(up), rng.randint(1, 2))):
+                g.connect(u, v, rng.randint(100, 10000), rng.randint(1, 10))
+        for u in up:
+            if g.g.out_degree(u.uuid) == 0:
+                g.connect(u, rank[0], rng.randint(100, 10000), rng.randint(1, 10))
+    return g
+
+
+def test_multilevel_matches_min_cut():
+    rng = random.Random(0)
+    graphs = [layered_dag("g" + str(i), 12, 6, rng) for i in range(10)]
+    # NOTE graphs below the coarsest size are cut exactly
+    for report in compare_cuts(graphs):
+        assert report.multilevel_flow == report.min_cut_flow
+    for g in graphs:
+        s_cut, t_cut = multilevel_cut(g, coarsest=8)
+        assert s_cut | t_cut == set(g.g.nodes()) and len(s_cut & t_cut) == 0
+        assert all([v.uuid in s_cut for v in g.get_sources()])
+        assert all([v.uuid in t_cut for v in g.get_sinks()])
+    reports = compare_cuts(graphs, coarsest=8)
+    assert sum([r.multilevel_flow for r in reports]) <= 1.1 * sum(
+        [r.min_cut_flow for r in reports]
+    )
+
+
+def test_multilevel_on_large_dag():
+    # NOTE min_cut2 takes minutes here, compare with an exact cut of networkx
+    g = layered_dag("g", 60, 20, random.Random(1))
+    side = initial_cut(flow_graph(g))
+    s_cut = set([vid for vid, s in side.items() if s > 0])
+    exact = cross_bd(g, s_cut, set(side.keys()) - s_cut)
+    s_cut, t_cut = multilevel_cut(g)
+    assert cross_bd(g, s_cut, t_cut) <= 1.1 * exact
@@ -0,0 +1,11 @@
+from .suite import (
+    SIZES,
+    BenchCase,
+    Regression,
+    Timing,
+    compare,
+    gen_cases,
+    load_timings,
+    run_suite,
+    save_timings,
+)
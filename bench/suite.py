@@ -0,0 +1,325 @@
+import json
+import os
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+import typing
+
+import numpy as np
+import yaml
+from algo import min_cut2
+from graph import GraphGenerator, SourceSelector
+from schedule import (
+    SCHEDULERS,
+    FlowScheduler,
+    LatencyCalculator,
+    RandomScheduler,
+    get_scheduler,
+)
+from schedule.flow_provisioner import TopologicalProvisioner
+from schedule.flow_scheduler import gen_cut_options
+from schedule.parallel import ParallelFlowScheduler
+from topo import Scenario
+from utils import grouped_exactly_one_full_binpack, grouped_exactly_one_nonfull_binpack
+from vivaldi import create_coordinate_class, vivaldi_compute
+
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../samples")
+
+# NOTE every case scales along its axes one at a time, the others at the first
+SIZES = {
+    "quick": {"graphs": [2], "ranks": [4], "hosts": [3]},
+    "default": {"graphs": [4, 8, 16], "ranks": [5, 7, 9], "hosts": [3, 12, 40]},
+}
+
+# NOTE prepare builds fresh inputs (untimed) and returns the call to time
+Prepare = typing.Callable[[], typing.Callable[[], typing.Any]]
+
+
+class BenchCase(typing.NamedTuple):
+    name: str
+    params: typing.Dict[str, int]
+    prepare: Prepare
+
+    @property
+    def key(self) -> str:
+        params = sorted(self.params.items())
+        params = ",".join(["{}={}".format(k, v) for k, v in params])
+        return "{}[{}]".format(self.name, params)
+
+
+class Timing(typing.NamedTuple):
+    key: str
+    name: str
+    params: typing.Dict[str, int]
+    repeat: int
+    best: float  # in seconds
+    median: float
+    peak_memory: int  # in bytes, traced python allocations
+
+
+class Regression(typing.NamedTuple):
+    key: str
+    metric: str  # median / peak_memory
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline > 0 else float("inf")
+
+
+def gen_scenario(n_host: int) -> Scenario:
+    """1e3h with n_host rasp hosts in the edge domain"""
+    with open(os.path.join(SAMPLES, "1e3h.yaml"), "r") as f:
+        data = yaml.load(f.read(), Loader=yaml.Loader)
+    for d in data["domains"]:
+        if d["type"] == "edge":
+            d["hrgs"][0]["replica"] = n_host
+    return Scenario.from_dict(data)
+
+
+def gen_graphs(sc: Scenario, n_graph: int, n_rank: int, seed: int = 0):
+    """seeded dag graphs of n_rank ranks, sources spread over the edge hosts"""
+    hosts = [h for d in sc.get_edge_domains() for h in d.topo.get_hosts()]
+    selector = SourceSelector({h.uuid: h.slots for h in hosts})
+    sinks = [h.uuid for d in sc.get_cloud_domains() for h in d.topo.get_hosts()]
+    return [
+        GraphGenerator(
+            "g" + str(i),
+            seed=seed * 1000 + i,
+            total_rank=n_rank,
+            max_node_per_rank=3,
+            max_predecessors=2,
+            mi_cb=lambda: 1,
+            memory_cb=lambda: int(2e8),
+            unit_size_cb=lambda r: random.randint(20000, 50000) / (2 ** (r - 1)),
+            unit_rate_cb=lambda: random.randint(10, 20),
+            source_hosts=selector,
+            sink_hosts=sinks,
+        ).gen_dag_graph()
+        for i in range(n_graph)
+    ]
+
+
+def gen_groups(n_group: int, seed: int = 0):
+    """(volume, value) groups of the cut options knapsack, every total volume
+    up to 8 per group is reachable"""
+    rng = random.Random(seed)
+    return [
+        [(volume, rng.randint(0, int(1e6))) for volume in range(9)]
+        for _ in range(n_group)
+    ]
+
+
+def axis_params(
+    sizes: typing.Dict[str, typing.List[int]], axes: typing.List[str]
+) -> typing.List[typing.Dict[str, int]]:
+    base = {axis: sizes[axis][0] for axis in axes}
+    params = [base]
+    for axis in axes:
+        for value in sizes[axis][1:]:
+            params.append(dict(base, **{axis: value}))
+    return params
+
+
+def scheduler_case(name: str, factory, p: typing.Dict[str, int]) -> BenchCase:
+    def prepare():
+        sc = gen_scenario(p["hosts"])
+        graph_list = gen_graphs(sc, p["graphs"], p["ranks"])
+        random.seed(0)
+        np.random.seed(0)
+        scheduler = factory(sc)
+        return lambda: scheduler.schedule_multiple(graph_list)
+
+    return BenchCase("schedule_multiple." + name, p, prepare)
+
+
+def parallel_flow(sc: Scenario) -> ParallelFlowScheduler:
+    """workers forked untimed, the pool lives as long as the scheduler"""
+    scheduler = ParallelFlowScheduler(sc)
+    scheduler.start_pool()
+    return scheduler
+
+
+class ScenarioRandomScheduler(RandomScheduler):
+    """RandomScheduler on the whole scenario, with the signature of others"""
+
+    def schedule_multiple(self, graph_list):
+        return super().schedule_multiple(graph_list, self.scenario.topo)
+
+
+def provisioner_case(p: typing.Dict[str, int]) -> BenchCase:
+    """s-sides of the min cuts on the edge domain"""
+    cuts = {}
+
+    def prepare():
+        sc = gen_scenario(p["hosts"])
+        graph_list = gen_graphs(sc, p["graphs"], p["ranks"])
+        if len(cuts) == 0:
+            for g in graph_list:
+                cuts[g.uuid] = min_cut2(g)[0]
+        s_graph_list = [g.sub_graph(cuts[g.uuid], g.uuid) for g in graph_list]
+        provisioner = TopologicalProvisioner(sc.get_edge_domains()[0])
+        return lambda: provisioner.schedule_multiple(s_graph_list)
+
+    return BenchCase("TopologicalProvisioner.schedule_multiple", p, prepare)
+
+
+def latency_case(p: typing.Dict[str, int]) -> BenchCase:
+    def prepare():
+        sc = gen_scenario(p["hosts"])
+        graph_list = gen_graphs(sc, p["graphs"], p["ranks"])
+        random.seed(0)
+        result_list = FlowScheduler(sc).schedule_multiple(graph_list)
+        calculator = LatencyCalculator(sc.topo)
+        for g, result in zip(graph_list, result_list):
+            if result is not None and result.check_complete(g):
+                calculator.add_scheduled_graph(g, result)
+        return calculator.compute_latency
+
+    return BenchCase("LatencyCalculator.compute_latency", p, prepare)
+
+
+def vivaldi_case(p: typing.Dict[str, int]) -> BenchCase:
+    def prepare():
+        sc = gen_scenario(p["hosts"])
+        random.seed(0)
+        np.random.seed(0)
+        Coord = create_coordinate_class(3)
+        coords = {n.uuid: Coord.random_unit_vector() for n in sc.topo.get_hosts()}
+        return lambda: vivaldi_compute(sc.topo, coords, 0.1, 200)
+
+    return BenchCase("vivaldi_compute", p, prepare)
+
+
+def gen_cases(size: str = "default") -> typing.List[BenchCase]:
+    sizes = SIZES[size]
+    cases = []
+
+    def graph_case(name, func, p):
+        g = gen_graphs(gen_scenario(3), 1, p["ranks"])[0]
+        return BenchCase(name, p, lambda: lambda: func(g))
+
+    for p in axis_params(sizes, ["ranks"]):
+        cases.append(graph_case("min_cut2", min_cut2, p))
+        cases.append(graph_case("gen_cut_options", gen_cut_options, p))
+
+    for p in axis_params(sizes, ["graphs", "hosts"]):
+        # NOTE 8 slots a host, the full one needs a reachable capacity
+        groups = gen_groups(p["graphs"])
+        n_slot = 8 * p["hosts"]
+        cases.append(
+            BenchCase(
+                "grouped_exactly_one_nonfull_binpack",
+                p,
+                lambda n_slot=n_slot, groups=groups: lambda: (
+                    grouped_exactly_one_nonfull_binpack(n_slot, groups)
+                ),
+            )
+        )
+        n_slot = min(n_slot, 8 * p["graphs"])
+        cases.append(
+            BenchCase(
+                "grouped_exactly_one_full_binpack",
+                p,
+                lambda n_slot=n_slot, groups=groups: lambda: (
+                    grouped_exactly_one_full_binpack(n_slot, groups)
+                ),
+            )
+        )
+
+    for p in axis_params(sizes, ["graphs", "ranks", "hosts"]):
+        cases.append(provisioner_case(p))
+        cases.append(latency_case(p))
+        for name in SCHEDULERS.keys():
+            cases.append(scheduler_case(name, get_scheduler(name), p))
+        cases.append(scheduler_case("parallel_flow", parallel_flow, p))
+        cases.append(scheduler_case("random", ScenarioRandomScheduler, p))
+
+    for p in axis_params(sizes, ["hosts"]):
+        cases.append(vivaldi_case(p))
+    return cases
+
+
+def run_case(case: BenchCase, repeat: int = 5) -> Timing:
+    """time repeat runs on fresh inputs, then trace the peak memory of one more
+    run apart, as tracing slows down allocation"""
+    durations = []
+    for _ in range(repeat):
+        func = case.prepare()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    func = case.prepare()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Timing(
+        case.key,
+        case.name,
+        case.params,
+        repeat,
+        min(durations),
+        statistics.median(durations),
+        peak,
+    )
+
+
+def run_suite(
+    cases: typing.List[BenchCase],
+    repeat: int = 5,
+    callback: typing.Callable[[Timing], None] = None,
+) -> typing.List[Timing]:
+    timings = []
+    for case in cases:
+        timings.append(run_case(case, repeat))
+        if callback is not None:
+            callback(timings[-1])
+    return timings
+
+
+def save_timings(timings: typing.List[Timing], path: str) -> None:
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "timings": [t._asdict() for t in timings],
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_timings(path: str) -> typing.List[Timing]:
+    with open(path, "r") as f:
+        return [Timing(**t) for t in json.load(f)["timings"]]
+
+
+def compare(
+    timings: typing.List[Timing],
+    baseline: typing.List[Timing],
+    time_threshold: float = 0.25,
+    memory_threshold: float = 0.25,
+    min_time: float = 1e-3,
+) -> typing.List[Regression]:
+    """cases slower (by median) or heavier than the baseline beyond the
+    thresholds, relative. cases under min_time seconds in both are noise"""
+    baseline_map = {t.key: t for t in baseline}
+    regressions = []
+    for t in timings:
+        base = baseline_map.get(t.key)
+        if base is None:
+            continue
+        if max(t.median, base.median) >= min_time and t.median > base.median * (
+            1 + time_threshold
+        ):
+            regressions.append(Regression(t.key, "median", base.median, t.median))
+        if t.peak_memory > base.peak_memory * (1 + memory_threshold):
+            regressions.append(
+                Regression(t.key, "peak_memory", base.peak_memory, t.peak_memory)
+            )
+    return regressions
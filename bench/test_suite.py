@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+from .suite import compare, gen_cases, load_timings, run_suite, save_timings
+
+
+def test_quick_suite():
+    cases = gen_cases("quick")
+    names = set([c.name for c in cases])
+    for name in [
+        "min_cut2",
+        "gen_cut_options",
+        "grouped_exactly_one_nonfull_binpack",
+        "grouped_exactly_one_full_binpack",
+        "TopologicalProvisioner.schedule_multiple",
+        "LatencyCalculator.compute_latency",
+        "vivaldi_compute",
+        "schedule_multiple.flow",
+        "schedule_multiple.random",
+    ]:
+        assert name in names
+    assert len(set([c.key for c in cases])) == len(cases)
+
+    timings = run_suite([c for c in cases if c.name != "schedule_multiple.sbon"], 1)
+    assert all([t.median > 0 and t.peak_memory > 0 for t in timings])
+    with tempfile.TemporaryDirectory() as path:
+        save_timings(timings, os.path.join(path, "bench.json"))
+        baseline = load_timings(os.path.join(path, "bench.json"))
+    assert baseline == timings
+    assert compare(timings, baseline) == []
+
+    slower = [t._replace(median=t.median * 2 + 1) for t in timings]
+    regressions = compare(slower, baseline)
+    assert len(regressions) == len(timings)
+    assert all([r.metric == "median" and r.ratio > 1.25 for r in regressions])
+    heavier = [t._replace(peak_memory=t.peak_memory * 2) for t in timings[:1]]
+    assert compare(heavier, baseline)[0].metric == "peak_memory"
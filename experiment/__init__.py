@@ -0,0 +1,2 @@
+from .store import ResultStore
+from .sweep import SCHEDULERS, Cell, SweepSpec, run_cell, run_sweep
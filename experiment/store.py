@@ -0,0 +1,81 @@
+import csv
+import os
+import typing
+
+import numpy as np
+
+RESULTS_FILE = "results.csv"
+CELLS_FILE = "cells.log"
+
+
+class ResultStore:
+    """rows of completed cells in a csv file, one column per field. a cell is
+    logged as completed only after all its rows are flushed, so rows of a cell
+    interrupted halfway are dropped when the store is reopened"""
+
+    fields: typing.List[str]
+    completed: typing.Set[str]
+
+    def __init__(self, path: str, fields: typing.List[str]) -> None:
+        assert "cell" in fields
+        self.path = path
+        self.fields = list(fields)
+        self.completed = set()
+        os.makedirs(path, exist_ok=True)
+        self.results_path = os.path.join(path, RESULTS_FILE)
+        self.cells_path = os.path.join(path, CELLS_FILE)
+        if os.path.exists(self.cells_path):
+            with open(self.cells_path, "r") as f:
+                self.completed = set([line.strip() for line in f if line.strip()])
+        self.recover()
+
+    def recover(self) -> None:
+        """rewrite the csv with the rows of completed cells only"""
+        rows = []
+        if os.path.exists(self.results_path):
+            with open(self.results_path, "r", newline="") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is not None and header != self.fields:
+                    raise RuntimeError(
+                        "fields of {} differ from the sweep".format(self.results_path)
+                    )
+                cell_idx = self.fields.index("cell")
+                for row in reader:
+                    if len(row) == len(self.fields) and row[cell_idx] in self.completed:
+                        rows.append(row)
+        with open(self.results_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.fields)
+            writer.writerows(rows)
+
+    def append(self, cell: str, rows: typing.List[typing.Dict[str, typing.Any]]):
+        with open(self.results_path, "a", newline="") as f:
+            writer = csv.writer(f)
+            for row in rows:
+                writer.writerow([row.get(field, "") for field in self.fields])
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.cells_path, "a") as f:
+            f.write(cell + "\n")
+        self.completed.add(cell)
+
+    def columns(self) -> typing.Dict[str, np.ndarray]:
+        """every field as an array, float if all its values parse, str otherwise"""
+        with open(self.results_path, "r", newline="") as f:
+            reader = csv.reader(f)
+            next(reader)
+            rows = list(reader)
+        columns = {}
+        for i, field in enumerate(self.fields):
+            values = [row[i] for row in rows]
+            try:
+                columns[field] = np.array(
+                    [float(v) if v != "" else np.nan for v in values], dtype=np.float64
+                )
+            except ValueError:
+                columns[field] = np.array(values, dtype=str)
+        return columns
+
+    def save_npz(self, path: str) -> None:
+        np.savez_compressed(path, **self.columns())
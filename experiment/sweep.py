@@ -0,0 +1,261 @@
+import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import random
+import time
+import typing
+import zlib
+
+import numpy as np
+import yaml
+from graph import ExecutionGraph, GraphGenerator
+from schedule import (
+    SCHEDULERS,
+    LatencyCalculator,
+    SchedulingResultStatus,
+    get_scheduler,
+)
+from topo import Scenario
+
+from .store import ResultStore
+
+# NOTE the workload of scripts/exp/main.py, a [lo, hi] pair is drawn uniformly
+DEFAULT_GENERATOR = {
+    "graphs": 8,
+    "total_rank": 7,
+    "max_node_per_rank": 2,
+    "max_predecessors": 2,
+    "mi": 1,
+    "memory": int(2e8),
+    "unit_size": [20000, 50000],
+    "unit_size_decay": 2,
+    "unit_rate": [10, 20],
+}
+
+FIELDS = [
+    "cell",
+    "scheduler",
+    "scenario",
+    "seed",
+    "graph",
+    "vertices",
+    "status",
+    "latency",
+    "back_pressure",
+    "cross_domain_bd",
+    "schedule_time",
+]
+
+
+class Cell(typing.NamedTuple):
+    scheduler: str
+    scenario: str
+    params: typing.Tuple[typing.Tuple[str, typing.Any], ...]
+    seed: int
+
+    @property
+    def key(self) -> str:
+        """stable across machines, scenarios are told apart by file name"""
+        params = ",".join(["{}={}".format(k, v) for k, v in self.params])
+        return "{}|{}|{}|{}".format(
+            self.scheduler, os.path.basename(self.scenario), params, self.seed
+        )
+
+    @property
+    def workload_seed(self) -> int:
+        """same graphs for every scheduler of a scenario, params & seed"""
+        return zlib.crc32(self.key.split("|", 1)[1].encode())
+
+
+class SweepSpec(typing.NamedTuple):
+    name: str
+    schedulers: typing.List[str]
+    scenarios: typing.List[str]  # NOTE yaml paths, relative to the spec file
+    generator: typing.Dict[str, typing.List[typing.Any]]
+    seeds: typing.List[int]
+    processes: typing.Optional[int]
+
+    def cells(self) -> typing.List[Cell]:
+        keys = list(self.generator.keys())
+        cells = []
+        for scheduler, scenario, values, seed in itertools.product(
+            self.schedulers,
+            self.scenarios,
+            itertools.product(*[self.generator[k] for k in keys]),
+            self.seeds,
+        ):
+            cells.append(Cell(scheduler, scenario, tuple(zip(keys, values)), seed))
+        return cells
+
+    def fields(self) -> typing.List[str]:
+        return FIELDS + ["gen_" + k for k in self.generator.keys()]
+
+    @classmethod
+    def from_dict(cls, data, base_dir: str = "."):
+        """every generator key takes the list of values to sweep, a scalar is a
+        single value, so ranges must be nested: unit_size: [[20000, 50000]]"""
+        for name in data["schedulers"]:
+            assert name in SCHEDULERS, "unknown scheduler " + name
+        generator = {k: [v] for k, v in DEFAULT_GENERATOR.items()}
+        for k, v in data.get("generator", {}).items():
+            assert k in DEFAULT_GENERATOR, "unknown generator parameter " + k
+            generator[k] = v if isinstance(v, list) else [v]
+        return cls(
+            data.get("name", "sweep"),
+            list(data["schedulers"]),
+            [os.path.normpath(os.path.join(base_dir, p)) for p in data["scenarios"]],
+            generator,
+            [int(s) for s in data.get("seeds", [0])],
+            data.get("processes"),
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "r") as f:
+            data = yaml.load(f.read(), Loader=yaml.Loader)
+        return cls.from_dict(data, os.path.dirname(os.path.abspath(path)))
+
+
+class HostSampler:
+    """source hosts drawn uniformly, without the slot quotas of SourceSelector"""
+
+    def __init__(self, hosts: typing.List[str]) -> None:
+        self.hosts = hosts
+
+    def select(self) -> str:
+        return random.choice(self.hosts)
+
+
+def draw(value) -> typing.Union[int, float]:
+    if isinstance(value, (list, tuple)):
+        lo, hi = value
+        if isinstance(lo, int) and isinstance(hi, int):
+            return random.randint(lo, hi)
+        return random.uniform(lo, hi)
+    return value
+
+
+def gen_workload(cell: Cell, sc: Scenario) -> typing.List[ExecutionGraph]:
+    params = dict(cell.params)
+    sources = HostSampler(
+        [h.uuid for d in sc.get_edge_domains() for h in d.topo.get_hosts()]
+    )
+    sinks = [h.uuid for d in sc.get_cloud_domains() for h in d.topo.get_hosts()]
+    graph_list = []
+    for idx in range(params["graphs"]):
+        generator = GraphGenerator(
+            "g" + str(idx),
+            total_rank=draw(params["total_rank"]),
+            max_node_per_rank=draw(params["max_node_per_rank"]),
+            max_predecessors=draw(params["max_predecessors"]),
+            mi_cb=lambda: draw(params["mi"]),
+            memory_cb=lambda: int(draw(params["memory"])),
+            unit_size_cb=lambda r: draw(params["unit_size"])
+            / math.pow(params["unit_size_decay"], r - 1),
+            unit_rate_cb=lambda: draw(params["unit_rate"]),
+            source_hosts=sources,
+            sink_hosts=sinks,
+        )
+        # NOTE GraphGenerator reseeds on creation
+        random.seed(cell.workload_seed + idx)
+        graph_list.append(generator.gen_dag_graph())
+    return graph_list
+
+
+# NOTE pickled scenarios of a process, each cell unpickles a fresh copy
+_scenario_cache: typing.Dict[str, bytes] = {}
+
+
+def load_scenario(path: str) -> Scenario:
+    if path not in _scenario_cache:
+        with open(path, "r") as f:
+            sc = Scenario.from_dict(yaml.load(f.read(), Loader=yaml.Loader))
+        _scenario_cache[path] = pickle.dumps(sc)
+    return pickle.loads(_scenario_cache[path])
+
+
+def run_cell(cell: Cell) -> typing.Tuple[str, typing.List[typing.Dict]]:
+    """schedule the workload of the cell, one row per graph"""
+    sc = load_scenario(cell.scenario)
+    graph_list = gen_workload(cell, sc)
+    random.seed(cell.seed)
+    np.random.seed(cell.seed)
+    scheduler = get_scheduler(cell.scheduler)(sc)
+    start = time.perf_counter()
+    result_list = scheduler.schedule_multiple(graph_list)
+    schedule_time = time.perf_counter() - start
+
+    calculator = LatencyCalculator(sc.topo)
+    domain_of = {n.uuid: d.name for d in sc.domains for n in d.topo.get_nodes()}
+    cross_domain_bd = {}
+    for g, result in zip(graph_list, result_list):
+        if result is None or result.status == SchedulingResultStatus.FAILED:
+            continue
+        if not result.check_complete(g):
+            continue
+        calculator.add_scheduled_graph(g, result)
+        cross_domain_bd[g.uuid] = sum(
+            [
+                d["unit_size"] * d["per_second"]
+                for u, v, d in g.get_edges()
+                if domain_of[result.get_scheduled_node(u)]
+                != domain_of[result.get_scheduled_node(v)]
+            ]
+        )
+    latency, back_pressure = calculator.compute_latency()
+
+    rows = []
+    for g, result in zip(graph_list, result_list):
+        row = {
+            "cell": cell.key,
+            "scheduler": cell.scheduler,
+            "scenario": os.path.basename(cell.scenario),
+            "seed": cell.seed,
+            "graph": g.uuid,
+            "vertices": g.number_of_vertices(),
+            "status": "failed" if g.uuid not in latency else "succeed",
+            "latency": latency.get(g.uuid, ""),
+            "back_pressure": back_pressure.get(g.uuid, ""),
+            "cross_domain_bd": cross_domain_bd.get(g.uuid, ""),
+            "schedule_time": schedule_time,
+        }
+        for k, v in cell.params:
+            row["gen_" + k] = v
+        rows.append(row)
+    return cell.key, rows
+
+
+def run_sweep(
+    spec: SweepSpec,
+    path: str,
+    processes: int = None,
+    callback: typing.Callable[[str, int, int], None] = None,
+) -> ResultStore:
+    """run the cells of spec not yet in the store at path, in a process pool
+    unless processes is 1. callback(cell key, done, total) after every cell"""
+    store = ResultStore(path, spec.fields())
+    pending = [c for c in spec.cells() if c.key not in store.completed]
+    total, done = len(pending), 0
+    if processes is None:
+        processes = spec.processes
+    if processes == 1:
+        outputs = map(run_cell, pending)
+        pool = None
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+        # NOTE fresh workers keep cells from leaking module state into each other
+        pool = ctx.Pool(processes, maxtasksperchild=16)
+        outputs = pool.imap_unordered(run_cell, pending)
+    try:
+        for key, rows in outputs:
+            store.append(key, rows)
+            done += 1
+            if callback is not None:
+                callback(key, done, total)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return store
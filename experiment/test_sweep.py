@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+import numpy as np
+
+from .store import ResultStore
+from .sweep import SweepSpec, run_cell, run_sweep
+
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../samples")
+
+
+def small_spec() -> SweepSpec:
+    return SweepSpec.from_dict(
+        {
+            "schedulers": ["flow", "all_cloud"],
+            "scenarios": ["1e3h.yaml"],
+            "generator": {"graphs": 3, "total_rank": [4, 5]},
+            "seeds": [0, 1],
+        },
+        SAMPLES,
+    )
+
+
+def test_sweep_resumes():
+    spec = small_spec()
+    cells = spec.cells()
+    assert len(cells) == 8
+    with tempfile.TemporaryDirectory() as path:
+        # NOTE an interrupted run: one cell completed, one half written
+        store = ResultStore(path, spec.fields())
+        key, rows = run_cell(cells[0])
+        store.append(key, rows)
+        key, rows = run_cell(cells[1])
+        store.append(key, rows)
+        with open(store.cells_path, "w") as f:
+            f.write(cells[0].key + "\n")
+
+        done = []
+        store = run_sweep(spec, path, 2, lambda key, i, n: done.append(key))
+        assert len(done) == 7 and cells[0].key not in done
+        columns = store.columns()
+        assert len(columns["cell"]) == 8 * 3
+        assert len(set(columns["cell"])) == 8
+        assert columns["latency"].dtype == np.float64
+        assert (columns["status"] == "succeed").sum() > 0
+
+        # NOTE every scheduler gets the same workload
+        workloads = {}
+        for cell, g, n in zip(columns["cell"], columns["graph"], columns["vertices"]):
+            workloads.setdefault((cell.split("|", 1)[1], g), set()).add(n)
+        assert len(workloads) == 4 * 3
+        assert all([len(n) == 1 for n in workloads.values()])
+        assert len(run_sweep(spec, path, 1).columns()["cell"]) == 8 * 3
+
+        store.save_npz(os.path.join(path, "results.npz"))
+        saved = np.load(os.path.join(path, "results.npz"))
+        assert (saved["latency"][~np.isnan(saved["latency"])] > 0).all()
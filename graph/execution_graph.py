@@ -1,3 +1,4 @@
+import math
 import typing
 
 import networkx as nx
@@ -40,7 +41,14 @@ class ExecutionGraph:
             memory=v.memory,
             upstream_bd=v.upstream_bd,
             downstream_bd=v.downstream_bd,
+            upstream_rate=v.upstream_rate,
+            downstream_rate=v.downstream_rate,
+            parallelism=v.parallelism,
+            replica_of=v.replica_of,
         )
+        for key in ["cpu", "fused"]:
+            if key in v.data:
+                self.g.nodes[v.uuid][key] = v.data[key]
 
     def connect(
         self, v_from: Vertex, v_to: Vertex, unit_size: int, per_second: int
@@ -50,6 +58,8 @@ class ExecutionGraph:
         )
         self.g.nodes[v_to.uuid]["upstream_bd"] += unit_size * per_second
         self.g.nodes[v_from.uuid]["downstream_bd"] += unit_size * per_second
+        self.g.nodes[v_to.uuid]["upstream_rate"] += per_second
+        self.g.nodes[v_from.uuid]["downstream_rate"] += per_second
 
     def remove_vertex(self, vid: str) -> None:
         self.g.remove_node(vid)
@@ -114,18 +124,170 @@ class ExecutionGraph:
 
         return [self.get_vertex(vid) for vid in v_seq]
 
+    def prefix_cut_bds(
+        self, vertices: typing.List[Vertex], upstream_joined: bool = False
+    ) -> typing.List[int]:
+        """exact bd crossing the cut between each topological prefix (length 0..n)
+        and the rest of the graph, in one sweep over edges.
+        upstream_joined -- vertices upstream of this graph (e.g. sources placed
+        locally) are on the prefix side, their bd is derived from upstream_bd;
+        bd to downstream vertices outside this graph leaves the graph whatever
+        the cut is, so it is not counted
+        """
+        internal_in = {v.uuid: 0 for v in vertices}
+        internal_out = {v.uuid: 0 for v in vertices}
+        for u, v, d in self.get_edges():
+            bd = d["unit_size"] * d["per_second"]
+            internal_out[u] += bd
+            internal_in[v] += bd
+
+        cut = 0
+        outer_in = 0
+        prefix_cuts = [(0, 0)]
+        for v in vertices:
+            # NOTE all upstream vertices are in the prefix
+            cut += internal_out[v.uuid] - internal_in[v.uuid]
+            outer_in += max(v.upstream_bd - internal_in[v.uuid], 0)
+            prefix_cuts.append((cut, outer_in))
+        if upstream_joined:
+            return [int(c + outer_in - i) for c, i in prefix_cuts]
+        return [int(c) for c, _ in prefix_cuts]
+
+    def expand_parallelism(self, uuid: str = None):
+        """replace every vertex of parallelism p > 1 by p replicas "<vid>#<i>".
+        an edge's rate is split over the sender's replicas and key-partitioned
+        over the receiver's replicas, i.e. every replica pair gets
+        per_second / (p_from * p_to), so each replica has 1/p of the input
+        rate (and cpu), while keeping the mi per tuple and memory of the vertex
+        """
+        g = ExecutionGraph(uuid if uuid is not None else self.uuid)
+        replicas: typing.Dict[str, typing.List[Vertex]] = {}
+        for v in self.get_vertices():
+            data = dict(
+                v.data,
+                upstream_bd=0,
+                downstream_bd=0,
+                upstream_rate=0,
+                downstream_rate=0,
+                parallelism=1,
+            )
+            if "cpu" in data:
+                data["cpu"] = data["cpu"] / max(v.parallelism, 1)
+            if v.parallelism <= 1:
+                replicas[v.uuid] = [Vertex(v.uuid, data)]
+            else:
+                replicas[v.uuid] = [
+                    Vertex("{}#{}".format(v.uuid, i), dict(data, replica_of=v.uuid))
+                    for i in range(v.parallelism)
+                ]
+            for r in replicas[v.uuid]:
+                g.add_vertex(r)
+        for u, v, d in self.get_edges():
+            per_second = d["per_second"] / (len(replicas[u]) * len(replicas[v]))
+            for ru in replicas[u]:
+                for rv in replicas[v]:
+                    g.connect(ru, rv, d["unit_size"], per_second)
+        return g
+
+    def replica_groups(self) -> typing.Dict[str, typing.List[str]]:
+        """logical vertex -> its replicas, for vertices expanded from parallelism"""
+        groups: typing.Dict[str, typing.List[str]] = {}
+        for v in self.get_vertices():
+            if v.replica_of is not None:
+                groups.setdefault(v.replica_of, []).append(v.uuid)
+        return groups
+
+    def scale_hot_operators(
+        self, mips: int, max_parallelism: int = 8
+    ) -> typing.Dict[str, int]:
+        """set the parallelism of unpinned vertices whose cpu (MIPS) exceeds a
+        core of the given mips, return the changed ones"""
+        changed = {}
+        for v in self.get_vertices():
+            if v.domain_constraint.get("host") is not None or v.cpu <= mips:
+                continue
+            p = min(int(math.ceil(v.cpu / mips)), max_parallelism)
+            if p != v.parallelism:
+                self.g.nodes[v.uuid]["parallelism"] = p
+                changed[v.uuid] = p
+        return changed
+
+    def chainable(self, u: str, v: str) -> bool:
+        """an edge is chainable if it is the only output of u and the only input
+        of v, both being operators of the same constraint and parallelism.
+        NOTE in a sub graph, edges to the outside only show in the bd"""
+        if self.g.out_degree(u) != 1 or self.g.in_degree(v) != 1:
+            return False
+        vu, vv = self.get_vertex(u), self.get_vertex(v)
+        d = self.get_edge(u, v)
+        bd = d["unit_size"] * d["per_second"]
+        return (
+            vu.downstream_bd == bd
+            and vv.upstream_bd == bd
+            and vu.type == "operator"
+            and vv.type == "operator"
+            and vu.domain_constraint == vv.domain_constraint
+            and vu.parallelism == vv.parallelism
+            and vu.replica_of is None
+            and vv.replica_of is None
+        )
+
+    def fuse_chains(self, uuid: str = None):
+        """fuse maximal chains of chainable operators into super-vertices named
+        after the chain head. a super-vertex sums mi (per tuple along the chain),
+        memory and cpu, takes the upstream bd & rate of the head and the
+        downstream ones of the tail, so outer edges are kept as they are and
+        intra-chain edges disappear. see fused_groups() for the mapping back"""
+        g = ExecutionGraph(uuid if uuid is not None else self.uuid)
+        head_of: typing.Dict[str, str] = {}
+        for vid in topological_sort(self.g):
+            if vid in head_of:
+                continue
+            chain = [vid]
+            while self.g.out_degree(chain[-1]) == 1:
+                down = next(iter(self.g.successors(chain[-1])))
+                if not self.chainable(chain[-1], down):
+                    break
+                chain.append(down)
+            for member in chain:
+                head_of[member] = vid
+            if len(chain) == 1:
+                g.add_vertex(self.get_vertex(vid))
+                continue
+            members = [self.get_vertex(member) for member in chain]
+            data = dict(
+                members[0].data,
+                out_unit_size=members[-1].out_unit_size,
+                mi=sum([m.mi for m in members]),
+                memory=sum([m.memory for m in members]),
+                downstream_bd=members[-1].downstream_bd,
+                downstream_rate=members[-1].downstream_rate,
+                cpu=sum([m.cpu for m in members]),
+                fused=chain,
+            )
+            g.add_vertex(Vertex(vid, data))
+        for u, v, d in self.get_edges():
+            if head_of[u] != head_of[v]:
+                g.g.add_edge(
+                    head_of[u],
+                    head_of[v],
+                    unit_size=d["unit_size"],
+                    per_second=d["per_second"],
+                )
+        return g
+
+    def fused_groups(self) -> typing.Dict[str, typing.List[str]]:
+        """super-vertex -> the chain fused into it, for vertices from fuse_chains"""
+        return {v.uuid: v.fused for v in self.get_vertices() if v.fused is not None}
+
     def sub_graph(self, vids: typing.Set[str], uuid: str):
+        """NOTE upstream/downstream bd & rate keep the values of the original graph"""
         g = ExecutionGraph(uuid)
         for nid in vids:
             g.add_vertex(self.get_vertex(nid))
-        for e in self.get_edges():
-            if e[0] in vids and e[1] in vids:
-                g.connect(
-                    self.get_vertex(e[0]),
-                    self.get_vertex(e[1]),
-                    e[2]["unit_size"],
-                    e[2]["per_second"],
-                )
+        for u, v, d in self.get_edges():
+            if u in vids and v in vids:
+                g.g.add_edge(u, v, unit_size=d["unit_size"], per_second=d["per_second"])
         return g
 
     def connected_subgraphs(self) -> typing.List:
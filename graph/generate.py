@@ -23,7 +23,7 @@ class SourceSelector:
 
     def select(self) -> str:
         idx = random.randint(0, self.total_slots - 1)
-        for k in random.sample(self.sources.keys(), len(self.sources)):
+        for k in random.sample(list(self.sources.keys()), len(self.sources)):
             if idx < self.sources[k]:
                 self.sources[k] -= 1
                 self.total_slots -= 1
@@ -34,9 +34,10 @@ class SourceSelector:
 
 class GraphGenerator:
     def __init__(self, name: str, **kwargs) -> None:
+        """seed -- seeds the random module, from the system if not given"""
         self.name = name
         self.gen_args = kwargs
-        random.seed()
+        random.seed(kwargs.get("seed"))
 
     def gen_chain_graph(self) -> ExecutionGraph:
         total_level = self.gen_args["graph_length"]
@@ -1,3 +1,6 @@
+import typing
+
+
 class Vertex:
     uuid: str
 
@@ -21,6 +24,7 @@ class Vertex:
         out_unit_rate: float,  # per second
         mi: int,
         memory: int,
+        parallelism: int = 1,
     ):
         data = {
             "type": type,
@@ -31,6 +35,9 @@ class Vertex:
             "memory": memory,
             "upstream_bd": 0,
             "downstream_bd": 0,
+            "upstream_rate": 0,
+            "downstream_rate": 0,
+            "parallelism": parallelism,
         }
         return cls(uuid, data)
 
@@ -69,3 +76,37 @@ class Vertex:
     @property
     def downstream_bd(self) -> int:
         return self.data["downstream_bd"]
+
+    @property
+    def upstream_rate(self) -> float:
+        """tuples per second received"""
+        return self.data.get("upstream_rate", 0)
+
+    @property
+    def downstream_rate(self) -> float:
+        """tuples per second sent"""
+        return self.data.get("downstream_rate", 0)
+
+    @property
+    def cpu(self) -> float:
+        """million instructions per second, mi per tuple at the input rate
+        (output rate for sources). fused vertices carry the cpu of their chain,
+        as the rate changes along it"""
+        if "cpu" in self.data:
+            return self.data["cpu"]
+        rate = self.upstream_rate if self.upstream_rate > 0 else self.downstream_rate
+        return self.mi * rate
+
+    @property
+    def parallelism(self) -> int:
+        return self.data.get("parallelism", 1)
+
+    @property
+    def replica_of(self) -> typing.Optional[str]:
+        """logical vertex of a replica, None if not expanded from parallelism"""
+        return self.data.get("replica_of")
+
+    @property
+    def fused(self) -> typing.Optional[typing.List[str]]:
+        """chain of vertices fused into this one, None if not fused"""
+        return self.data.get("fused")
@@ -1,7 +1,72 @@
-from .all_cloud_scheduler import AllCloudScheduler
-from .edge_random_scheduler import EdgeRandomScheduler
-from .flow_scheduler import FlowScheduler
-from .latency import LatencyCalculator
-from .result import SchedulingResult, SchedulingResultStatus
-from .sbon_scheduler import SBONScheduler
-from .scheduler import RandomScheduler, Scheduler
+import functools
+import importlib
+import typing
+
+# NOTE names are imported from their module on first access, importing the
+# package or one scheduler does not load the others (sbon pulls in vivaldi)
+_EXPORTS = {
+    "AllCloudScheduler": "all_cloud_scheduler",
+    "ConvergenceEvent": "convergence",
+    "ConvergenceGuard": "convergence",
+    "EdgeRandomScheduler": "edge_random_scheduler",
+    "ExecutionSimulator": "execution",
+    "FlatProvisioner": "flat_provisioner",
+    "FlowScheduler": "flow_scheduler",
+    "GreedyScheduler": "greedy_scheduler",
+    "EdgeThroughput": "latency",
+    "IncrementalLatencyCalculator": "latency",
+    "LatencyCalculator": "latency",
+    "Migration": "local_search",
+    "PlacementOptimizer": "local_search",
+    "Arrival": "online",
+    "Histogram": "online",
+    "OnlineEngine": "online",
+    "OnlineStats": "online",
+    "poisson_arrivals": "online",
+    "HostIndex": "packing",
+    "vector_binpack": "packing",
+    "ParallelFlowScheduler": "parallel",
+    "BackPressureRescheduler": "rescheduler",
+    "ReschedulingStats": "rescheduler",
+    "SchedulingResult": "result",
+    "SchedulingResultStatus": "result",
+    "SBONScheduler": "sbon_scheduler",
+    "RandomScheduler": "scheduler",
+    "Scheduler": "scheduler",
+    "ChromeTraceSink": "trace",
+    "JsonLinesSink": "trace",
+    "MemorySink": "trace",
+    "Sink": "trace",
+    "Tracer": "trace",
+}
+
+# NOTE schedulers of a whole scenario by name, the class & its keyword arguments
+SCHEDULERS: typing.Dict[str, typing.Tuple[str, typing.Dict[str, typing.Any]]] = {
+    "flow": ("FlowScheduler", {}),
+    "flow_multilevel": ("FlowScheduler", {"cut_strategy": "multilevel"}),
+    "all_cloud": ("AllCloudScheduler", {}),
+    "edge_random": ("EdgeRandomScheduler", {}),
+    "greedy": ("GreedyScheduler", {}),
+    "sbon": ("SBONScheduler", {}),
+}
+
+__all__ = list(_EXPORTS.keys()) + ["SCHEDULERS", "get_scheduler"]
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module("." + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(__all__))
+
+
+def get_scheduler(name: str):
+    """factory of the scheduler registered as name, taking the scenario. only
+    the module of that scheduler is imported"""
+    cls_name, kwargs = SCHEDULERS[name]
+    return functools.partial(__getattr__(cls_name), **kwargs)
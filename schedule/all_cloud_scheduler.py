@@ -6,12 +6,14 @@ from graph import ExecutionGraph
 
 from .result import SchedulingResult, SchedulingResultStatus
 from .scheduler import RandomScheduler, Scheduler, SourcedGraph
+from .trace import traced
 
 
 class AllCloudScheduler(Scheduler):
     def schedule(self, g: ExecutionGraph) -> SchedulingResult:
         return self.schedule_multiple([g])
 
+    @traced
     def schedule_multiple(
         self, graph_list: typing.List[ExecutionGraph]
     ) -> typing.List[SchedulingResult]:
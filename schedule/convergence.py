@@ -0,0 +1,80 @@
+import logging
+import typing
+from collections import defaultdict
+
+from graph import ExecutionGraph
+from utils import get_logger
+
+DEFAULT_MAX_ROUNDS = 50
+DEFAULT_MAX_BOUNCES = 3
+
+
+class ConvergenceEvent(typing.NamedTuple):
+    round: int
+    kind: str  # oscillation / budget_exceeded / fallback / unplaced
+    node: str
+    graph: str
+    detail: str
+
+
+class ConvergenceGuard:
+    """watch graph movements in a ProvisionTree, flag graphs bouncing between
+    parent and child, and record structured (non-blocking) diagnostics of the
+    last rebalance in events"""
+
+    logger: logging.Logger
+    events: typing.List[ConvergenceEvent]
+
+    def __init__(
+        self,
+        max_rounds: int = DEFAULT_MAX_ROUNDS,
+        max_bounces: int = DEFAULT_MAX_BOUNCES,
+    ) -> None:
+        self.logger = get_logger(self.__class__.__name__)
+        self.max_rounds = max_rounds
+        self.max_bounces = max_bounces
+        self.reset()
+
+    def reset(self) -> None:
+        """called at the beginning of every rebalance, events of the previous
+        one are dropped (they are logged when recorded)"""
+        self.events = []
+        self.last_move: typing.Dict[typing.FrozenSet[str], typing.Tuple[str, str]] = {}
+        self.bounces: typing.Dict[typing.FrozenSet[str], int] = defaultdict(int)
+        self.oscillating = False
+
+    @classmethod
+    def graph_key(cls, g: ExecutionGraph) -> typing.FrozenSet[str]:
+        # NOTE graph uuids change when graphs are copied or split
+        return frozenset(g.g.nodes())
+
+    def observe_move(
+        self, round: int, src: str, dst: str, graphs: typing.List[ExecutionGraph]
+    ) -> None:
+        for g in graphs:
+            key = self.graph_key(g)
+            if self.last_move.get(key) == (dst, src):
+                self.bounces[key] += 1
+                if self.bounces[key] == self.max_bounces:
+                    self.oscillating = True
+                    self.record(
+                        round,
+                        "oscillation",
+                        dst,
+                        g.uuid,
+                        "bounced {} times between {} and {}".format(
+                            self.bounces[key], src, dst
+                        ),
+                    )
+            self.last_move[key] = (src, dst)
+
+    def exceeded(self, round: int) -> bool:
+        return round >= self.max_rounds
+
+    def stuck(self, round: int) -> bool:
+        return self.oscillating or self.exceeded(round)
+
+    def record(self, round: int, kind: str, node: str, graph: str, detail: str):
+        event = ConvergenceEvent(round, kind, node, graph, detail)
+        self.events.append(event)
+        self.logger.warning("round %d %s at %s [%s]: %s", *event)
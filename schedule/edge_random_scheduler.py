@@ -8,6 +8,7 @@ from topo import Scenario
 from .result import SchedulingResult, SchedulingResultStatus
 from .scheduler import RandomScheduler, Scheduler, SourcedGraph
 from .flow_scheduler import FlowScheduler
+from .trace import traced
 
 
 class EdgeRandomScheduler(Scheduler):
@@ -18,6 +19,7 @@ class EdgeRandomScheduler(Scheduler):
     def schedule(self, g: ExecutionGraph) -> SchedulingResult:
         return self.schedule_multiple([g])
 
+    @traced
     def schedule_multiple(
         self, graph_list: typing.List[ExecutionGraph]
     ) -> typing.List[SchedulingResult]:
@@ -50,7 +52,7 @@ class EdgeRandomScheduler(Scheduler):
             assert edge_domain is not None
 
             s_graph_list, t_graph_list = FlowScheduler.cloud_edge_cutting(
-                sg_list, edge_domain
+                sg_list, edge_domain, tracer=self.tracer
             )
             s_result_list = RandomScheduler(self.scenario).schedule_multiple(
                 s_graph_list, edge_domain.topo
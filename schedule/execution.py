@@ -0,0 +1,369 @@
+import heapq
+import itertools
+import logging
+import typing
+from collections import deque
+
+import networkx as nx
+from graph import ExecutionGraph
+from topo import Topology
+from topo.topology import LOCAL_BANDWIDTH
+from utils import get_logger
+
+from .online import Histogram
+from .result import SchedulingResult
+
+TICK = 0
+CPU_DONE = 1
+LINK_DONE = 2
+ARRIVE = 3
+
+EPS = 1e-9
+
+
+class TupleGroup(typing.NamedTuple):
+    """a batch of tuples travelling together, born at the source tick"""
+
+    count: float
+    born: float
+
+
+class SimLink:
+    def __init__(self, key: typing.Tuple[str, str], bd: int, delay: int) -> None:
+        self.key = key
+        self.bd = bd
+        self.delay = delay
+        self.busy = False
+        self.queue: typing.Deque = deque()
+        self.busy_time = 0.0
+
+
+class SimHost:
+    def __init__(self, nid: str, mips: int, cores: int) -> None:
+        self.nid = nid
+        self.mips = mips
+        self.free_cores = max(cores, 1)
+        self.ready: typing.Deque["SimVertex"] = deque()
+
+
+class SimEdge:
+    def __init__(
+        self,
+        key: typing.Tuple[str, str, str],
+        src: "SimVertex",
+        dst: "SimVertex",
+        path: typing.List[SimLink],
+        unit_size: int,
+        per_second: int,
+        capacity: float,
+    ) -> None:
+        self.key = key
+        self.src = src
+        self.dst = dst
+        self.path = path
+        self.unit_size = unit_size
+        self.per_second = per_second
+        self.capacity = capacity
+        self.inflight = 0.0
+        self.blocked: typing.Deque[TupleGroup] = deque()
+        self.consumed = 0.0
+
+
+class SimVertex:
+    def __init__(
+        self, key: typing.Tuple[str, str], host: SimHost, mi: int, ref_rate: float
+    ) -> None:
+        self.key = key
+        self.host = host
+        self.mi = mi
+        self.ref_rate = ref_rate
+        self.in_edges: typing.List[SimEdge] = []
+        self.out_edges: typing.List[SimEdge] = []
+        self.queue: typing.Deque[typing.Tuple[typing.Optional[SimEdge], TupleGroup]]
+        self.queue = deque()
+        self.running = False
+        self.in_ready = False
+        # NOTE number of out edges holding blocked groups
+        self.blocked = 0
+        self.offered = 0.0
+        self.throttled = 0.0
+
+
+class ExecutionSimulator:
+    """discrete-event execution of scheduled graphs over a topology.
+
+    sources emit a TupleGroup every `batch_interval` ms, vertices process one
+    group at a time on a core of their host (mi per tuple at host mips), groups
+    cross links in FIFO order at full link bandwidth plus link delay. every
+    edge holds `buffer_time` ms of its expected rate as credits, a vertex whose
+    output has no credit stops processing, which propagates back-pressure up
+    to the sources, where ticks are throttled.
+
+    NOTE latency is measured per group, a smaller batch interval gets closer to
+    tuple-level behaviour at the cost of more events"""
+
+    logger: logging.Logger
+    queue: typing.List[typing.Tuple]
+
+    def __init__(
+        self,
+        topo: Topology,
+        batch_interval: float = 100,
+        buffer_time: float = 1000,
+        warmup: float = 0,
+    ) -> None:
+        self.logger = get_logger(self.__class__.__name__)
+        self.topo = topo
+        self.batch_interval = batch_interval
+        self.buffer_time = buffer_time
+        self.warmup = warmup
+        self.now = 0.0
+        self.queue = []
+        self.seq = itertools.count()
+        self.event_count = 0
+        self.hosts: typing.Dict[str, SimHost] = {}
+        self.links: typing.Dict[typing.Tuple[str, str], SimLink] = {}
+        self.paths: typing.Dict[typing.Tuple[str, str], typing.List[SimLink]] = {}
+        self.vertices: typing.Dict[typing.Tuple[str, str], SimVertex] = {}
+        self.edges: typing.Dict[typing.Tuple[str, str, str], SimEdge] = {}
+        self.graph_edges: typing.Dict[str, typing.List[SimEdge]] = {}
+        self.latency: typing.Dict[str, Histogram] = {}
+
+    # SECTION: building
+
+    def get_host(self, nid: str) -> SimHost:
+        if nid not in self.hosts:
+            node = self.topo.get_node(nid)
+            self.hosts[nid] = SimHost(nid, node.mips, node.cores)
+        return self.hosts[nid]
+
+    def get_path(self, n1: str, n2: str) -> typing.List[SimLink]:
+        """NOTE: shortest path is used, links are full duplex"""
+        if (n1, n2) not in self.paths:
+            path = [] if n1 == n2 else nx.shortest_path(self.topo.g, n1, n2)
+            links = []
+            for a, b in zip(path[:-1], path[1:]):
+                if (a, b) not in self.links:
+                    e = self.topo.g.edges[(a, b)]
+                    self.links[(a, b)] = SimLink((a, b), e["bd"], e["delay"])
+                links.append(self.links[(a, b)])
+            self.paths[(n1, n2)] = links
+        return self.paths[(n1, n2)]
+
+    def add_scheduled_graph(
+        self, graph: ExecutionGraph, result: SchedulingResult
+    ) -> None:
+        assert result.check_complete(graph)
+        assert graph.uuid not in self.graph_edges
+        in_rate = {v.uuid: 0 for v in graph.get_vertices()}
+        out_rate = {v.uuid: 0 for v in graph.get_vertices()}
+        for u, v, d in graph.get_edges():
+            in_rate[v] += d["per_second"]
+            out_rate[u] = max(out_rate[u], d["per_second"])
+
+        for v in graph.get_vertices():
+            ref_rate = in_rate[v.uuid] if in_rate[v.uuid] > 0 else out_rate[v.uuid]
+            host = self.get_host(result.get_scheduled_node(v.uuid))
+            self.vertices[(graph.uuid, v.uuid)] = SimVertex(
+                (graph.uuid, v.uuid), host, v.mi, ref_rate
+            )
+
+        edges = []
+        for u, v, d in graph.get_edges():
+            src = self.vertices[(graph.uuid, u)]
+            dst = self.vertices[(graph.uuid, v)]
+            capacity = (
+                d["per_second"] * max(self.buffer_time, self.batch_interval) / 1000
+            )
+            edge = SimEdge(
+                (graph.uuid, u, v),
+                src,
+                dst,
+                self.get_path(src.host.nid, dst.host.nid),
+                d["unit_size"],
+                d["per_second"],
+                capacity,
+            )
+            src.out_edges.append(edge)
+            dst.in_edges.append(edge)
+            self.edges[edge.key] = edge
+            edges.append(edge)
+        self.graph_edges[graph.uuid] = edges
+        self.latency[graph.uuid] = Histogram()
+
+        for s in graph.get_sources():
+            vertex = self.vertices[(graph.uuid, s.uuid)]
+            if vertex.ref_rate > 0:
+                self.push(self.now + self.batch_interval, TICK, vertex)
+
+    # SECTION: event core
+
+    def push(self, t: float, kind: int, *args) -> None:
+        heapq.heappush(self.queue, (t, next(self.seq), kind, args))
+
+    def run(self, duration: float) -> None:
+        end = self.now + duration
+        handlers = {
+            TICK: self.on_tick,
+            CPU_DONE: self.on_cpu_done,
+            LINK_DONE: self.on_link_done,
+            ARRIVE: self.forward,
+        }
+        while len(self.queue) > 0 and self.queue[0][0] <= end:
+            t, _, kind, args = heapq.heappop(self.queue)
+            self.now = t
+            self.event_count += 1
+            handlers[kind](*args)
+        self.now = end
+
+    def measuring(self) -> bool:
+        return self.now >= self.warmup
+
+    def on_tick(self, vertex: SimVertex) -> None:
+        count = vertex.ref_rate * self.batch_interval / 1000
+        if self.measuring():
+            vertex.offered += count
+        # NOTE a back-pressured source cannot buffer more than its credits
+        if len(vertex.queue) * self.batch_interval >= self.buffer_time:
+            if self.measuring():
+                vertex.throttled += count
+        else:
+            vertex.queue.append((None, TupleGroup(count, self.now)))
+            self.make_ready(vertex)
+        self.push(self.now + self.batch_interval, TICK, vertex)
+
+    def make_ready(self, vertex: SimVertex) -> None:
+        if (
+            vertex.running
+            or vertex.in_ready
+            or vertex.blocked > 0
+            or len(vertex.queue) == 0
+        ):
+            return
+        vertex.in_ready = True
+        vertex.host.ready.append(vertex)
+        self.dispatch(vertex.host)
+
+    def dispatch(self, host: SimHost) -> None:
+        while host.free_cores > 0 and len(host.ready) > 0:
+            vertex = host.ready.popleft()
+            vertex.in_ready = False
+            if vertex.running or vertex.blocked > 0 or len(vertex.queue) == 0:
+                continue
+            edge, group = vertex.queue.popleft()
+            vertex.running = True
+            host.free_cores -= 1
+            cost = group.count * vertex.mi / host.mips * 1000 if host.mips > 0 else 0
+            self.push(self.now + cost, CPU_DONE, vertex, edge, group)
+
+    def on_cpu_done(
+        self, vertex: SimVertex, edge: typing.Optional[SimEdge], group: TupleGroup
+    ) -> None:
+        vertex.running = False
+        vertex.host.free_cores += 1
+        if edge is not None:
+            edge.inflight -= group.count
+            if self.measuring():
+                edge.consumed += group.count
+            self.unblock(edge)
+        if len(vertex.out_edges) == 0:
+            if self.measuring():
+                self.latency[vertex.key[0]].add(self.now - group.born)
+        for out_edge in vertex.out_edges:
+            # NOTE zero-rate edges carry nothing, a vertex fed only by them idles
+            if out_edge.per_second == 0:
+                continue
+            count = group.count * out_edge.per_second / vertex.ref_rate
+            self.try_send(vertex, out_edge, TupleGroup(count, group.born))
+        self.make_ready(vertex)
+        self.dispatch(vertex.host)
+
+    def has_credit(self, edge: SimEdge, count: float) -> bool:
+        # NOTE an empty edge always accepts, even a group larger than capacity
+        return edge.inflight <= EPS or edge.inflight + count <= edge.capacity + EPS
+
+    def try_send(self, vertex: SimVertex, edge: SimEdge, group: TupleGroup) -> None:
+        if len(edge.blocked) == 0 and self.has_credit(edge, group.count):
+            self.send(edge, group)
+            return
+        if len(edge.blocked) == 0:
+            vertex.blocked += 1
+        edge.blocked.append(group)
+
+    def unblock(self, edge: SimEdge) -> None:
+        if len(edge.blocked) == 0:
+            return
+        while len(edge.blocked) > 0 and self.has_credit(edge, edge.blocked[0].count):
+            self.send(edge, edge.blocked.popleft())
+        if len(edge.blocked) == 0:
+            edge.src.blocked -= 1
+            self.make_ready(edge.src)
+
+    def send(self, edge: SimEdge, group: TupleGroup) -> None:
+        edge.inflight += group.count
+        if len(edge.path) == 0:
+            size = group.count * edge.unit_size
+            self.push(self.now + size / LOCAL_BANDWIDTH * 1000, ARRIVE, edge, group, 0)
+        else:
+            self.forward(edge, group, 0)
+
+    def forward(self, edge: SimEdge, group: TupleGroup, hop: int) -> None:
+        if hop == len(edge.path):
+            edge.dst.queue.append((edge, group))
+            self.make_ready(edge.dst)
+            return
+        link = edge.path[hop]
+        link.queue.append((edge, group, hop))
+        if not link.busy:
+            self.start_link(link)
+
+    def start_link(self, link: SimLink) -> None:
+        edge, group, _ = link.queue[0]
+        link.busy = True
+        cost = group.count * edge.unit_size / link.bd * 1000
+        if self.measuring():
+            link.busy_time += cost
+        self.push(self.now + cost, LINK_DONE, link)
+
+    def on_link_done(self, link: SimLink) -> None:
+        edge, group, hop = link.queue.popleft()
+        link.busy = False
+        self.push(self.now + link.delay, ARRIVE, edge, group, hop + 1)
+        if len(link.queue) > 0:
+            self.start_link(link)
+
+    # SECTION: measurement
+
+    def measured_time(self) -> float:
+        return max(self.now - self.warmup, 0)
+
+    def edge_throughput(self) -> typing.Dict[typing.Tuple[str, str, str], float]:
+        """tuples per second consumed by the downstream vertex"""
+        t = self.measured_time()
+        return {
+            key: e.consumed / t * 1000 if t > 0 else 0 for key, e in self.edges.items()
+        }
+
+    def link_utilization(self) -> typing.Dict[typing.Tuple[str, str], float]:
+        t = self.measured_time()
+        return {
+            key: min(link.busy_time / t, 1) if t > 0 else 0
+            for key, link in self.links.items()
+        }
+
+    def compute_latency(
+        self,
+    ) -> typing.Tuple[typing.Dict[str, float], typing.Dict[str, float]]:
+        """same shape as LatencyCalculator.compute_latency: mean e2e latency (ms)
+        and back-pressure rate averaged over edges, from measured throughput"""
+        throughput = self.edge_throughput()
+        latency = {}
+        bp_rate = {}
+        for graph_uuid, edges in self.graph_edges.items():
+            latency[graph_uuid] = self.latency[graph_uuid].mean()
+            bp = 0
+            for e in edges:
+                if e.per_second > 0:
+                    bp += max(e.per_second - throughput[e.key], 0) / e.per_second
+            bp_rate[graph_uuid] = bp / len(edges) if len(edges) > 0 else 0
+        return latency, bp_rate
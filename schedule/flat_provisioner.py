@@ -0,0 +1,211 @@
+import heapq
+import typing
+from collections import defaultdict
+
+from graph import ExecutionGraph
+from topo import Domain, Host, Resources
+
+from .provision import Provisioner, align_replicas, replicas_together
+from .result import SchedulingResult
+from .trace import traced
+
+ZERO = Resources.zero()
+
+
+class FlatProvisioner(Provisioner):
+    """fast path for flat (single host) or homogeneous domains: graphs are placed
+    by summing resource vectors (slots, memory, cpu) instead of walking a tree,
+    each host is occupied once per graph in bulk"""
+
+    hosts: typing.List[Host]
+    graph_assignments: typing.Dict[str, typing.Dict[str, str]]
+
+    def __init__(self, domain: Domain) -> None:
+        super().__init__(domain)
+        self.hosts = [h for hrg in domain.hrgs for h in hrg.hosts]
+        self.host_lookup_table = {h.name: h for h in self.hosts}
+        self.graph_assignments = {}
+
+    @classmethod
+    def applicable(cls, domain: Domain) -> bool:
+        hosts = [h for hrg in domain.hrgs for h in hrg.hosts]
+        if len(hosts) <= 1:
+            return True
+        specs = set([(h.mips, h.cores, h.memory) for h in hosts])
+        return len(domain.hrgs) == 1 and len(specs) == 1
+
+    def schedule(self, graph: ExecutionGraph) -> SchedulingResult:
+        return self.schedule_multiple([graph])[0]
+
+    @traced
+    def schedule_multiple(
+        self, graph_list: typing.List[ExecutionGraph]
+    ) -> typing.List[SchedulingResult]:
+        splits = [self.split_pinned(g) for g in graph_list]
+        return self.schedule_batch(graph_list, splits)
+
+    def schedule_near(self, graph: ExecutionGraph, hostname: str) -> SchedulingResult:
+        """place a (sub) graph preferably on the given host"""
+        vertices = replicas_together(graph.topological_order())
+        free = self.host_lookup_table[hostname].node.free_resources()
+        n = fit_prefix(free, [Resources.of_vertex(v) for v in vertices])
+        n = align_replicas(vertices, n)
+        vids = [v.uuid for v in vertices]
+        split = ({hostname: vids[:n]} if n > 0 else {}, vids[n:])
+        return self.schedule_batch([graph], [split])[0]
+
+    def schedule_batch(
+        self,
+        graph_list: typing.List[ExecutionGraph],
+        splits: typing.List[
+            typing.Tuple[typing.Dict[str, typing.List[str]], typing.List[str]]
+        ],
+    ) -> typing.List[SchedulingResult]:
+        free = {h.name: h.node.free_resources() for h in self.hosts}
+        heap = [(-r.slots, name) for name, r in free.items()]
+        heapq.heapify(heap)
+        # NOTE pinned vertices of the whole batch are reserved first, so that
+        # earlier graphs do not take the resources of later graphs' sources
+        reserved: typing.Dict[str, Resources] = defaultdict(Resources.zero)
+        for g, (pinned, _) in zip(graph_list, splits):
+            for hostname, vids in pinned.items():
+                demand = [Resources.of_vertex(g.get_vertex(vid)) for vid in vids]
+                reserved[hostname] = reserved[hostname].add(Resources.total(demand))
+        return [
+            self.place_graph(g, pinned, unpinned, free, reserved, heap)
+            for g, (pinned, unpinned) in zip(graph_list, splits)
+        ]
+
+    def split_pinned(
+        self, graph: ExecutionGraph
+    ) -> typing.Tuple[typing.Dict[str, typing.List[str]], typing.List[str]]:
+        pinned: typing.Dict[str, typing.List[str]] = defaultdict(list)
+        unpinned: typing.List[str] = []
+        for v in replicas_together(graph.topological_order()):
+            hostname = v.domain_constraint.get("host")
+            if hostname is not None and hostname in self.host_lookup_table:
+                pinned[hostname].append(v.uuid)
+            else:
+                unpinned.append(v.uuid)
+        return pinned, unpinned
+
+    def place_graph(
+        self,
+        graph: ExecutionGraph,
+        pinned: typing.Dict[str, typing.List[str]],
+        unpinned: typing.List[str],
+        free: typing.Dict[str, Resources],
+        reserved: typing.Dict[str, Resources],
+        heap: typing.List[typing.Tuple[int, str]],
+    ) -> SchedulingResult:
+        demands = {v.uuid: Resources.of_vertex(v) for v in graph.get_vertices()}
+        taken: typing.Dict[str, Resources] = defaultdict(Resources.zero)
+        for hostname, vids in pinned.items():
+            demand = Resources.total([demands[vid] for vid in vids])
+            reserved[hostname] = reserved[hostname].sub(demand)
+            taken[hostname] = taken[hostname].add(demand)
+        for hostname in pinned.keys():
+            if not free[hostname].fits(taken[hostname]):
+                return SchedulingResult.failed(
+                    "insufficient resources for pinned vertices"
+                )
+
+        # NOTE reads must not add entries, only hosts taking vertices are occupied
+        def available(hostname: str) -> Resources:
+            r = free[hostname].sub(reserved.get(hostname, ZERO))
+            r = r.sub(taken.get(hostname, ZERO))
+            return Resources(max(r.slots, 0), max(r.memory, 0), max(r.cpu, 0))
+
+        remaining = unpinned
+        total = Resources.total([demands[vid] for vid in remaining])
+        if not Resources.total([available(h) for h in free.keys()]).fits(total):
+            return SchedulingResult.failed("insufficient resources in domain")
+
+        result = SchedulingResult()
+        assignment: typing.Dict[str, str] = {}
+        for hostname, vids in pinned.items():
+            for vid in vids:
+                result.assign(self.host_lookup_table[hostname].node.uuid, vid)
+                assignment[vid] = hostname
+
+        # NOTE keep the graph together: next to a pinned vertex, else on the
+        # largest host, else split over hosts in descending free slots
+        for hostname in pinned.keys():
+            if available(hostname).fits(total):
+                self.assign_bulk(result, remaining, hostname, assignment)
+                taken[hostname] = taken[hostname].add(total)
+                remaining = []
+                break
+        popped: typing.List[typing.Tuple[int, str]] = []
+        order = [graph.get_vertex(vid) for vid in remaining]
+        while len(remaining) > 0 and len(heap) > 0:
+            entry = heapq.heappop(heap)
+            if -entry[0] != free[entry[1]].slots:
+                # NOTE stale entry, a fresh one was pushed after occupation
+                continue
+            popped.append(entry)
+            n = fit_prefix(available(entry[1]), [demands[vid] for vid in remaining])
+            n = align_replicas(order, n)
+            if n > 0:
+                self.assign_bulk(result, remaining[:n], entry[1], assignment)
+                taken[entry[1]] = taken[entry[1]].add(
+                    Resources.total([demands[vid] for vid in remaining[:n]])
+                )
+                remaining, order = remaining[n:], order[n:]
+        for entry in popped:
+            heapq.heappush(heap, entry)
+        if len(remaining) > 0:
+            # NOTE enough resources in total, but fragmented over hosts
+            return SchedulingResult.failed("insufficient resources on any host")
+
+        for hostname, demand in taken.items():
+            if demand == ZERO:
+                continue
+            assert self.host_lookup_table[hostname].node.occupy_resources(demand)
+            free[hostname] = free[hostname].sub(demand)
+            heapq.heappush(heap, (-free[hostname].slots, hostname))
+        # NOTE sub graphs sharing the uuid (e.g. migrated vertices) accumulate
+        self.graph_assignments.setdefault(graph.uuid, {}).update(assignment)
+        return result
+
+    def assign_bulk(
+        self,
+        result: SchedulingResult,
+        vids: typing.List[str],
+        hostname: str,
+        assignment: typing.Dict[str, str],
+    ) -> None:
+        nid = self.host_lookup_table[hostname].node.uuid
+        for vid in vids:
+            result.assign(nid, vid)
+            assignment[vid] = hostname
+
+    def adopt(self, graph: ExecutionGraph, result: SchedulingResult) -> None:
+        self.graph_assignments.setdefault(graph.uuid, {}).update(
+            {v.uuid: result.get_scheduled_node(v.uuid) for v in graph.get_vertices()}
+        )
+
+    def delete_graph(self, graph: ExecutionGraph):
+        """release vertices of the graph, or of a sub graph sharing its uuid"""
+        assignment = self.graph_assignments.get(graph.uuid)
+        if assignment is None:
+            return
+        released: typing.Dict[str, Resources] = defaultdict(Resources.zero)
+        for v in graph.get_vertices():
+            hostname = assignment.pop(v.uuid, None)
+            if hostname is not None:
+                released[hostname] = released[hostname].add(Resources.of_vertex(v))
+        for hostname, demand in released.items():
+            self.host_lookup_table[hostname].node.release_resources(demand)
+        if len(assignment) == 0:
+            self.graph_assignments.pop(graph.uuid)
+
+
+def fit_prefix(free: Resources, demands: typing.List[Resources]) -> int:
+    """number of leading demands fitting together into the free vector"""
+    acc = Resources.zero()
+    for n, demand in enumerate(demands):
+        acc = acc.add(demand)
+        if not free.fits(acc):
+            return n
+    return len(demands)
@@ -1,16 +1,22 @@
-import time
 import heapq
 import logging
 import random
 import typing
-from functools import reduce
+from functools import partial, reduce
 
 from graph import ExecutionGraph, Vertex
-from topo import Domain, Host, Node, Topology
-from utils import gen_uuid, get_logger, grouped_exactly_one_full_binpack
-
-from .provision import Provisioner
+from topo import Domain, Host, Node, Resources, Topology
+from utils import (
+    FullBinpackTable,
+    gen_uuid,
+    get_logger,
+    grouped_exactly_one_full_binpack,
+)
+
+from .convergence import ConvergenceGuard
+from .provision import Provisioner, align_replicas, replicas_together
 from .result import SchedulingResult
+from .trace import traced
 
 
 class ProvisionScatter:
@@ -35,10 +41,17 @@ class ProvisionScatter:
         return self.unscheduled_graphs is None and self.slot_diff is None
 
 
+class PrefixOrder(typing.NamedTuple):
+    n_vertex: int
+    vertices: typing.List[Vertex]
+    group: typing.List[typing.Tuple[int, int]]
+
+
 class ProvisionNode:
     logger: logging.Logger
-    scheduled_vertices: typing.List[Vertex]
+    scheduled_vertices: typing.Dict[str, Vertex]
     unscheduled_graphs: typing.List[ExecutionGraph]
+    vertex_index: typing.Dict[str, "ProvisionNode"]
 
     def __init__(
         self, name: str, type: str, node: Node, parent: typing.Optional[Node]
@@ -48,20 +61,56 @@ class ProvisionNode:
         self.node = node
         self.local_slots = node.slots
         self.slot_diff = self.local_slots
+        # NOTE free slots left unusable as memory or cpu ran out first
+        self.blocked = 0
         self.parent: ProvisionNode = parent
         self.children: typing.List[ProvisionNode] = []
+        self.children_index: typing.Dict[str, int] = {}
         self.children_slots = []
-        self.scheduled_vertices = []
+        self.scheduled_vertices = {}
         self.unscheduled_graphs = []
-        self.logger = get_logger(self.__class__.__name__ + "[{}]".format(self.name))
+        # NOTE shared with ProvisionTree once the node is added to a tree
+        self.vertex_index = {}
+        # NOTE shared by all nodes, a logger per node would stay registered
+        self.logger = get_logger(self.__class__.__name__)
 
     def add_child(self, child) -> None:
+        if child is not None:
+            self.children_index[child.name] = len(self.children)
         self.children.append(child)
         self.children_slots.append(0)
 
     def add_unscheduled_graph(self, g: ExecutionGraph) -> None:
         self.unscheduled_graphs.append(g)
 
+    def free_local_slots(self) -> int:
+        return self.local_slots - self.node.occupied - self.blocked
+
+    def fits(self, v: Vertex) -> bool:
+        return self.node.free_resources().fits(Resources.of_vertex(v))
+
+    def block(self) -> None:
+        """stop reporting the remaining free slots, so that no more graphs are
+        passed here in this round of provisioning"""
+        n = self.free_local_slots()
+        self.blocked += n
+        self.slot_diff -= n
+
+    def schedule_vertex(self, v: Vertex) -> None:
+        self.record_vertex(v)
+        assert self.node.occupy_resources(Resources.of_vertex(v))
+        self.slot_diff -= 1
+
+    def record_vertex(self, v: Vertex) -> None:
+        self.scheduled_vertices[v.uuid] = v
+        self.vertex_index[v.uuid] = self
+
+    def unschedule_vertex(self, vid: str) -> None:
+        v = self.scheduled_vertices.pop(vid)
+        self.vertex_index.pop(vid, None)
+        self.node.release_resources(Resources.of_vertex(v))
+        self.slot_diff += 1
+
     def gather_from_parent(self, scatter: ProvisionScatter):
         if scatter.unscheduled_graphs is not None:
             for g in scatter.unscheduled_graphs:
@@ -71,15 +120,13 @@ class ProvisionNode:
             self.slot_diff += scatter.slot_diff
 
     def gather_from_child(self, child_name: str, scatter: ProvisionScatter):
-        for child_idx, child in enumerate(self.children):
-            if child.name != child_name:
-                continue
-            if scatter.slot_diff is not None:
-                self.children_slots[child_idx] += scatter.slot_diff
-                self.slot_diff += scatter.slot_diff
-            if scatter.unscheduled_graphs is not None:
-                for g in scatter.unscheduled_graphs:
-                    self.add_unscheduled_graph(g)
+        child_idx = self.children_index[child_name]
+        if scatter.slot_diff is not None:
+            self.children_slots[child_idx] += scatter.slot_diff
+            self.slot_diff += scatter.slot_diff
+        if scatter.unscheduled_graphs is not None:
+            for g in scatter.unscheduled_graphs:
+                self.add_unscheduled_graph(g)
 
     def step(
         self,
@@ -87,8 +134,8 @@ class ProvisionNode:
         if len(self.unscheduled_graphs) == 0 and self.slot_diff == 0:
             return False, None, None
 
-        if self.local_slots - self.node.occupied > 0:
-            self.schedule_graph_with_limit(self.local_slots - self.node.occupied)
+        if self.free_local_slots() > 0:
+            self.schedule_graph_with_limit(self.free_local_slots())
             self.rearrange_graphs()
         # self.logger.debug("after local scheduling: %s", self.unscheduled_graphs)
 
@@ -129,42 +176,57 @@ class ProvisionNode:
                 if s.domain_constraint.get("host") != self.name:
                     continue
                 assert n_slot > 0  # this has been checked in FlowScheduler
-                self.scheduled_vertices.append(s)
-                assert self.node.occupy(1)
-                self.slot_diff -= 1
+                self.schedule_vertex(s)
                 n_slot -= 1
                 g.remove_vertex(s.uuid)
         self.rearrange_graphs()
 
         vertices_num = sum([g.number_of_vertices() for g in self.unscheduled_graphs])
-        if vertices_num <= n_slot:
+        demand = Resources.total(
+            [
+                Resources.of_vertex(v)
+                for g in self.unscheduled_graphs
+                for v in g.get_vertices()
+            ]
+        )
+        if vertices_num <= n_slot and self.node.free_resources().fits(demand):
             for g in self.unscheduled_graphs:
                 for v in g.get_vertices():
-                    self.scheduled_vertices.append(v)
-                    assert self.node.occupy(1)
-                    self.slot_diff -= 1
+                    self.schedule_vertex(v)
             self.unscheduled_graphs = []
+        if len(self.unscheduled_graphs) == 0:
+            return
+        # NOTE full binpack requires the capacity to be reachable
+        n_slot = min(n_slot, vertices_num)
 
         topological_sorted_graphs = [
-            g.topological_order_with_upstream_bd() for g in self.unscheduled_graphs
+            replicas_together(g.topological_order_with_upstream_bd())
+            for g in self.unscheduled_graphs
         ]
         # self.logger.info([[v.uuid for v in vs] for vs in topological_sorted_graphs])
-        # REVIEW upstream_bd could be replaced with exact cross-cut bd
+        # NOTE the prefix stays local, together with upstream (sources) placed here
         groups = [
-            [(v_count, v.upstream_bd) for v_count, v in enumerate(vs)]
-            + [(len(vs), vs[len(vs) - 1].downstream_bd)]
-            for vs in topological_sorted_graphs
+            list(enumerate(g.prefix_cut_bds(vs, upstream_joined=True)))
+            for g, vs in zip(self.unscheduled_graphs, topological_sorted_graphs)
         ]
         solution = grouped_exactly_one_full_binpack(n_slot, groups)
+        blocked = False
         for g_idx, s_idx in enumerate(solution):
-            v_count = groups[g_idx][s_idx][0]
+            # NOTE a group is spread by the parent if no child can take it whole
+            v_count = align_replicas(
+                topological_sorted_graphs[g_idx], groups[g_idx][s_idx][0], False
+            )
             for vidx in range(v_count):
                 v = topological_sorted_graphs[g_idx][vidx]
-                self.scheduled_vertices.append(v)
+                if not self.fits(v):
+                    # NOTE slots are binpacked, memory & cpu cut the prefix short
+                    blocked = True
+                    break
                 # self.logger.info("schedule %s to %s", v.uuid, self.name)
-                assert self.node.occupy(1)
-                self.slot_diff -= 1
+                self.schedule_vertex(v)
                 self.unscheduled_graphs[g_idx].remove_vertex(v.uuid)
+        if blocked:
+            self.block()
 
     def pass_graph_to_children(self) -> typing.List[typing.List[ExecutionGraph]]:
         # SECTION A. schedule whole graphs
@@ -209,28 +271,36 @@ class ProvisionNode:
         self.rearrange_graphs()
         # self.logger.info("graphs: %s", self.unscheduled_graphs)
         # SECTION B. split graphs to remaining children slots (from large to small)
+        # NOTE prefix orderings & dp rows are reused across children, only graphs
+        # split for the previous child are recomputed
+        order_cache: typing.Dict[ExecutionGraph, PrefixOrder] = {}
+        table = FullBinpackTable()
         for child_idx, child_slots in sorted(
             enumerate(self.children_slots), key=lambda e: e[1], reverse=True
         ):
-            if child_slots == 0:
+            # NOTE a blocked child reports its free slots while graphs passed in
+            # the same round are on their way, its count is below 0 until then
+            if child_slots <= 0:
                 continue
-            topological_sorted_graphs = [
-                g.topological_order_with_upstream_bd() for g in self.unscheduled_graphs
-            ]
-            # REVIEW upstream_bd could be replaced with exact cross-cut bd
-            groups = [
-                [(v_count, v.upstream_bd) for v_count, v in enumerate(vs)]
-                + [(len(vs), vs[len(vs) - 1].downstream_bd)]
-                for vs in topological_sorted_graphs
+            vertices_num = sum([len(g) for g in self.unscheduled_graphs])
+            if vertices_num == 0:
+                break
+            # NOTE full binpack requires the capacity to be reachable
+            child_slots = min(child_slots, vertices_num)
+            prefix_orders = [
+                self.prefix_order(g, order_cache) for g in self.unscheduled_graphs
             ]
-            solution = grouped_exactly_one_full_binpack(child_slots, groups)
-            for graph, vertices, group, s_idx in zip(
-                self.unscheduled_graphs, topological_sorted_graphs, groups, solution
+            solution = table.solve(child_slots, [o.group for o in prefix_orders])
+            unchanged_graphs = []
+            changed_graphs = []
+            for graph, order, s_idx in zip(
+                self.unscheduled_graphs, prefix_orders, solution
             ):
-                v_count = group[s_idx][0]
+                v_count = align_replicas(order.vertices, order.group[s_idx][0])
                 if v_count == 0:
+                    unchanged_graphs.append(graph)
                     continue
-                vertex_cut = set([vertices[i].uuid for i in range(v_count)])
+                vertex_cut = set([order.vertices[i].uuid for i in range(v_count)])
                 graph_passed_to_children[child_idx].append(
                     graph.sub_graph(vertex_cut, gen_uuid())
                 )
@@ -238,10 +308,31 @@ class ProvisionNode:
                     graph.remove_vertex(v)
                 self.children_slots[child_idx] -= v_count
                 self.slot_diff -= v_count
-            self.rearrange_graphs()
+                changed_graphs.append(graph)
+            # NOTE untouched graphs go first to keep their dp rows valid
+            self.unscheduled_graphs = unchanged_graphs + [
+                sub_graph
+                for g in changed_graphs
+                if g.number_of_vertices() > 0
+                for sub_graph in g.connected_subgraphs()
+            ]
         # !SECTION
         return graph_passed_to_children
 
+    @classmethod
+    def prefix_order(
+        cls, g: ExecutionGraph, cache: typing.Dict[ExecutionGraph, "PrefixOrder"]
+    ) -> "PrefixOrder":
+        order = cache.get(g)
+        if order is not None and order.n_vertex == g.number_of_vertices():
+            return order
+        vs = replicas_together(g.topological_order_with_upstream_bd())
+        # NOTE the prefix is passed to a child, away from upstream vertices
+        group = list(enumerate(g.prefix_cut_bds(vs)))
+        order = PrefixOrder(len(vs), vs, group)
+        cache[g] = order
+        return order
+
     def rearrange_graphs(self) -> None:
         self.unscheduled_graphs = reduce(
             lambda a, b: a + b,
@@ -260,32 +351,66 @@ class ProvisionNode:
 
 
 class ProvisionTree:
+    """event-driven provisioning: only nodes marked dirty (newly added, received
+    graphs or slot diffs) are stepped in the next round"""
+
     name_lookup_map: typing.Dict[str, ProvisionNode]
+    vertex_node_map: typing.Dict[str, ProvisionNode]
+    dirty_nodes: typing.Set[str]
 
-    def __init__(self, root: ProvisionNode) -> None:
+    def __init__(
+        self, root: ProvisionNode, guard: typing.Optional[ConvergenceGuard] = None
+    ) -> None:
         self.name_lookup_map = {}
+        self.vertex_node_map = {}
+        self.node_order: typing.Dict[str, int] = {}
+        self.dirty_nodes = set()
         self.root = root
         self.add_node(root)
         self.step_count = 0
-        self.debug = False
+        self.node_step_count = 0
+        self.message_count = 0
+        self.guard = guard if guard is not None else ConvergenceGuard()
 
     def add_node(self, node: ProvisionNode) -> None:
         self.name_lookup_map[node.name] = node
+        self.node_order[node.name] = len(self.node_order)
+        self.vertex_node_map.update(node.vertex_index)
+        node.vertex_index = self.vertex_node_map
+        self.mark_dirty(node)
+
+    def mark_dirty(self, node: ProvisionNode) -> None:
+        self.dirty_nodes.add(node.name)
+
+    def deliver(
+        self,
+        src: ProvisionNode,
+        dst: ProvisionNode,
+        f: typing.Callable[[ProvisionScatter], None],
+        scatter: typing.Optional[ProvisionScatter],
+    ) -> None:
+        if scatter is None or scatter.empty():
+            return
+        if scatter.unscheduled_graphs is not None:
+            self.guard.observe_move(
+                self.step_count, src.name, dst.name, scatter.unscheduled_graphs
+            )
+        f(scatter)
+        self.message_count += 1
+        self.mark_dirty(dst)
 
     def get_node(self, name: str) -> typing.Optional[ProvisionNode]:
         return self.name_lookup_map.get(name)
 
     def step(self) -> bool:
-        if self.debug:
-            time.sleep(1)
-            print("=== new round {} ===".format(self.step_count))
+        if len(self.dirty_nodes) == 0:
+            return False
         self.step_count += 1
-        node_step_map = {k: v.step() for k, v in self.name_lookup_map.items()}
-        if self.debug:
-            for k, v in node_step_map.items():
-                if v[0]:
-                    node = self.name_lookup_map[k]
-                    print(k, node.local_slots, node.node.occupied)
+        # NOTE keep tree order so that graphs are gathered deterministically
+        active_nodes = sorted(self.dirty_nodes, key=lambda k: self.node_order[k])
+        self.dirty_nodes = set()
+        node_step_map = {k: self.name_lookup_map[k].step() for k in active_nodes}
+        self.node_step_count += len(active_nodes)
         updated = reduce(
             lambda i, j: i or j, [i[0] for i in node_step_map.values()], False
         )
@@ -295,23 +420,26 @@ class ProvisionTree:
             node = self.name_lookup_map[node_name]
             if not step_result[0]:
                 continue
-            if step_result[1].unscheduled_graphs is not None:
+            if node.parent is not None:
+                self.deliver(
+                    node,
+                    node.parent,
+                    partial(node.parent.gather_from_child, node.name),
+                    step_result[1],
+                )
+            elif step_result[1].unscheduled_graphs is not None:
+                # NOTE root has nowhere to pass graphs, they are dropped
                 for g in step_result[1].unscheduled_graphs:
-                    for v in g.get_vertices():
-                        if v.uuid == "g407-v21":
-                            print("from {} to parent", node_name)
-            for scatter in step_result[2]:
-                if scatter.unscheduled_graphs is not None:
-                    for g in scatter.unscheduled_graphs:
-                        for v in g.get_vertices():
-                            if v.uuid == "g407-v21":
-                                print("from {} to child", node_name)
-            if step_result[1] is not None and node.parent is not None:
-                node.parent.gather_from_child(node.name, step_result[1])
+                    self.guard.record(
+                        self.step_count,
+                        "unplaced",
+                        node.name,
+                        g.uuid,
+                        "{} vertices dropped at root".format(len(g)),
+                    )
             if step_result[2] is not None:
                 for child, scatter in zip(node.children, step_result[2]):
-                    if scatter is not None:
-                        child.gather_from_parent(scatter)
+                    self.deliver(node, child, child.gather_from_parent, scatter)
         return True
 
     def traversal(self, f) -> None:
@@ -322,93 +450,186 @@ class TopologicalProvisioner(Provisioner):
     domain: Domain
     topo: Topology
     tree: ProvisionTree
+    graph_vertices: typing.Dict[str, typing.Set[str]]
+    guard: ConvergenceGuard
 
-    def __init__(self, domain: Domain) -> None:
+    def __init__(self, domain: Domain, guard: ConvergenceGuard = None) -> None:
         super().__init__(domain)
         self.topo = domain.topo
+        self.graph_vertices = {}
+        self.guard = guard if guard is not None else ConvergenceGuard()
         self.tree = self.build_provisioner_tree()
-        # NOTE initial propagation for slots
+        self.sync_slots()
+        # NOTE initial propagation for slots, nothing to do once synced
         self.rebalance()
 
     def schedule(self, graph: ExecutionGraph) -> SchedulingResult:
+        self.sync_slots()
         self.initial_graph_placement(graph)
         self.rebalance()
         return self.gather_scheduling_result(graph)
 
+    @traced
     def schedule_multiple(
         self, graph_list: typing.List[ExecutionGraph]
     ) -> typing.List[SchedulingResult]:
         # print(self.domain.name, "run provisioning")
+        self.sync_slots()
         for g in graph_list:
             self.initial_graph_placement(g)
         self.rebalance()
         return [self.gather_scheduling_result(g) for g in graph_list]
 
-    def initial_graph_placement(self, g: ExecutionGraph) -> None:
-        host_set: typing.Set[Host] = set()
-        for s in g.get_sources():
-            assert s.domain_constraint.get("host") is not None
-            host = self.domain.find_host(s.domain_constraint["host"])
-            assert host is not None
-            host_set.add(host)
-        assert len(host_set) <= 1
-        if len(host_set) == 0:
-            node = random.choice(list(self.tree.name_lookup_map.values()))
-        else:
-            host = list(host_set)[0]
-            node = self.tree.get_node(host.name)
+    def sync_slots(self) -> None:
+        """read children slots from the domain's capacity tracker, so that slots
+        occupied or released outside the tree (e.g. by other schedulers) are seen.
+        NOTE only valid between rebalances, when no graph or slot diff is in flight
+        """
+        capacity = self.domain.capacity
+        if capacity is None:
+            return
+
+        def sync(node: ProvisionNode) -> None:
+            node.slot_diff = 0
+            node.blocked = 0
+            node.children_slots = [
+                capacity.free_slots(c.node.uuid) for c in node.children
+            ]
+
+        self.tree.traversal(sync)
+
+    def schedule_near(self, graph: ExecutionGraph, hostname: str) -> SchedulingResult:
+        """place a (sub) graph starting from the given host instead of its sources,
+        the tree spreads what does not fit to the nearest free slots"""
+        self.sync_slots()
+        self.initial_graph_placement(graph, self.tree.get_node(hostname))
+        self.rebalance()
+        return self.gather_scheduling_result(graph)
+
+    def initial_graph_placement(
+        self, g: ExecutionGraph, node: typing.Optional[ProvisionNode] = None
+    ) -> None:
+        if node is None:
+            host_set: typing.Set[Host] = set()
+            for s in g.get_sources():
+                assert s.domain_constraint.get("host") is not None
+                host = self.domain.find_host(s.domain_constraint["host"])
+                assert host is not None
+                host_set.add(host)
+            assert len(host_set) <= 1
+            if len(host_set) == 0:
+                node = random.choice(list(self.tree.name_lookup_map.values()))
+            else:
+                host = list(host_set)[0]
+                node = self.tree.get_node(host.name)
+        # NOTE sub graphs sharing the uuid (e.g. migrated vertices) accumulate
+        self.graph_vertices.setdefault(g.uuid, set()).update(
+            [v.uuid for v in g.get_vertices()]
+        )
         node.add_unscheduled_graph(g.copy(g.uuid))
+        self.tree.mark_dirty(node)
 
     def rebalance(self) -> None:
+        self.guard.reset()
         count = 0
-        while True:
-            # print("rebalance round", count)
-            if not self.tree.step():
-                break
+        while self.tree.step():
             count += 1
-            if count > 20:
-                self.tree.debug = True
+            if not self.guard.stuck(count):
+                continue
+            if self.guard.exceeded(count):
+                self.guard.record(
+                    self.tree.step_count,
+                    "budget_exceeded",
+                    self.tree.root.name,
+                    "",
+                    "no convergence after {} rounds".format(count),
+                )
+            self.fallback_placement()
+            # NOTE no graph is pending, remaining rounds only propagate slot diffs
+            while self.tree.step():
+                pass
+            break
+        self.tracer.count("provisioner_rounds", count)
+
+    def fallback_placement(self) -> None:
+        """deterministically place all pending graphs: vertices in topological
+        order go to the holding node first, then to nodes in tree order"""
+        nodes = sorted(
+            self.tree.name_lookup_map.values(),
+            key=lambda n: self.tree.node_order[n.name],
+        )
+        cursor = 0
+        for holder in nodes:
+            graphs = sorted(holder.unscheduled_graphs, key=lambda g: g.uuid)
+            holder.unscheduled_graphs = []
+            for g in graphs:
+                self.guard.record(
+                    self.tree.step_count,
+                    "fallback",
+                    holder.name,
+                    g.uuid,
+                    "{} vertices".format(len(g)),
+                )
+                for v in g.topological_order():
+                    if holder.fits(v):
+                        target = holder
+                    else:
+                        while (
+                            cursor < len(nodes)
+                            and nodes[cursor].local_slots - nodes[cursor].node.occupied
+                            <= 0
+                        ):
+                            cursor += 1
+                        target = next((n for n in nodes[cursor:] if n.fits(v)), None)
+                        if target is None:
+                            self.guard.record(
+                                self.tree.step_count,
+                                "unplaced",
+                                holder.name,
+                                g.uuid,
+                                "no free slot for {}".format(v.uuid),
+                            )
+                            continue
+                    target.schedule_vertex(v)
+                    self.tree.mark_dirty(target)
 
     def gather_scheduling_result(self, graph: ExecutionGraph) -> SchedulingResult:
-        def gather_callback(vid: str, holder: typing.List):
-            def _f(node: ProvisionNode):
-                for v in node.scheduled_vertices:
-                    if v.uuid == vid:
-                        holder[0] = node.node.uuid
-                        # node.logger.info("gather %s hit %s", v.uuid, node.name)
-
-            return _f
-
         result = SchedulingResult()
         for v in graph.get_vertices():
-            holder = [None]
-            self.tree.traversal(gather_callback(v.uuid, holder))
-            if holder[0] is None:
-                print(graph.uuid, v.uuid)
-                for k, node in self.tree.name_lookup_map.items():
-                    print(k, node.local_slots, node.node.occupied)
-            assert holder[0] is not None
-            result.assign(holder[0], v.uuid)
+            node = self.tree.vertex_node_map.get(v.uuid)
+            if node is None:
+                return SchedulingResult.failed(
+                    "vertex {} not provisioned in {}".format(v.uuid, self.domain.name)
+                )
+            result.assign(node.node.uuid, v.uuid)
         return result
 
+    def adopt(self, graph: ExecutionGraph, result: SchedulingResult) -> None:
+        self.graph_vertices.setdefault(graph.uuid, set()).update(
+            [v.uuid for v in graph.get_vertices()]
+        )
+        for v in graph.get_vertices():
+            self.tree.get_node(result.get_scheduled_node(v.uuid)).record_vertex(v)
+
     def delete_graph(self, graph: ExecutionGraph):
+        """release vertices of the graph, or of a sub graph sharing its uuid"""
         vertices_set = set([v.uuid for v in graph.get_vertices()])
-
-        def delete_callback(node: ProvisionNode):
-            pre_len = len(node.scheduled_vertices)
-            node.scheduled_vertices = [
-                v for v in node.scheduled_vertices if v.uuid not in vertices_set
-            ]
-            post_len = len(node.scheduled_vertices)
-            node.slot_diff += pre_len - post_len
-
-        self.tree.traversal(delete_callback)
+        held = self.graph_vertices.get(graph.uuid)
+        if held is not None:
+            held -= vertices_set
+            if len(held) == 0:
+                self.graph_vertices.pop(graph.uuid)
+        for vid in vertices_set:
+            node = self.tree.vertex_node_map.get(vid)
+            if node is not None:
+                node.unschedule_vertex(vid)
+                self.tree.mark_dirty(node)
 
     def build_provisioner_tree(self) -> ProvisionTree:
         router_node = ProvisionNode(
             self.domain.router.name, "router", self.domain.router.node, None
         )
-        tree = ProvisionTree(router_node)
+        tree = ProvisionTree(router_node, self.guard)
         for hrg in self.domain.hrgs:
             switch_node = ProvisionNode(
                 hrg.switch.name, "switch", hrg.switch.node, router_node
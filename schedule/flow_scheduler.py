@@ -2,33 +2,68 @@ import random
 import typing
 from collections import defaultdict
 
-from algo import min_cut, min_cut2, cross_bd
+from algo import min_cut, min_cut2, cross_bd, multilevel_cut
 from graph import ExecutionGraph
-from topo import Domain, Scenario
+from topo import Domain, Resources, Scenario
 from utils import gen_uuid, grouped_exactly_one_nonfull_binpack
 
+from .flat_provisioner import FlatProvisioner
 from .flow_provisioner import TopologicalProvisioner
 from .provision import Provisioner
 from .result import SchedulingResult, SchedulingResultStatus
 from .scheduler import RandomScheduler, Scheduler, SourcedGraph
+from .trace import NULL_TRACER, Tracer, traced
+
+
+CutFunction = typing.Callable[
+    [ExecutionGraph], typing.Tuple[typing.Set[str], typing.Set[str]]
+]
+CUT_STRATEGIES = {"min_cut": min_cut2, "multilevel": multilevel_cut}
 
 
 class FlowScheduler(Scheduler):
     provisioner_map: typing.Dict[str, Provisioner]
+    random_scheduled: typing.Set[str]
 
-    def __init__(self, scenario: Scenario, provision_type: str = "topo") -> None:
+    def __init__(
+        self,
+        scenario: Scenario,
+        provision_type: str = "topo",
+        cut_strategy: str = "min_cut",
+    ) -> None:
         super().__init__(scenario)
         self.init_provisioner(provision_type)
+        if cut_strategy not in CUT_STRATEGIES:
+            raise ValueError("unknown cut strategy")
+        # NOTE multilevel coarsening for very large graphs, see algo.multilevel
+        self.cut = CUT_STRATEGIES[cut_strategy]
+        # NOTE graphs placed by RandomScheduler, not tracked by any provisioner
+        self.random_scheduled = set()
 
     def init_provisioner(self, provision_type: str = "topo") -> None:
         def provisioner_creator(domain: Domain):
             if provision_type == "topo":
                 return TopologicalProvisioner(domain)
+            if provision_type == "flat":
+                return FlatProvisioner(domain)
+            if provision_type == "auto":
+                # NOTE flat fast path only for cloud domains, edge domains keep
+                # topology-aware provisioning
+                if domain.type == "cloud" and FlatProvisioner.applicable(domain):
+                    return FlatProvisioner(domain)
+                return TopologicalProvisioner(domain)
             raise ValueError("unknown provision type")
 
         self.provisioner_map = {
             d.name: provisioner_creator(d) for d in self.scenario.domains
         }
+        for provisioner in self.provisioner_map.values():
+            provisioner.tracer = self.tracer
+
+    def set_tracer(self, tracer: Tracer) -> None:
+        super().set_tracer(tracer)
+        for provisioner in self.provisioner_map.values():
+            provisioner.tracer = tracer
 
     def get_provisioner(self, domain_name: str) -> Provisioner:
         assert self.provisioner_map.get(domain_name) is not None
@@ -46,15 +81,18 @@ class FlowScheduler(Scheduler):
                 random.choice(self.scenario.get_cloud_domains()).name
             ).schedule(graph)
 
+        if len(self.scenario.get_fog_domains()) > 0:
+            return self.schedule_multiple([graph])[0]
+
         edge_domain = self.if_source_in_single_domain(graph)
         if edge_domain is None:
             return SchedulingResult.failed("sources not in single domain")
         if not self.if_source_fit(graph, edge_domain):
             return SchedulingResult.failed("insufficient resource for sources")
 
-        free_slots = sum([n.slots - n.occupied for n in edge_domain.topo.get_nodes()])
+        free_slots = edge_domain.free_slots()
 
-        cut_options = sorted(gen_cut_options(graph), key=lambda o: o.flow)
+        cut_options = sorted(gen_cut_options(graph, self.cut), key=lambda o: o.flow)
         cut_choice: CutOption = None
         for option in cut_options:
             if len(option.s_cut) <= free_slots:
@@ -64,19 +102,23 @@ class FlowScheduler(Scheduler):
             return SchedulingResult.failed("slots not enough")
         s_cut, t_cut = cut_choice.s_cut, cut_choice.t_cut
 
+        # NOTE sub graphs keep the graph uuid, so that provisioners can delete them
         s_result = self.get_provisioner(edge_domain.name).schedule(
-            graph.sub_graph(s_cut, gen_uuid())
+            graph.sub_graph(s_cut, graph.uuid)
         )
         t_result = self.get_provisioner(
             random.choice(self.scenario.get_cloud_domains()).name
-        ).schedule(graph.sub_graph(t_cut, gen_uuid()))
+        ).schedule(graph.sub_graph(t_cut, graph.uuid))
         result = SchedulingResult.merge(s_result, t_result)
         if result.status != SchedulingResultStatus.FAILED:
             self.logger.info(
                 "free slots: %d; newly occupied: %d", free_slots, len(s_cut)
             )
+        else:
+            self.delete_graph(graph, result)
         return result
 
+    @traced
     def schedule_multiple(
         self, graph_list: typing.List[ExecutionGraph]
     ) -> typing.List[SchedulingResult]:
@@ -89,38 +131,48 @@ class FlowScheduler(Scheduler):
                 results[idx] = RandomScheduler(self.scenario).schedule(
                     g, random.choice(self.scenario.get_cloud_domains()).topo
                 )
+                if results[idx].status != SchedulingResultStatus.FAILED:
+                    self.random_scheduled.add(g.uuid)
 
         # NOTE continue algorithm for contrained graphs
         sourced_graphs: typing.List[SourcedGraph] = [
             SourcedGraph(idx, g)
             for idx, g in enumerate(graph_list)
-            if g.get_sources() != 0
+            if len(g.get_sources()) != 0
         ]
 
         # NOTE group graphs by edge domains
         edge_domain_map: typing.Dict[str, typing.List[SourcedGraph]] = defaultdict(list)
-        for sg in sourced_graphs:
-            edge_domain = self.if_source_in_single_domain(sg.g)
-            if edge_domain is None:
-                results[sg.idx] = SchedulingResult.failed(
-                    "sources not in single domain"
-                )
-            edge_domain_map[edge_domain.name].append(sg)
+        with self.tracer.span("group_domains"):
+            for sg in sourced_graphs:
+                edge_domain = self.if_source_in_single_domain(sg.g)
+                if edge_domain is None:
+                    results[sg.idx] = SchedulingResult.failed(
+                        "sources not in single domain"
+                    )
+                    continue
+                edge_domain_map[edge_domain.name].append(sg)
 
         # NOTE for each edge domain
         for domain_name, sg_list in edge_domain_map.items():
             edge_domain = self.scenario.find_domain(domain_name)
             assert edge_domain is not None
-            if not self.if_source_fit([sg.g for sg in sg_list], edge_domain):
+            with self.tracer.span("if_source_fit"):
+                fit = self.if_source_fit([sg.g for sg in sg_list], edge_domain)
+            if not fit:
                 for sg in sg_list:
                     results[sg.idx] = SchedulingResult.failed(
                         "insufficient resource for sources"
                     )
                 continue
 
+            if len(self.scenario.get_fog_domains()) > 0:
+                self.schedule_tiers(sg_list, edge_domain, results)
+                continue
+
             try:
                 s_graph_list, t_graph_list = self.cloud_edge_cutting(
-                    sg_list, edge_domain
+                    sg_list, edge_domain, self.cut, self.tracer
                 )
             except RuntimeError as e:
                 self.logger.error(e)
@@ -132,35 +184,187 @@ class FlowScheduler(Scheduler):
             # self.logger.info(
             #     "t_graph_list: %s", [g.number_of_vertices() for g in t_graph_list]
             # )
-            s_result_list = self.get_provisioner(domain_name).schedule_multiple(
-                s_graph_list
-            )
+            with self.tracer.span("edge_provision"):
+                s_result_list = self.get_provisioner(domain_name).schedule_multiple(
+                    s_graph_list
+                )
             # self.logger.info("s_result_list: %s", s_result_list)
-            t_result_list = self.get_provisioner(
-                random.choice(self.scenario.get_cloud_domains()).name
-            ).schedule_multiple(t_graph_list)
+            with self.tracer.span("cloud_provision"):
+                t_result_list = self.get_provisioner(
+                    random.choice(self.scenario.get_cloud_domains()).name
+                ).schedule_multiple(t_graph_list)
             # self.logger.info("t_result_list: %s", t_result_list)
 
-            for sg, s_result, t_result in zip(sg_list, s_result_list, t_result_list):
-                results[sg.idx] = SchedulingResult.merge(s_result, t_result)
+            with self.tracer.span("merge"):
+                for sg, s_result, t_result in zip(
+                    sg_list, s_result_list, t_result_list
+                ):
+                    results[sg.idx] = SchedulingResult.merge(s_result, t_result)
+                    if results[sg.idx].status == SchedulingResultStatus.FAILED:
+                        # NOTE release the half that did succeed
+                        self.delete_graph(sg.g, results[sg.idx])
         # print(result_s)
         return results
 
+    def tier_domains(self, edge_domain: Domain) -> typing.List[Domain]:
+        """one domain per tier from the edge up: the nearest domain of each
+        middle tier (e.g. fog) and a random cloud domain"""
+        domains = [edge_domain]
+        for tier in self.scenario.get_tiers()[1:-1]:
+            domains.append(self.scenario.nearest_domain(edge_domain, tier))
+        domains.append(random.choice(self.scenario.get_cloud_domains()))
+        return domains
+
+    def schedule_tiers(
+        self,
+        sg_list: typing.List[SourcedGraph],
+        edge_domain: Domain,
+        results: typing.List[SchedulingResult],
+    ) -> None:
+        """k-way counterpart of the cloud-edge cut for scenarios with middle
+        tiers, results are filled in place"""
+        domains = self.tier_domains(edge_domain)
+        try:
+            tier_graph_lists = self.tiered_cutting(
+                sg_list, domains, self.cut, self.tracer
+            )
+        except RuntimeError as e:
+            self.logger.error(e)
+            for sg in sg_list:
+                results[sg.idx] = SchedulingResult.failed(str(e))
+            return
+
+        tier_result_lists: typing.List[typing.List[SchedulingResult]] = []
+        for domain, graph_list in zip(domains, tier_graph_lists):
+            # NOTE middle tiers may be left empty
+            with self.tracer.span(domain.type + "_provision"):
+                scheduled = iter(
+                    self.get_provisioner(domain.name).schedule_multiple(
+                        [g for g in graph_list if len(g) > 0]
+                    )
+                    if any([len(g) > 0 for g in graph_list])
+                    else []
+                )
+            tier_result_lists.append(
+                [
+                    next(scheduled) if len(g) > 0 else SchedulingResult()
+                    for g in graph_list
+                ]
+            )
+        for i, sg in enumerate(sg_list):
+            results[sg.idx] = SchedulingResult.merge(
+                *[result_list[i] for result_list in tier_result_lists]
+            )
+            if results[sg.idx].status == SchedulingResultStatus.FAILED:
+                self.delete_graph(sg.g, results[sg.idx])
+
+    def delete_graph(self, graph: ExecutionGraph, result: SchedulingResult) -> None:
+        if graph.uuid in self.random_scheduled:
+            self.random_scheduled.discard(graph.uuid)
+            super().delete_graph(graph, result)
+            return
+        for provisioner in self.provisioner_map.values():
+            provisioner.delete_graph(graph)
+
+    def find_host_domain(self, hostname: str) -> typing.Optional[Domain]:
+        for d in self.scenario.domains:
+            if d.find_host(hostname) is not None:
+                return d
+        return None
+
+    def migrate(
+        self,
+        graph: ExecutionGraph,
+        result: SchedulingResult,
+        vids: typing.Set[str],
+        hostname: str,
+    ) -> SchedulingResult:
+        """move vertices of a scheduled graph next to the given host, return the
+        updated result of the whole graph. if the target domain cannot take them,
+        they are placed back near their original hosts. if neither can, a failed
+        result is returned and the vertices are left unplaced, see place_back.
+        NOTE links are not touched, re-add the graph to LatencyCalculator
+        afterwards"""
+        assert graph.uuid not in self.random_scheduled
+        sub = graph.sub_graph(vids, graph.uuid)
+        for provisioner in self.provisioner_map.values():
+            provisioner.delete_graph(sub)
+        unchanged = result.extract(
+            set([v.uuid for v in graph.get_vertices()]) - set(vids)
+        )
+
+        domain = self.find_host_domain(hostname)
+        assert domain is not None
+        provisioner = self.get_provisioner(domain.name)
+        moved = provisioner.schedule_near(sub, hostname)
+        if moved.status != SchedulingResultStatus.FAILED:
+            return SchedulingResult.merge(unchanged, moved)
+
+        self.logger.debug("migration of %s failed: %s", vids, moved.reason)
+        provisioner.delete_graph(sub)
+        origins: typing.Dict[str, typing.Set[str]] = defaultdict(set)
+        for vid in vids:
+            origins[result.get_scheduled_node(vid)].add(vid)
+        restored = [unchanged]
+        for origin, origin_vids in origins.items():
+            domain = self.find_host_domain(origin)
+            restored.append(
+                self.get_provisioner(domain.name).schedule_near(
+                    graph.sub_graph(origin_vids, graph.uuid), origin
+                )
+            )
+        merged = SchedulingResult.merge(*restored)
+        if merged.status == SchedulingResultStatus.FAILED:
+            # NOTE release the vertices restored before the failing origin
+            for provisioner in self.provisioner_map.values():
+                provisioner.delete_graph(sub)
+        return merged
+
+    def place_back(self, graph: ExecutionGraph, result: SchedulingResult) -> bool:
+        """occupy the hosts of a previous result again for the (unplaced) graph,
+        and record the vertices in the provisioners. nothing is taken if a host
+        cannot take its vertices any more"""
+        topo = self.scenario.topo
+        taken: typing.List[typing.Tuple[str, Resources]] = []
+        for v in graph.get_vertices():
+            nid = result.get_scheduled_node(v.uuid)
+            if not topo.occupy_resources(nid, Resources.of_vertex(v)):
+                for nid, demand in taken:
+                    topo.release_resources(nid, demand)
+                return False
+            taken.append((nid, Resources.of_vertex(v)))
+        domain_vids: typing.Dict[str, typing.Set[str]] = defaultdict(set)
+        for v in graph.get_vertices():
+            domain = self.find_host_domain(result.get_scheduled_node(v.uuid))
+            domain_vids[domain.name].add(v.uuid)
+        for name, vids in domain_vids.items():
+            self.get_provisioner(name).adopt(graph.sub_graph(vids, graph.uuid), result)
+        return True
+
     @classmethod
     def cloud_edge_cutting(
-        cls, sg_list: typing.List[SourcedGraph], edge_domain: Domain
+        cls,
+        sg_list: typing.List[SourcedGraph],
+        edge_domain: Domain,
+        cut: CutFunction = min_cut2,
+        tracer: Tracer = NULL_TRACER,
     ) -> typing.Tuple[typing.List[ExecutionGraph], typing.List[ExecutionGraph]]:
         # NOTE generate cut options, if no option provided, skip this edge domain
-        graph_cut_options: typing.List[typing.List[CutOption]] = [
-            sorted(gen_cut_options(sg.g), key=lambda o: o.flow, reverse=False)
-            for sg in sg_list
-        ]
+        with tracer.span("cut"):
+            graph_cut_options: typing.List[typing.List[CutOption]] = [
+                sorted(
+                    gen_cut_options(sg.g, cut, tracer),
+                    key=lambda o: o.flow,
+                    reverse=False,
+                )
+                for sg in sg_list
+            ]
         # for option in graph_cut_options[0]:
         #     print(option.s_cut, option.t_cut, option.flow)
         if len([None for options in graph_cut_options if len(options) == 0]) > 0:
             raise RuntimeError("no option provided")
 
-        free_slots = sum([n.slots - n.occupied for n in edge_domain.topo.get_nodes()])
+        free_slots = edge_domain.free_slots()
         if (
             sum(
                 [
@@ -173,11 +377,11 @@ class FlowScheduler(Scheduler):
         ):
             # NOTE if slots are enough for min-cut
             s_graph_list: typing.List[ExecutionGraph] = [
-                sg.g.sub_graph(options[0].s_cut, gen_uuid())
+                sg.g.sub_graph(options[0].s_cut, sg.g.uuid)
                 for sg, options in zip(sg_list, graph_cut_options)
             ]
             t_graph_list: typing.List[ExecutionGraph] = [
-                sg.g.sub_graph(options[0].t_cut, gen_uuid())
+                sg.g.sub_graph(options[0].t_cut, sg.g.uuid)
                 for sg, options in zip(sg_list, graph_cut_options)
             ]
         else:
@@ -186,17 +390,91 @@ class FlowScheduler(Scheduler):
                 for options in graph_cut_options
             ]
             # solution = grouped_exactly_one_binpack(free_slots, groups)
-            solution = grouped_exactly_one_nonfull_binpack(free_slots, groups)
+            with tracer.span("knapsack"):
+                solution = grouped_exactly_one_nonfull_binpack(free_slots, groups)
+            if tracer.enabled:
+                tracer.count("dp_cells", dp_cells(free_slots, groups))
             s_graph_list: typing.List[ExecutionGraph] = [
-                sg.g.sub_graph(options[s_idx].s_cut, gen_uuid())
+                sg.g.sub_graph(options[s_idx].s_cut, sg.g.uuid)
                 for sg, options, s_idx in zip(sg_list, graph_cut_options, solution)
             ]
             t_graph_list: typing.List[ExecutionGraph] = [
-                sg.g.sub_graph(options[s_idx].t_cut, gen_uuid())
+                sg.g.sub_graph(options[s_idx].t_cut, sg.g.uuid)
                 for sg, options, s_idx in zip(sg_list, graph_cut_options, solution)
             ]
+        tracer.count("sub_graph_copies", len(s_graph_list) + len(t_graph_list))
         return s_graph_list, t_graph_list
 
+    @classmethod
+    def tiered_cutting(
+        cls,
+        sg_list: typing.List[SourcedGraph],
+        domains: typing.List[Domain],
+        cut: CutFunction = min_cut2,
+        tracer: Tracer = NULL_TRACER,
+    ) -> typing.List[typing.List[ExecutionGraph]]:
+        """assign vertices to tiers (domains from the edge up), return the sub
+        graphs of each tier. with traffic between tiers going through the
+        tiers in between, the inter-tier bd is the sum of the cuts below each
+        tier, so the nested cut options are reused: tier i takes an option
+        containing the one of tier i - 1, chosen by the knapsack against the
+        free slots of the tier, greedily from the edge up. the top tier takes
+        the rest"""
+        with tracer.span("cut"):
+            graph_cut_options = [gen_cut_options(sg.g, cut, tracer) for sg in sg_list]
+        if len([None for options in graph_cut_options if len(options) == 0]) > 0:
+            raise RuntimeError("no option provided")
+
+        # NOTE edge tier, any option
+        groups = [
+            [(len(option.s_cut), option.flow) for option in options]
+            for options in graph_cut_options
+        ]
+        free_slots = domains[0].free_slots()
+        if sum([min([size for size, _ in group]) for group in groups]) > free_slots:
+            raise RuntimeError("slots not enough")
+        with tracer.span("knapsack"):
+            solution = grouped_exactly_one_nonfull_binpack(free_slots, groups)
+        if tracer.enabled:
+            tracer.count("dp_cells", dp_cells(free_slots, groups))
+        below = [
+            options[idx].s_cut for options, idx in zip(graph_cut_options, solution)
+        ]
+        tier_cuts = [list(below)]
+
+        # NOTE middle tiers, options containing the tier below, i.e. the earlier
+        # ones in the nested sequence, the tier below itself being the empty choice
+        for domain in domains[1:-1]:
+            groups = [
+                [
+                    (len(option.s_cut - s_cut), option.flow)
+                    for option in options[: idx + 1]
+                ]
+                for options, idx, s_cut in zip(graph_cut_options, solution, below)
+            ]
+            with tracer.span("knapsack"):
+                solution = grouped_exactly_one_nonfull_binpack(
+                    domain.free_slots(), groups
+                )
+            if tracer.enabled:
+                tracer.count("dp_cells", dp_cells(domain.free_slots(), groups))
+            tier_cuts.append(
+                [
+                    options[idx].s_cut - s_cut
+                    for options, idx, s_cut in zip(graph_cut_options, solution, below)
+                ]
+            )
+            below = [s_cut | tier_cut for s_cut, tier_cut in zip(below, tier_cuts[-1])]
+
+        tier_cuts.append(
+            [set(sg.g.g.nodes()) - s_cut for sg, s_cut in zip(sg_list, below)]
+        )
+        tracer.count("sub_graph_copies", len(sg_list) * len(tier_cuts))
+        return [
+            [sg.g.sub_graph(tier_cut, sg.g.uuid) for sg, tier_cut in zip(sg_list, cuts)]
+            for cuts in tier_cuts
+        ]
+
 
 class CutOption(typing.NamedTuple):
     s_cut: typing.Set[str]
@@ -204,19 +482,52 @@ class CutOption(typing.NamedTuple):
     flow: int
 
 
-def gen_cut_options(g: ExecutionGraph) -> typing.List[CutOption]:
+def gen_cut_options(
+    g: ExecutionGraph, cut: CutFunction = min_cut2, tracer: Tracer = NULL_TRACER
+) -> typing.List[CutOption]:
     options: typing.List[CutOption] = []
+    groups = g.replica_groups()
     # s_cut, t_cut = min_cut(g)
-    s_cut, t_cut = min_cut2(g)
+    s_cut, t_cut = keep_replica_groups(g, groups, *cut(g))
+    tracer.count("cut_rounds")
     flow = cross_bd(g, s_cut, t_cut)
     options.append(CutOption(s_cut, t_cut, flow))
 
     while len(s_cut) > 1:
         sub_graph = g.sub_graph(s_cut, gen_uuid())
+        tracer.count("sub_graph_copies")
+        tracer.count("cut_rounds")
         # s_cut, _ = min_cut(sub_graph)
-        s_cut, _ = min_cut2(sub_graph)
+        s_cut, _ = cut(sub_graph)
         t_cut = set([v.uuid for v in g.get_vertices()]) - s_cut
+        s_cut, t_cut = keep_replica_groups(g, groups, s_cut, t_cut)
+        if len(s_cut) >= len(options[-1].s_cut):
+            break
         flow = cross_bd(g, s_cut, t_cut)
         options.append(CutOption(s_cut, t_cut, flow))
 
     return options
+
+
+def dp_cells(n_slot: int, groups: typing.List[typing.List[typing.Tuple[int, int]]]):
+    """cells visited by the grouped knapsack"""
+    return (n_slot + 1) * sum([len(group) for group in groups])
+
+
+def keep_replica_groups(
+    g: ExecutionGraph,
+    groups: typing.Dict[str, typing.List[str]],
+    s_cut: typing.Set[str],
+    t_cut: typing.Set[str],
+) -> typing.Tuple[typing.Set[str], typing.Set[str]]:
+    """replicas of a vertex are placed as a unit: a group split by the cut goes
+    to the cloud side, unless it is a group of sources"""
+    for replicas in groups.values():
+        in_s = [vid for vid in replicas if vid in s_cut]
+        if len(in_s) == 0 or len(in_s) == len(replicas):
+            continue
+        if g.get_vertex(replicas[0]).type == "source":
+            s_cut, t_cut = s_cut | set(replicas), t_cut - set(replicas)
+        else:
+            s_cut, t_cut = s_cut - set(replicas), t_cut | set(replicas)
+    return s_cut, t_cut
@@ -7,6 +7,7 @@ from topo import Scenario
 
 from .result import SchedulingResult, SchedulingResultStatus
 from .scheduler import RandomScheduler, Scheduler, SourcedGraph
+from .trace import traced
 
 
 class GreedyScheduler(Scheduler):
@@ -17,6 +18,7 @@ class GreedyScheduler(Scheduler):
     def schedule(self, g: ExecutionGraph) -> SchedulingResult:
         return self.schedule_multiple([g])
 
+    @traced
     def schedule_multiple(
         self, graph_list: typing.List[ExecutionGraph]
     ) -> typing.List[SchedulingResult]:
@@ -1,8 +1,12 @@
 from collections import defaultdict
+import math
 import typing
 
+import numpy as np
+from algo import max_min_fair
 from graph import ExecutionGraph
 from topo import Topology
+from topo.topology import LOCAL_BANDWIDTH
 from utils import avg, get_logger
 
 from .result import SchedulingResult
@@ -13,19 +17,38 @@ class ScheduledGraph(typing.NamedTuple):
     result: SchedulingResult
 
 
+class EdgeThroughput(typing.NamedTuple):
+    demand: float  # bytes per second
+    rate: float  # achievable bytes per second
+    back_pressure: float  # (demand - rate) / demand
+
+
+EdgeKey = typing.Tuple[str, str, str]  # graph uuid, upstream vid, downstream vid
+
+BANDWIDTH_MODELS = ["proportional", "max_min"]
+
+
 class LatencyCalculator:
+    """bandwidth_model -- proportional: a flow gets its demand-proportional share
+    of every link on its route; max_min: max-min fair rates of all flows, the
+    rate is the same on every link of the route"""
+
     graph_list: typing.List[ScheduledGraph]
+    allocation: typing.Dict[EdgeKey, float]
 
-    def __init__(self, topo: Topology) -> None:
+    def __init__(self, topo: Topology, bandwidth_model: str = "proportional") -> None:
+        assert bandwidth_model in BANDWIDTH_MODELS
         self.logger = get_logger(self.__class__.__name__)
         self.topo = topo
+        self.bandwidth_model = bandwidth_model
         self.graph_list = []
+        self.allocation = {}
 
     def add_scheduled_graph(
         self, graph: ExecutionGraph, result: SchedulingResult
     ) -> None:
         if not result.check_complete(graph):
-            print("incomplete scheduling")
+            self.logger.warning("incomplete scheduling of %s, skipped", graph.uuid)
             return
         self.graph_list.append(ScheduledGraph(graph, result))
         for u, v, d in graph.get_edges():
@@ -38,9 +61,117 @@ class LatencyCalculator:
         # for v in graph.get_vertices():
         #     self.topo.occupy_node(result.get_scheduled_node(v.uuid))
 
+    def compute_allocation(self) -> typing.Dict[EdgeKey, float]:
+        """max-min fair rate (bytes per second) of every graph edge, flows within a
+        host are only capped by LOCAL_BANDWIDTH"""
+        allocation = {}
+        link_index: typing.Dict[str, int] = {}
+        capacity: typing.List[int] = []
+        flows: typing.List[EdgeKey] = []
+        demands: typing.List[float] = []
+        routes: typing.List[typing.List[int]] = []
+        for sg in self.graph_list:
+            for u, v, d in sg.graph.get_edges():
+                key = (sg.graph.uuid, u, v)
+                demand = d["unit_size"] * d["per_second"]
+                route = self.topo.get_n2n_route(
+                    sg.result.get_scheduled_node(u), sg.result.get_scheduled_node(v)
+                )
+                if len(route) == 0:
+                    allocation[key] = min(demand, LOCAL_BANDWIDTH)
+                    continue
+                for link in route:
+                    if link.uuid not in link_index:
+                        link_index[link.uuid] = len(capacity)
+                        capacity.append(link.bd)
+                flows.append(key)
+                demands.append(demand)
+                routes.append([link_index[link.uuid] for link in route])
+
+        incidence = np.zeros((len(capacity), len(flows)))
+        for idx, route in enumerate(routes):
+            incidence[route, idx] = 1
+        rates = max_min_fair(incidence, np.array(capacity), np.array(demands))
+        for key, rate in zip(flows, rates):
+            allocation[key] = float(rate)
+        return allocation
+
+    def compute_throughput(self) -> typing.Dict[EdgeKey, EdgeThroughput]:
+        """achievable throughput & back-pressure of every graph edge under max-min
+        fair sharing"""
+        allocation = self.compute_allocation()
+        throughput = {}
+        for sg in self.graph_list:
+            for u, v, d in sg.graph.get_edges():
+                key = (sg.graph.uuid, u, v)
+                demand = d["unit_size"] * d["per_second"]
+                rate = allocation[key]
+                bp = (demand - rate) / demand if demand > 0 else 0
+                throughput[key] = EdgeThroughput(demand, rate, max(bp, 0))
+        return throughput
+
+    def transmission_latency(self, g: ScheduledGraph, u: str, v: str) -> float:
+        """ms per tuple over edge u -> v, math.inf if max-min fairness gives the
+        edge no bandwidth"""
+        node_u = g.result.get_scheduled_node(u)
+        node_v = g.result.get_scheduled_node(v)
+        edge = g.graph.get_edge(u, v)
+        if self.bandwidth_model == "proportional" or node_u == node_v:
+            return self.topo.get_n2n_transmission_latency(
+                node_u,
+                node_v,
+                edge["unit_size"],
+                edge["unit_size"] * edge["per_second"],
+            )
+        rate = self.allocation[(g.graph.uuid, u, v)]
+        if rate <= 0:
+            return math.inf
+        hops = len(self.topo.get_n2n_route(node_u, node_v))
+        return int(hops * edge["unit_size"] * 1000 / rate)
+
+    def edge_frequency(
+        self, g: ScheduledGraph, u: str, v: str, trans_lat: float
+    ) -> typing.Optional[float]:
+        """achievable tuples per second, None if not limited"""
+        if self.bandwidth_model == "max_min":
+            unit_size = g.graph.get_edge(u, v)["unit_size"]
+            if unit_size == 0:
+                return None
+            return self.allocation[(g.graph.uuid, u, v)] / unit_size
+        if trans_lat == 0:
+            return None
+        return 1000 / trans_lat
+
+    def edge_back_pressure(
+        self, g: ScheduledGraph, u: str, v: str, trans_lat: float
+    ) -> float:
+        """(expected - achievable) / expected frequency, 0 if not limited"""
+        real_freq = self.edge_frequency(g, u, v, trans_lat)
+        if real_freq is None:
+            return 0
+        expected_freq = g.graph.get_edge(u, v)["per_second"]
+        if real_freq >= expected_freq:
+            return 0
+        return (expected_freq - real_freq) / expected_freq
+
+    def compute_edge_back_pressure(self) -> typing.Dict[EdgeKey, float]:
+        """back-pressure of every graph edge, edges without any are left out"""
+        if self.bandwidth_model == "max_min":
+            self.allocation = self.compute_allocation()
+        back_pressure = {}
+        for g in self.graph_list:
+            for u, v, _ in g.graph.get_edges():
+                lat = self.transmission_latency(g, u, v)
+                bp = self.edge_back_pressure(g, u, v, lat)
+                if bp > 0:
+                    back_pressure[(g.graph.uuid, u, v)] = bp
+        return back_pressure
+
     def compute_latency(
         self,
     ) -> typing.Tuple[typing.Dict[str, float], typing.Dict[str, float]]:
+        if self.bandwidth_model == "max_min":
+            self.allocation = self.compute_allocation()
         latency = dict()
         bp_rate = dict()
         cross_bd = 0
@@ -54,7 +185,7 @@ class LatencyCalculator:
 
     def topological_graph_latency(
         self, g: ScheduledGraph
-    ) -> typing.Tuple[int, int, int]:
+    ) -> typing.Tuple[float, float, int]:
         cross_bd = 0
         back_pressure_acc = 0
         latency_dict = {}
@@ -70,14 +201,7 @@ class LatencyCalculator:
                 for u in up_vertices
             ]
             trans_lat = [
-                self.topo.get_n2n_transmission_latency(
-                    g.result.get_scheduled_node(u.uuid),
-                    g.result.get_scheduled_node(v.uuid),
-                    g.graph.get_edge(u.uuid, v.uuid)["unit_size"],
-                    g.graph.get_edge(u.uuid, v.uuid)["unit_size"]
-                    * g.graph.get_edge(u.uuid, v.uuid)["per_second"],
-                )
-                for u in up_vertices
+                self.transmission_latency(g, u.uuid, v.uuid) for u in up_vertices
             ]
 
             # NOTE cross cloud-edge bandwidth usage
@@ -91,19 +215,7 @@ class LatencyCalculator:
                     )
             # NOTE check if back-pressure exist
             for u, lat in zip(up_vertices, trans_lat):
-                if lat == 0:
-                    continue
-                real_freq = 1000 / lat
-                expected_freq = g.graph.get_edge(u.uuid, v.uuid)["per_second"]
-                if real_freq < expected_freq:
-                    #     self.logger.info(
-                    #         "bp from %s to %s: expected %.2fHz, got %.2fHz",
-                    #         u.uuid,
-                    #         v.uuid,
-                    #         expected_freq,
-                    #         real_freq,
-                    #     )
-                    back_pressure_acc += (expected_freq - real_freq) / expected_freq
+                back_pressure_acc += self.edge_back_pressure(g, u.uuid, v.uuid, lat)
 
             # TODO: configurable latency aggregation
             weighted_sum = 0
@@ -140,3 +252,95 @@ class LatencyCalculator:
         assert last_vid is not None
         avg_e2e_lat = avg(*[latency_dict[v.uuid] for v in g.graph.get_sinks()])
         return avg_e2e_lat, back_pressure_acc, cross_bd
+
+
+class IncrementalLatencyCalculator(LatencyCalculator):
+    """keep per-graph latency & back-pressure cached, only graphs sharing a
+    changed link (or host) with an added/removed graph are recomputed"""
+
+    graph_map: typing.Dict[str, ScheduledGraph]
+    graph_resources: typing.Dict[str, typing.Set[str]]
+    resource_graphs: typing.Dict[str, typing.Set[str]]
+
+    def __init__(self, topo: Topology, bandwidth_model: str = "proportional") -> None:
+        assert bandwidth_model in BANDWIDTH_MODELS
+        self.logger = get_logger(self.__class__.__name__)
+        self.topo = topo
+        self.bandwidth_model = bandwidth_model
+        self.allocation = {}
+        self.graph_map = {}
+        self.graph_resources = {}
+        self.resource_graphs = defaultdict(set)
+        self.latency_cache: typing.Dict[str, float] = {}
+        self.bp_cache: typing.Dict[str, float] = {}
+        self.dirty_graphs: typing.Set[str] = set()
+
+    @property
+    def graph_list(self) -> typing.List[ScheduledGraph]:
+        return list(self.graph_map.values())
+
+    def add_scheduled_graph(
+        self, graph: ExecutionGraph, result: SchedulingResult
+    ) -> None:
+        if not result.check_complete(graph):
+            self.logger.warning("incomplete scheduling of %s, skipped", graph.uuid)
+            return
+        assert graph.uuid not in self.graph_map
+        resources = set()
+        for u, v, d in graph.get_edges():
+            node_u = result.get_scheduled_node(u)
+            node_v = result.get_scheduled_node(v)
+            self.topo.occupy_link(node_u, node_v, d["unit_size"] * d["per_second"])
+            resources.update(self.topo.get_n2n_links(node_u, node_v))
+        for v in graph.get_vertices():
+            resources.add(result.get_scheduled_node(v.uuid))
+
+        self.graph_map[graph.uuid] = ScheduledGraph(graph, result)
+        self.graph_resources[graph.uuid] = resources
+        for r in resources:
+            self.resource_graphs[r].add(graph.uuid)
+        self.mark_dirty(resources)
+
+    def remove_scheduled_graph(self, graph_uuid: str) -> None:
+        """release links occupied by the graph, nodes should be released by scheduler"""
+        sg = self.graph_map.pop(graph_uuid, None)
+        if sg is None:
+            return
+        for u, v, d in sg.graph.get_edges():
+            self.topo.release_link(
+                sg.result.get_scheduled_node(u),
+                sg.result.get_scheduled_node(v),
+                d["unit_size"] * d["per_second"],
+            )
+        resources = self.graph_resources.pop(graph_uuid)
+        for r in resources:
+            self.resource_graphs[r].discard(graph_uuid)
+            if len(self.resource_graphs[r]) == 0:
+                self.resource_graphs.pop(r)
+        self.latency_cache.pop(graph_uuid, None)
+        self.bp_cache.pop(graph_uuid, None)
+        self.dirty_graphs.discard(graph_uuid)
+        self.mark_dirty(resources)
+
+    def mark_dirty(self, resources: typing.Iterable[str]) -> None:
+        for r in resources:
+            self.dirty_graphs.update(self.resource_graphs.get(r, ()))
+
+    def compute_latency(
+        self,
+    ) -> typing.Tuple[typing.Dict[str, float], typing.Dict[str, float]]:
+        if self.bandwidth_model == "max_min":
+            # NOTE max-min rates may change beyond shared links, graphs with any
+            # changed rate are recomputed
+            allocation = self.compute_allocation()
+            for key, rate in allocation.items():
+                if self.allocation.get(key) != rate:
+                    self.dirty_graphs.add(key[0])
+            self.allocation = allocation
+        for graph_uuid in self.dirty_graphs:
+            g = self.graph_map[graph_uuid]
+            lat, bp, _ = self.topological_graph_latency(g)
+            self.latency_cache[graph_uuid] = lat
+            self.bp_cache[graph_uuid] = bp / len(g.graph.get_edges())
+        self.dirty_graphs = set()
+        return dict(self.latency_cache), dict(self.bp_cache)
@@ -0,0 +1,364 @@
+import logging
+import math
+import random
+import time
+import typing
+
+from graph import ExecutionGraph
+from topo import Resources, Topology
+from topo.node import cpu_share
+from topo.topology import LOCAL_BANDWIDTH
+from utils import get_logger
+
+from .result import SchedulingResult, SchedulingResultStatus
+
+
+class Migration(typing.NamedTuple):
+    graph: str
+    vertex: str
+    src: str
+    dst: str
+
+
+class Route(typing.NamedTuple):
+    links: typing.List[str]
+    latency: float  # link delays, ms
+    inv_bd: float  # sum of 1 / link bd along the route
+
+
+class SearchEdge(typing.NamedTuple):
+    u: int
+    v: int
+    unit_size: int
+    bd: int  # unit_size * per_second
+
+
+class SearchStats(typing.NamedTuple):
+    moves: int
+    accepted: int
+    initial_cost: float
+    best_cost: float
+    elapsed: float
+
+
+class PlacementOptimizer:
+    """simulated annealing over the placement of a batch of scheduled graphs.
+
+    moves are single-vertex migrations (to a host of a neighbor or to a random
+    host) and swaps between two hosts. the cost is
+
+        bd_weight * cross-host bandwidth (MB/s)
+        + latency_weight * sum of per-edge & per-vertex latency estimates (ms)
+        + overload_weight * sum of link overload ratios
+
+    and every move is evaluated incrementally, on incident edges, the links of
+    their routes and the two hosts only. per-edge latency is delay + unit_size
+    / bd along the route, without sharing (the analytic models live in
+    LatencyCalculator). per-vertex latency is computed at the cpu share of the
+    host, and a vertex only moves where its resource vector fits, both as the
+    topology does.
+
+    NOTE links occupied by graphs outside the batch count as background load,
+    call it before the batch is added to a LatencyCalculator"""
+
+    logger: logging.Logger
+
+    def __init__(
+        self,
+        topo: Topology,
+        bd_weight: float = 1.0,
+        latency_weight: float = 1.0,
+        overload_weight: float = 1000.0,
+        rng: random.Random = None,
+    ) -> None:
+        self.logger = get_logger(self.__class__.__name__)
+        self.topo = topo
+        self.bd_weight = bd_weight / 1e6
+        self.latency_weight = latency_weight
+        self.overload_weight = overload_weight
+        self.rng = rng if rng is not None else random.Random()
+        self.hosts = [h.uuid for h in topo.get_hosts()]
+        self.route_cache: typing.Dict[typing.Tuple[str, str], Route] = {}
+        self.link_bd = {link.uuid: link.bd for _, _, link in topo.get_links()}
+
+    # SECTION: cost terms
+
+    def route(self, a: str, b: str) -> Route:
+        if (a, b) not in self.route_cache:
+            links = self.topo.get_n2n_route(a, b)
+            self.route_cache[(a, b)] = Route(
+                [link.uuid for link in links],
+                sum([link.delay for link in links]),
+                sum([1 / link.bd for link in links]),
+            )
+        return self.route_cache[(a, b)]
+
+    def edge_cost(self, e: SearchEdge) -> float:
+        a, b = self.host[e.u], self.host[e.v]
+        if a == b:
+            return self.latency_weight * e.unit_size / LOCAL_BANDWIDTH * 1000
+        route = self.route(a, b)
+        latency = route.latency + e.unit_size * 1000 * route.inv_bd
+        return self.bd_weight * e.bd + self.latency_weight * latency
+
+    def host_cost(self, h: str) -> float:
+        """computation latency of the batch's vertices on host h"""
+        if self.host_mi[h] == 0 or self.mips[h] <= 0:
+            return 0
+        capacity = self.capacity[h]
+        share = cpu_share(self.cores[h], capacity, capacity.sub(self.free[h]))
+        return self.latency_weight * self.host_mi[h] / (share * self.mips[h]) * 1000
+
+    def link_cost(self, link: str) -> float:
+        overload = self.link_load[link] - self.link_bd[link]
+        if overload <= 0:
+            return 0
+        return self.overload_weight * overload / self.link_bd[link]
+
+    def total_cost(self) -> float:
+        return (
+            sum([self.edge_cost(e) for e in self.edges])
+            + sum([self.host_cost(h) for h in self.hosts])
+            + sum([self.link_cost(link) for link in self.link_load.keys()])
+        )
+
+    def add_load(self, e: SearchEdge, sign: int, touched: typing.Set[str]) -> None:
+        a, b = self.host[e.u], self.host[e.v]
+        if a == b:
+            return
+        for link in self.route(a, b).links:
+            self.link_load[link] += sign * e.bd
+            touched.add(link)
+
+    # SECTION: state
+
+    def load(
+        self,
+        graph_list: typing.List[ExecutionGraph],
+        results: typing.List[SchedulingResult],
+    ) -> None:
+        self.vertices: typing.List[typing.Tuple[str, str]] = []
+        self.host: typing.List[str] = []
+        self.mi: typing.List[int] = []
+        self.demands: typing.Dict[typing.Tuple[str, str], Resources] = {}
+        self.candidates: typing.List[typing.List[str]] = []
+        self.candidate_sets: typing.List[typing.Set[str]] = []
+        self.edges: typing.List[SearchEdge] = []
+        self.incident: typing.List[typing.List[int]] = []
+        self.neighbors: typing.List[typing.List[int]] = []
+        self.mips = {h: self.topo.get_node(h).mips for h in self.hosts}
+        self.cores = {h: self.topo.get_node(h).cores for h in self.hosts}
+        self.capacity = {h: self.topo.get_node(h).total_resources() for h in self.hosts}
+        self.free = {h: self.topo.get_node(h).free_resources() for h in self.hosts}
+        self.host_mi = {h: 0 for h in self.hosts}
+        self.link_load = {
+            d["uuid"]: d["occupied"] for _, _, d in self.topo.g.edges(data=True)
+        }
+
+        candidate_cache: typing.Dict[typing.FrozenSet, typing.List[str]] = {}
+        for g, result in zip(graph_list, results):
+            if result is None or result.status == SchedulingResultStatus.FAILED:
+                continue
+            index = {}
+            for v in g.get_vertices():
+                index[v.uuid] = len(self.vertices)
+                self.vertices.append((g.uuid, v.uuid))
+                self.host.append(result.get_scheduled_node(v.uuid))
+                self.mi.append(v.mi)
+                self.host_mi[self.host[-1]] += v.mi
+                self.demands[(g.uuid, v.uuid)] = Resources.of_vertex(v)
+                self.incident.append([])
+                self.neighbors.append([])
+                key = frozenset(v.domain_constraint.items())
+                if key not in candidate_cache:
+                    candidate_cache[key] = [
+                        h
+                        for h in self.hosts
+                        if self.topo.label_filter(v.domain_constraint, h)
+                    ]
+                self.candidates.append(candidate_cache[key])
+                self.candidate_sets.append(set(candidate_cache[key]))
+            for u, v, d in g.get_edges():
+                e = SearchEdge(
+                    index[u], index[v], d["unit_size"], d["unit_size"] * d["per_second"]
+                )
+                self.incident[e.u].append(len(self.edges))
+                self.incident[e.v].append(len(self.edges))
+                self.neighbors[e.u].append(e.v)
+                self.neighbors[e.v].append(e.u)
+                self.edges.append(e)
+        touched: typing.Set[str] = set()
+        for e in self.edges:
+            self.add_load(e, 1, touched)
+        self.link_costs = {link: self.link_cost(link) for link in self.link_load.keys()}
+        self.movable = [
+            vi for vi in range(len(self.vertices)) if len(self.candidates[vi]) > 1
+        ]
+
+    def apply(self, changes: typing.List[typing.Tuple[int, str]]) -> float:
+        """move vertices to new hosts, return the cost delta"""
+        edges = set([ei for vi, _ in changes for ei in self.incident[vi]])
+        hosts = set([self.host[vi] for vi, _ in changes] + [h for _, h in changes])
+        before = sum([self.edge_cost(self.edges[ei]) for ei in edges]) + sum(
+            [self.host_cost(h) for h in hosts]
+        )
+        touched: typing.Set[str] = set()
+        for ei in edges:
+            self.add_load(self.edges[ei], -1, touched)
+        for vi, h in changes:
+            demand = self.demands[self.vertices[vi]]
+            self.free[self.host[vi]] = self.free[self.host[vi]].add(demand)
+            self.free[h] = self.free[h].sub(demand)
+            self.host_mi[self.host[vi]] -= self.mi[vi]
+            self.host_mi[h] += self.mi[vi]
+            self.host[vi] = h
+        for ei in edges:
+            self.add_load(self.edges[ei], 1, touched)
+        after = sum([self.edge_cost(self.edges[ei]) for ei in edges]) + sum(
+            [self.host_cost(h) for h in hosts]
+        )
+        delta = after - before
+        for link in touched:
+            cost = self.link_cost(link)
+            delta += cost - self.link_costs[link]
+            self.link_costs[link] = cost
+        return delta
+
+    def propose(self) -> typing.Optional[typing.List[typing.Tuple[int, str]]]:
+        vi = self.rng.choice(self.movable)
+        if self.rng.random() < self.swap_prob:
+            vj = self.rng.choice(self.movable)
+            a, b = self.host[vi], self.host[vj]
+            # NOTE each host takes the other's vertex once its own one has left
+            demand_i = self.demands[self.vertices[vi]]
+            demand_j = self.demands[self.vertices[vj]]
+            if (
+                a == b
+                or b not in self.candidate_sets[vi]
+                or a not in self.candidate_sets[vj]
+                or not self.free[a].add(demand_i).fits(demand_j)
+                or not self.free[b].add(demand_j).fits(demand_i)
+            ):
+                return None
+            return [(vi, b), (vj, a)]
+        if len(self.neighbors[vi]) > 0 and self.rng.random() < 0.5:
+            target = self.host[self.rng.choice(self.neighbors[vi])]
+        else:
+            target = self.rng.choice(self.candidates[vi])
+        if (
+            target == self.host[vi]
+            or target not in self.candidate_sets[vi]
+            or not self.free[target].fits(self.demands[self.vertices[vi]])
+        ):
+            return None
+        return [(vi, target)]
+
+    def revert(
+        self, changes: typing.List[typing.Tuple[int, str]]
+    ) -> typing.List[typing.Tuple[int, str]]:
+        return [(vi, self.host[vi]) for vi, _ in changes]
+
+    # SECTION: search
+
+    def optimize(
+        self,
+        graph_list: typing.List[ExecutionGraph],
+        results: typing.List[SchedulingResult],
+        max_moves: int = 10000,
+        time_budget: float = math.inf,
+        t0: float = None,
+        swap_prob: float = 0.3,
+    ) -> typing.Tuple[typing.List[SchedulingResult], typing.List[Migration]]:
+        """return improved results (failed ones are kept as is) and the
+        migrations to apply, the topology is not modified"""
+        start = time.perf_counter()
+        self.swap_prob = swap_prob
+        self.load(graph_list, results)
+        cost = self.total_cost()
+        initial_cost = best_cost = cost
+        if len(self.movable) == 0:
+            self.stats = SearchStats(0, 0, cost, cost, 0)
+            return self.gather(graph_list, results)
+
+        if t0 is None:
+            t0 = self.initial_temperature()
+        # NOTE changes applied since the best state, undone at the end
+        history: typing.List[typing.List[typing.Tuple[int, str]]] = []
+        moves = accepted = 0
+        while moves < max_moves and time.perf_counter() - start < time_budget:
+            moves += 1
+            changes = self.propose()
+            if changes is None:
+                continue
+            undo = self.revert(changes)
+            delta = self.apply(changes)
+            t = t0 * math.pow(1e-3, moves / max_moves)
+            if delta <= 0 or self.rng.random() < math.exp(-delta / t):
+                accepted += 1
+                cost += delta
+                history.append(undo)
+                if cost < best_cost - 1e-9:
+                    best_cost = cost
+                    history = []
+            else:
+                self.apply(undo)
+        for undo in reversed(history):
+            self.apply(undo)
+
+        self.stats = SearchStats(
+            moves, accepted, initial_cost, best_cost, time.perf_counter() - start
+        )
+        self.logger.debug("%s", self.stats)
+        return self.gather(graph_list, results)
+
+    def initial_temperature(self, samples: int = 100) -> float:
+        deltas = []
+        for _ in range(samples):
+            changes = self.propose()
+            if changes is None:
+                continue
+            undo = self.revert(changes)
+            deltas.append(abs(self.apply(changes)))
+            self.apply(undo)
+        return max(sum(deltas) / len(deltas), 1e-6) if len(deltas) > 0 else 1.0
+
+    def gather(
+        self,
+        graph_list: typing.List[ExecutionGraph],
+        results: typing.List[SchedulingResult],
+    ) -> typing.Tuple[typing.List[SchedulingResult], typing.List[Migration]]:
+        assignment = {key: self.host[vi] for vi, key in enumerate(self.vertices)}
+        new_results = []
+        migrations = []
+        for g, result in zip(graph_list, results):
+            if result is None or result.status == SchedulingResultStatus.FAILED:
+                new_results.append(result)
+                continue
+            new_result = SchedulingResult()
+            for v in g.get_vertices():
+                nid = assignment[(g.uuid, v.uuid)]
+                new_result.assign(nid, v.uuid)
+                if nid != result.get_scheduled_node(v.uuid):
+                    src = result.get_scheduled_node(v.uuid)
+                    migrations.append(Migration(g.uuid, v.uuid, src, nid))
+            new_results.append(new_result)
+        return new_results, migrations
+
+    def apply_migrations(self, migrations: typing.List[Migration]) -> bool:
+        """move occupied resources, all or none: False if a destination lacks
+        room, the topology is then left as it was. NOTE provisioners'
+        bookkeeping is not updated"""
+        # NOTE release first, swaps between full hosts are valid
+        for m in migrations:
+            self.topo.release_resources(m.src, self.demands[(m.graph, m.vertex)])
+        for i, m in enumerate(migrations):
+            if self.topo.occupy_resources(m.dst, self.demands[(m.graph, m.vertex)]):
+                continue
+            self.logger.warning("%s does not fit, migrations rolled back", m)
+            for done in migrations[:i]:
+                demand = self.demands[(done.graph, done.vertex)]
+                self.topo.release_resources(done.dst, demand)
+            for m in migrations:
+                self.topo.occupy_resources(m.src, self.demands[(m.graph, m.vertex)])
+            return False
+        return True
@@ -0,0 +1,254 @@
+import heapq
+import logging
+import math
+import random
+import time
+import typing
+
+from graph import ExecutionGraph
+from topo import Scenario
+from utils import get_logger
+
+from .latency import IncrementalLatencyCalculator, ScheduledGraph
+from .result import SchedulingResult, SchedulingResultStatus
+from .scheduler import Scheduler
+
+ARRIVAL = 0
+DEPARTURE = 1
+WINDOW = 2
+
+
+class Arrival(typing.NamedTuple):
+    time: float
+    graph: ExecutionGraph
+    duration: float
+
+
+class Event(typing.NamedTuple):
+    time: float
+    seq: int
+    kind: int  # ARRIVAL / DEPARTURE / WINDOW
+    graph: typing.Optional[ExecutionGraph]
+    duration: float
+
+
+class Histogram:
+    """log-bucketed histogram, O(1) per sample, percentiles are approximated by
+    the upper bound of the bucket"""
+
+    def __init__(self, base: float = 1.1, min_value: float = 1e-6) -> None:
+        self.base = base
+        self.min_value = min_value
+        self.log_base = math.log(base)
+        self.buckets: typing.Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        idx = self.bucket(value)
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def bucket(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return int(math.log(value / self.min_value) / self.log_base) + 1
+
+    def upper_bound(self, idx: int) -> float:
+        return self.min_value * math.pow(self.base, idx)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return 0
+        rank = q / 100 * self.count
+        acc = 0
+        for idx in sorted(self.buckets.keys()):
+            acc += self.buckets[idx]
+            if acc >= rank:
+                return min(self.upper_bound(idx), self.max)
+        return self.max
+
+    def summary(self) -> typing.Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "min": self.min if self.count > 0 else 0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max if self.count > 0 else 0,
+        }
+
+
+class OnlineStats:
+    def __init__(self) -> None:
+        self.arrivals = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.departures = 0
+        self.events = 0
+        self.reasons: typing.Dict[str, int] = {}
+        self.latency = Histogram()
+        self.schedule_time = Histogram()
+        self.waiting_time = Histogram()
+
+    def acceptance_rate(self) -> float:
+        decided = self.accepted + self.rejected
+        return self.accepted / decided if decided > 0 else 0
+
+    def summary(self) -> typing.Dict:
+        return {
+            "arrivals": self.arrivals,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "departures": self.departures,
+            "events": self.events,
+            "acceptance_rate": self.acceptance_rate(),
+            "reasons": dict(self.reasons),
+            "latency": self.latency.summary(),
+            "schedule_time": self.schedule_time.summary(),
+            "waiting_time": self.waiting_time.summary(),
+        }
+
+
+class OnlineEngine:
+    """discrete-event simulation of graph arrivals & departures: arrivals are
+    scheduled one by one (window = 0) or in batches closed every `window` time
+    units, departures release slots (through the scheduler) and links (through
+    the latency calculator)"""
+
+    logger: logging.Logger
+    queue: typing.List[Event]
+    running: typing.Dict[str, ScheduledGraph]
+
+    def __init__(
+        self,
+        scenario: Scenario,
+        scheduler: Scheduler,
+        window: float = 0,
+        measure_latency: bool = True,
+    ) -> None:
+        self.logger = get_logger(self.__class__.__name__)
+        self.scenario = scenario
+        self.scheduler = scheduler
+        self.window = window
+        self.measure_latency = measure_latency
+        self.calculator = IncrementalLatencyCalculator(scenario.topo)
+        self.queue = []
+        self.seq = 0
+        self.now = 0.0
+        self.pending: typing.List[Event] = []
+        self.window_open = False
+        self.running = {}
+        self.stats = OnlineStats()
+
+    def push(
+        self,
+        t: float,
+        kind: int,
+        graph: typing.Optional[ExecutionGraph] = None,
+        duration: float = 0,
+    ) -> None:
+        heapq.heappush(self.queue, Event(t, self.seq, kind, graph, duration))
+        self.seq += 1
+
+    def submit(self, arrivals: typing.Iterable[Arrival]) -> None:
+        for a in arrivals:
+            self.push(a.time, ARRIVAL, a.graph, a.duration)
+
+    def run(self, until: float = math.inf) -> OnlineStats:
+        while len(self.queue) > 0 and self.queue[0].time <= until:
+            event = heapq.heappop(self.queue)
+            self.now = event.time
+            self.stats.events += 1
+            if event.kind == ARRIVAL:
+                self.on_arrival(event)
+            elif event.kind == DEPARTURE:
+                self.on_departure(event)
+            else:
+                self.on_window()
+        return self.stats
+
+    def on_arrival(self, event: Event) -> None:
+        self.stats.arrivals += 1
+        self.pending.append(event)
+        if self.window <= 0:
+            self.schedule_pending()
+        elif not self.window_open:
+            self.window_open = True
+            self.push(self.now + self.window, WINDOW)
+
+    def on_window(self) -> None:
+        self.window_open = False
+        self.schedule_pending()
+
+    def schedule_pending(self) -> None:
+        if len(self.pending) == 0:
+            return
+        pending, self.pending = self.pending, []
+        graph_list = [e.graph for e in pending]
+        start = time.perf_counter()
+        results = self.scheduler.schedule_multiple(graph_list)
+        self.stats.schedule_time.add(time.perf_counter() - start)
+
+        for e, result in zip(pending, results):
+            self.stats.waiting_time.add(self.now - e.time)
+            if (
+                result is None
+                or result.status == SchedulingResultStatus.FAILED
+                or not result.check_complete(e.graph)
+            ):
+                self.reject(e.graph, result)
+                continue
+            self.admit(e, result)
+
+    def admit(self, event: Event, result: SchedulingResult) -> None:
+        graph = event.graph
+        assert graph.uuid not in self.running
+        self.stats.accepted += 1
+        self.calculator.add_scheduled_graph(graph, result)
+        sg = self.calculator.graph_map[graph.uuid]
+        self.running[graph.uuid] = sg
+        if self.measure_latency:
+            # NOTE latency at admission, graphs already running are not updated
+            self.stats.latency.add(self.calculator.topological_graph_latency(sg)[0])
+        self.push(self.now + event.duration, DEPARTURE, graph)
+
+    def reject(
+        self, graph: ExecutionGraph, result: typing.Optional[SchedulingResult]
+    ) -> None:
+        self.stats.rejected += 1
+        reason = "no result" if result is None else result.reason
+        self.stats.reasons[reason] = self.stats.reasons.get(reason, 0) + 1
+        if result is not None and result.status != SchedulingResultStatus.FAILED:
+            # NOTE incomplete result, give back what has been taken
+            self.scheduler.delete_graph(graph, result)
+
+    def on_departure(self, event: Event) -> None:
+        sg = self.running.pop(event.graph.uuid)
+        self.stats.departures += 1
+        self.calculator.remove_scheduled_graph(event.graph.uuid)
+        self.scheduler.delete_graph(sg.graph, sg.result)
+
+
+def poisson_arrivals(
+    graphs: typing.Iterable[ExecutionGraph],
+    rate: float,
+    mean_duration: float,
+    rng: random.Random = None,
+    start: float = 0,
+) -> typing.Iterator[Arrival]:
+    """exponential inter-arrival times (rate per time unit) and durations"""
+    rng = rng if rng is not None else random.Random()
+    t = start
+    for g in graphs:
+        t += rng.expovariate(rate)
+        yield Arrival(t, g, rng.expovariate(1 / mean_duration))
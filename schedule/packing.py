@@ -0,0 +1,141 @@
+import typing
+
+from graph import Vertex
+from topo import Resources, Topology
+
+HEURISTICS = ["first_fit", "dot_product", "norm"]
+
+
+class HostIndex:
+    """hosts indexed by label, with their free resource vectors cached, so that
+    candidates of a domain constraint are a set intersection instead of a scan.
+    commit() keeps the cached vectors in sync with tentative placements, the
+    topology is only touched by the caller
+
+    heuristics (vector bin packing, Panigrahy et al.):
+    first_fit -- the first host in index order where the demand fits
+    dot_product -- the host maximizing <demand, free>, both normalized by the
+    host capacity, i.e. the host whose free vector is most aligned with the demand
+    norm -- the host minimizing the L2 norm of the normalized residual, i.e.
+    the tightest fit over all dimensions"""
+
+    capacity: typing.Dict[str, Resources]
+    free: typing.Dict[str, Resources]
+    label_index: typing.Dict[typing.Tuple[str, str], typing.Set[str]]
+
+    def __init__(self, topo: Topology, hosts: typing.List[str] = None) -> None:
+        self.topo = topo
+        if hosts is None:
+            hosts = [h.uuid for h in topo.get_hosts()]
+        self.hosts = hosts
+        self.order = {h: i for i, h in enumerate(hosts)}
+        self.capacity = {}
+        self.free = {}
+        self.label_index = {}
+        self.candidate_cache: typing.Dict[typing.FrozenSet, typing.List[str]] = {}
+        for h in hosts:
+            node = topo.get_node(h)
+            self.capacity[h] = node.total_resources()
+            self.free[h] = node.free_resources()
+            for label in node.labels.items():
+                self.label_index.setdefault(label, set()).add(h)
+
+    def refresh(self, hosts: typing.Iterable[str] = None) -> None:
+        for h in hosts if hosts is not None else self.hosts:
+            self.free[h] = self.topo.get_node(h).free_resources()
+
+    def candidates(self, constraint: typing.Dict[str, str]) -> typing.List[str]:
+        """hosts carrying all labels of the constraint, in index order"""
+        key = frozenset(constraint.items())
+        if key not in self.candidate_cache:
+            if len(constraint) == 0:
+                hosts = list(self.hosts)
+            else:
+                sets = [self.label_index.get(label, set()) for label in key]
+                hosts = sorted(set.intersection(*sets), key=lambda h: self.order[h])
+            self.candidate_cache[key] = hosts
+        return self.candidate_cache[key]
+
+    def fits(self, host: str, demand: Resources) -> bool:
+        return self.free[host].fits(demand)
+
+    def commit(self, host: str, demand: Resources) -> None:
+        self.free[host] = self.free[host].sub(demand)
+
+    def revert(self, host: str, demand: Resources) -> None:
+        self.free[host] = self.free[host].add(demand)
+
+    def feasible(
+        self, demand: Resources, constraint: typing.Dict[str, str]
+    ) -> typing.List[str]:
+        return [h for h in self.candidates(constraint) if self.fits(h, demand)]
+
+    def score(self, host: str, demand: Resources, heuristic: str) -> float:
+        """lower is better"""
+        capacity = self.capacity[host]
+        if heuristic == "dot_product":
+            d = demand.normalize(capacity)
+            f = self.free[host].normalize(capacity)
+            return -sum([i * j for i, j in zip(d, f)])
+        if heuristic == "norm":
+            residual = self.free[host].sub(demand).normalize(capacity)
+            return sum([i * i for i in residual])
+        return self.order[host]
+
+    def select(
+        self,
+        demand: Resources,
+        constraint: typing.Dict[str, str],
+        heuristic: str = "dot_product",
+        exclude: typing.Set[str] = frozenset(),
+    ) -> typing.Optional[str]:
+        assert heuristic in HEURISTICS
+        best, best_score = None, None
+        for h in self.candidates(constraint):
+            if h in exclude or not self.fits(h, demand):
+                continue
+            if heuristic == "first_fit":
+                return h
+            score = self.score(h, demand, heuristic)
+            if best_score is None or score < best_score:
+                best, best_score = h, score
+        return best
+
+
+def vertex_size(index: HostIndex, v: Vertex) -> float:
+    """sort key of first-fit-decreasing, the largest normalized dimension of the
+    demand against the average host"""
+    demand = Resources.of_vertex(v)
+    n = len(index.hosts)
+    if n == 0:
+        return 0
+    average = Resources(
+        *[sum([c[i] for c in index.capacity.values()]) / n for i in range(3)]
+    )
+    return max(demand.normalize(average))
+
+
+def vector_binpack(
+    index: HostIndex,
+    vertices: typing.List[Vertex],
+    heuristic: str = "dot_product",
+    decreasing: bool = True,
+) -> typing.Optional[typing.Dict[str, str]]:
+    """place vertices (with their domain constraints) on the index, largest
+    first, return vertex -> host or None if any does not fit. the index keeps
+    the tentative placement, commit it on the topology with occupy_resources"""
+    if decreasing:
+        vertices = sorted(vertices, key=lambda v: vertex_size(index, v), reverse=True)
+    placement: typing.Dict[str, str] = {}
+    placed: typing.List[typing.Tuple[str, Resources]] = []
+    for v in vertices:
+        demand = Resources.of_vertex(v)
+        host = index.select(demand, v.domain_constraint, heuristic)
+        if host is None:
+            for h, d in placed:
+                index.revert(h, d)
+            return None
+        index.commit(host, demand)
+        placed.append((host, demand))
+        placement[v.uuid] = host
+    return placement
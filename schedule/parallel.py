@@ -0,0 +1,257 @@
+import multiprocessing
+import random
+import typing
+import weakref
+from collections import defaultdict
+
+import numpy as np
+from graph import ExecutionGraph
+from topo import Node, Resources, ResourceState, Scenario, Topology
+
+from .flow_scheduler import FlowScheduler
+from .result import SchedulingResult, SchedulingResultStatus
+from .scheduler import RandomScheduler, SourcedGraph
+from .trace import NULL_TRACER, traced
+
+# NOTE state of a worker, set once when the pool starts
+_worker_state: typing.Dict[str, typing.Any] = {}
+
+
+class SharedOccupancy:
+    """node usage of a topology state (occupied slots, assigned memory & cpu of
+    every host) in a shared-memory array. workers publish the rows of their
+    domain, the parent loads them into its topology. links are not included,
+    provisioning does not touch them"""
+
+    def __init__(self, topo: Topology, ctx) -> None:
+        self.nodes = [n.uuid for n in topo.get_hosts()]
+        self.index = {nid: i for i, nid in enumerate(self.nodes)}
+        self.buffer = ctx.Array("d", 3 * len(self.nodes), lock=False)
+        self.rows = np.frombuffer(self.buffer, dtype=np.float64).reshape((-1, 3))
+        self.publish(topo, self.nodes)
+
+    def publish(self, topo: Topology, nids: typing.Iterable[str]) -> None:
+        state = topo.get_state(nids)
+        self.rows[[self.index[nid] for nid in state.nodes]] = state.node_usage
+
+    def apply(self, topo: Topology, nids: typing.Iterable[str]) -> None:
+        nids = list(nids)
+        rows = self.rows[[self.index[nid] for nid in nids]]
+        topo.set_state(ResourceState(nids, rows, [], np.zeros(0)))
+
+
+class CloudBroker:
+    """free resources (slots, memory & cpu) of cloud hosts shared by workers,
+    each claims room for the vertices of its t-side, first fit per host,
+    before the parent places them"""
+
+    def __init__(self, nids: typing.List[str], ctx) -> None:
+        self.index = {nid: i for i, nid in enumerate(nids)}
+        self.buffer = ctx.Array("d", 3 * len(nids), lock=False)
+        self.rows = np.frombuffer(self.buffer, dtype=np.float64).reshape((-1, 3))
+        self.lock = ctx.Lock()
+
+    def reset(self, hosts: typing.List[Node]) -> None:
+        """free resources of the hosts the t-sides go to, none on the others"""
+        with self.lock:
+            self.rows[:] = 0
+            for n in hosts:
+                self.rows[self.index[n.uuid]] = n.free_resources()
+
+    def claim(self, demands: typing.List[Resources]) -> bool:
+        """reserve all demands or none"""
+        with self.lock:
+            free = [Resources(int(s), int(m), c) for s, m, c in self.rows]
+            for demand in demands:
+                i = next((i for i, f in enumerate(free) if f.fits(demand)), None)
+                if i is None:
+                    return False
+                free[i] = free[i].sub(demand)
+            self.rows[:] = free
+            return True
+
+
+class DomainOutcome(typing.NamedTuple):
+    domain_name: str
+    # NOTE index of the graph, its s-side result & t-side graph, or the reason
+    placed: typing.List[typing.Tuple[int, SchedulingResult, ExecutionGraph]]
+    failed: typing.List[typing.Tuple[int, str]]
+
+
+def init_worker(scheduler: FlowScheduler, occupancy: SharedOccupancy, broker):
+    # NOTE spans of a worker would go to a copy of the sink
+    scheduler.set_tracer(NULL_TRACER)
+    _worker_state.update(scheduler=scheduler, occupancy=occupancy, broker=broker)
+
+
+def schedule_domain(
+    task: typing.Tuple[str, typing.List[SourcedGraph]]
+) -> DomainOutcome:
+    """cut the graphs of an edge domain and provision their s-side, in a worker.
+    the copy of the topology is brought up to date from the shared occupancy
+    first, and the placements are forgotten once published"""
+    domain_name, sg_list = task
+    scheduler: FlowScheduler = _worker_state["scheduler"]
+    occupancy: SharedOccupancy = _worker_state["occupancy"]
+    edge_domain = scheduler.scenario.find_domain(domain_name)
+    host_ids = [h.uuid for h in edge_domain.topo.get_hosts()]
+    occupancy.apply(scheduler.scenario.topo, host_ids)
+    try:
+        s_graph_list, t_graph_list = scheduler.cloud_edge_cutting(
+            sg_list, edge_domain, scheduler.cut
+        )
+    except RuntimeError as e:
+        return DomainOutcome(domain_name, [], [(sg.idx, str(e)) for sg in sg_list])
+
+    provisioner = scheduler.get_provisioner(domain_name)
+    s_result_list = provisioner.schedule_multiple(s_graph_list)
+    outcome = DomainOutcome(domain_name, [], [])
+    placed_graphs = []
+    for sg, s_graph, s_result, t_graph in zip(
+        sg_list, s_graph_list, s_result_list, t_graph_list
+    ):
+        reason = None
+        if s_result.status == SchedulingResultStatus.FAILED:
+            reason = s_result.reason
+        elif not _worker_state["broker"].claim(
+            [Resources.of_vertex(v) for v in t_graph.get_vertices()]
+        ):
+            reason = "cloud resources not enough"
+        if reason is None:
+            outcome.placed.append((sg.idx, s_result, t_graph))
+            placed_graphs.append(s_graph)
+            continue
+        provisioner.delete_graph(s_graph)
+        outcome.failed.append((sg.idx, reason))
+    occupancy.publish(scheduler.scenario.topo, host_ids)
+    # NOTE the parent records the placements, the next call starts from its state
+    for s_graph in placed_graphs:
+        provisioner.delete_graph(s_graph)
+    return outcome
+
+
+class ParallelFlowScheduler(FlowScheduler):
+    """FlowScheduler running the cut & s-side provisioning of each edge domain
+    in a pool of workers, kept until close(). the parent publishes host
+    occupancy to a shared-memory array, a worker loads the rows of its domain,
+    publishes them back after provisioning and claims cloud resources through
+    a broker. the parent applies the occupancy, records the placements in its
+    provisioners and places all t-sides on the cloud at once. scenarios with
+    middle tiers, shared by edge domains, are scheduled sequentially.
+
+    NOTE workers are forked once, inheriting the scheduler, its provisioners
+    and the shared objects instead of receiving them on every call"""
+
+    def __init__(
+        self,
+        scenario: Scenario,
+        provision_type: str = "topo",
+        cut_strategy: str = "min_cut",
+        processes: int = None,
+    ) -> None:
+        super().__init__(scenario, provision_type, cut_strategy)
+        self.processes = processes
+        self.pool = None
+
+    def start_pool(self) -> None:
+        ctx = multiprocessing.get_context("fork")
+        self.occupancy = SharedOccupancy(self.scenario.topo, ctx)
+        domains = self.scenario.get_cloud_domains()
+        self.broker = CloudBroker(
+            [h.uuid for d in domains for h in d.topo.get_hosts()], ctx
+        )
+        self.pool = ctx.Pool(
+            self.processes,
+            initializer=init_worker,
+            initargs=(self, self.occupancy, self.broker),
+        )
+        # NOTE workers are stopped with the scheduler if close() is not called
+        self.finalizer = weakref.finalize(self, self.pool.terminate)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.finalizer.detach()
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    @traced
+    def schedule_multiple(
+        self, graph_list: typing.List[ExecutionGraph]
+    ) -> typing.List[SchedulingResult]:
+        if (
+            len(self.scenario.get_fog_domains()) > 0
+            or "fork" not in multiprocessing.get_all_start_methods()
+        ):
+            return super().schedule_multiple(graph_list)
+
+        results: typing.List[SchedulingResult] = [None for _ in graph_list]
+        cloud_domain = random.choice(self.scenario.get_cloud_domains())
+        edge_domain_map: typing.Dict[str, typing.List[SourcedGraph]] = defaultdict(list)
+        for idx, g in enumerate(graph_list):
+            if len(g.get_sources()) == 0:
+                results[idx] = RandomScheduler(self.scenario).schedule(
+                    g, cloud_domain.topo
+                )
+                if results[idx].status != SchedulingResultStatus.FAILED:
+                    self.random_scheduled.add(g.uuid)
+                continue
+            edge_domain = self.if_source_in_single_domain(g)
+            if edge_domain is None:
+                results[idx] = SchedulingResult.failed("sources not in single domain")
+                continue
+            edge_domain_map[edge_domain.name].append(SourcedGraph(idx, g))
+        for domain_name, sg_list in list(edge_domain_map.items()):
+            domain = self.scenario.find_domain(domain_name)
+            if not self.if_source_fit([sg.g for sg in sg_list], domain):
+                for sg in edge_domain_map.pop(domain_name):
+                    results[sg.idx] = SchedulingResult.failed(
+                        "insufficient resource for sources"
+                    )
+
+        if len(edge_domain_map) == 0:
+            return results
+
+        if self.pool is None:
+            self.start_pool()
+        with self.tracer.span("domain_workers"):
+            self.occupancy.publish(
+                self.scenario.topo,
+                [
+                    h.uuid
+                    for name in edge_domain_map.keys()
+                    for h in self.scenario.find_domain(name).topo.get_hosts()
+                ],
+            )
+            self.broker.reset(cloud_domain.topo.get_hosts())
+            outcomes = self.pool.map(schedule_domain, list(edge_domain_map.items()))
+
+        t_indexes, t_graph_list, s_results = [], [], {}
+        for outcome in outcomes:
+            edge_domain = self.scenario.find_domain(outcome.domain_name)
+            self.occupancy.apply(
+                self.scenario.topo, [h.uuid for h in edge_domain.topo.get_hosts()]
+            )
+            provisioner = self.get_provisioner(outcome.domain_name)
+            for idx, s_result, t_graph in outcome.placed:
+                s_graph = graph_list[idx].sub_graph(
+                    set([vid for vid, _ in s_result.get_assignments()]),
+                    graph_list[idx].uuid,
+                )
+                provisioner.adopt(s_graph, s_result)
+                s_results[idx] = s_result
+                t_indexes.append(idx)
+                t_graph_list.append(t_graph)
+            for idx, reason in outcome.failed:
+                results[idx] = SchedulingResult.failed(reason)
+
+        with self.tracer.span("cloud_provision"):
+            t_result_list = self.get_provisioner(cloud_domain.name).schedule_multiple(
+                t_graph_list
+            )
+        with self.tracer.span("merge"):
+            for idx, t_result in zip(t_indexes, t_result_list):
+                results[idx] = SchedulingResult.merge(s_results[idx], t_result)
+                if results[idx].status == SchedulingResultStatus.FAILED:
+                    self.delete_graph(graph_list[idx], results[idx])
+        return results
@@ -3,18 +3,21 @@ import typing
 from abc import ABC, abstractmethod
 from functools import partial
 
-from graph import ExecutionGraph
-from topo import Domain
+from graph import ExecutionGraph, Vertex
+from topo import Domain, Resources
 from utils import gen_uuid
 
 from .result import SchedulingResult, SchedulingResultStatus
+from .trace import NULL_TRACER, Tracer, traced
 
 
 class Provisioner(ABC):
     domain: Domain
+    tracer: Tracer
 
     def __init__(self, domain: Domain) -> None:
         self.domain = domain
+        self.tracer = NULL_TRACER
 
     @abstractmethod
     def schedule(self, graph: ExecutionGraph) -> SchedulingResult:
@@ -26,6 +29,16 @@ class Provisioner(ABC):
     ) -> typing.List[SchedulingResult]:
         raise NotImplementedError()
 
+    def schedule_near(self, graph: ExecutionGraph, hostname: str) -> SchedulingResult:
+        """place a (sub) graph preferably close to the given host"""
+        return self.schedule(graph)
+
+    def adopt(self, graph: ExecutionGraph, result: SchedulingResult) -> None:
+        """record a placement made on a copy of this provisioner (e.g. in a
+        worker process), so that delete_graph releases it. the resources are
+        expected to be occupied already"""
+        pass
+
     def check_graph_domain(self, graph: ExecutionGraph) -> bool:
         for v in graph.get_vertices():
             if (
@@ -43,9 +56,10 @@ class RandomProvisioner(Provisioner):
 
         result = SchedulingResult()
         for v in graph.topological_order():
+            demand = Resources.of_vertex(v)
             nid_list = list(
                 filter(
-                    partial(self.domain.topo.slot_filter, 1),
+                    partial(self.domain.topo.resource_filter, demand),
                     filter(
                         partial(self.domain.topo.label_filter, v.domain_constraint),
                         [h.uuid for h in self.domain.get_hosts()],
@@ -56,10 +70,11 @@ class RandomProvisioner(Provisioner):
                 return SchedulingResult.failed("no available host")
             nid = random.choice(nid_list)
             result.assign(nid, v.uuid)
-            self.domain.topo.occupy_node(nid, 1)
+            self.domain.topo.occupy_resources(nid, demand)
 
         return result
 
+    @traced
     def schedule_multiple(
         self, graph_list: typing.List[ExecutionGraph]
     ) -> typing.List[SchedulingResult]:
@@ -71,3 +86,37 @@ class RandomProvisioner(Provisioner):
             big_result.extract(set([v.uuid for v in g.get_vertices()]))
             for g in graph_list
         ]
+
+
+def replicas_together(vertices: typing.List[Vertex]) -> typing.List[Vertex]:
+    """the (topological) order with the replicas of a vertex moved up to the
+    first of them, still topological as replicas share all their neighbours"""
+    members: typing.Dict[str, typing.List[Vertex]] = {}
+    for v in vertices:
+        if v.replica_of is not None:
+            members.setdefault(v.replica_of, []).append(v)
+    if len(members) == 0:
+        return vertices
+    order = []
+    for v in vertices:
+        if v.replica_of is None:
+            order.append(v)
+        elif members[v.replica_of][0] is v:
+            order += members[v.replica_of]
+    return order
+
+
+def align_replicas(vertices: typing.List[Vertex], n: int, spread: bool = True) -> int:
+    """the longest prefix of at most n vertices not splitting a replica group,
+    replicas are placed as a unit. if the first group alone does not fit, it is
+    spread (n) or left out (0)"""
+    m = n
+    while (
+        0 < m < len(vertices)
+        and vertices[m].replica_of is not None
+        and vertices[m].replica_of == vertices[m - 1].replica_of
+    ):
+        m -= 1
+    if m > 0:
+        return m
+    return n if spread else 0
@@ -0,0 +1,239 @@
+import logging
+import typing
+from collections import defaultdict
+
+from utils import get_logger
+
+from .flow_scheduler import FlowScheduler
+from .latency import EdgeKey, IncrementalLatencyCalculator, ScheduledGraph
+from .local_search import Migration
+from .result import SchedulingResult, SchedulingResultStatus
+
+
+class MigrationCandidate(typing.NamedTuple):
+    graph: str
+    vertex: str
+    dst: str
+    gain: int  # bandwidth moved off bottleneck links, bytes per second
+    covers: typing.FrozenSet[EdgeKey]  # back-pressured edges relieved
+
+
+class ReschedulingStats(typing.NamedTuple):
+    rounds: int
+    migrations: int
+    initial_bp: float
+    final_bp: float
+
+
+class BackPressureRescheduler:
+    """closed loop over scheduled graphs: find back-pressured edges, take the
+    most utilized link on their route as the bottleneck, and migrate the
+    smallest set of operators (greedy set cover) that moves these edges off
+    their bottlenecks. rounds repeat until the mean back-pressure stops
+    improving, a round making it worse is reverted.
+
+    NOTE graphs are placed through the FlowScheduler's provisioners, graphs
+    placed by its random fallback are left untouched"""
+
+    logger: logging.Logger
+
+    def __init__(
+        self,
+        scheduler: FlowScheduler,
+        calculator: IncrementalLatencyCalculator,
+        max_rounds: int = 10,
+        min_improvement: float = 1e-6,
+    ) -> None:
+        self.logger = get_logger(self.__class__.__name__)
+        self.scheduler = scheduler
+        self.calculator = calculator
+        self.topo = calculator.topo
+        self.max_rounds = max_rounds
+        self.min_improvement = min_improvement
+        self.route_cache: typing.Dict[typing.Tuple[str, str], typing.List[str]] = {}
+
+    def route(self, a: str, b: str) -> typing.List[str]:
+        if (a, b) not in self.route_cache:
+            self.route_cache[(a, b)] = self.topo.get_n2n_links(a, b)
+        return self.route_cache[(a, b)]
+
+    def mean_back_pressure(self) -> float:
+        _, bp = self.calculator.compute_latency()
+        return sum(bp.values()) / len(bp) if len(bp) > 0 else 0
+
+    # SECTION: candidates
+
+    def bottlenecks(
+        self, back_pressure: typing.Dict[EdgeKey, float]
+    ) -> typing.Dict[EdgeKey, str]:
+        """the most utilized link on the route of every back-pressured edge"""
+        utilization = {
+            d["uuid"]: d["occupied"] / d["bd"]
+            for _, _, d in self.topo.g.edges(data=True)
+        }
+        bottlenecks = {}
+        for key in back_pressure.keys():
+            result = self.calculator.graph_map[key[0]].result
+            links = self.route(
+                result.get_scheduled_node(key[1]), result.get_scheduled_node(key[2])
+            )
+            if len(links) > 0:
+                bottlenecks[key] = max(links, key=lambda link: utilization[link])
+        return bottlenecks
+
+    def candidates(
+        self, bottlenecks: typing.Dict[EdgeKey, str]
+    ) -> typing.List[MigrationCandidate]:
+        """move either end of a back-pressured edge to the host of the other end,
+        candidates not reducing the bandwidth over bottleneck links are dropped"""
+        congested = set(bottlenecks.values())
+        proposals: typing.Set[typing.Tuple[str, str, str]] = set()
+        for gid, u, v in bottlenecks.keys():
+            if gid in self.scheduler.random_scheduled:
+                continue
+            sg = self.calculator.graph_map[gid]
+            for x, y in [(u, v), (v, u)]:
+                if sg.graph.get_vertex(x).domain_constraint.get("host") is None:
+                    proposals.add((gid, x, sg.result.get_scheduled_node(y)))
+
+        candidates = []
+        for gid, vid, dst in proposals:
+            sg = self.calculator.graph_map[gid]
+            src = sg.result.get_scheduled_node(vid)
+            gain = 0
+            covers = set()
+            incident = [(w.uuid, vid, w.uuid) for w in sg.graph.get_up_vertices(vid)]
+            incident += [(vid, w.uuid, w.uuid) for w in sg.graph.get_down_vertices(vid)]
+            for a, b, w in incident:
+                d = sg.graph.get_edge(a, b)
+                peer = sg.result.get_scheduled_node(w)
+                before = set(self.route(src, peer)) & congested
+                after = set(self.route(dst, peer)) & congested
+                gain += d["unit_size"] * d["per_second"] * (len(before) - len(after))
+                key = (gid, a, b)
+                if key in bottlenecks and bottlenecks[key] not in after:
+                    covers.add(key)
+            if gain > 0 and len(covers) > 0:
+                candidates.append(
+                    MigrationCandidate(gid, vid, dst, gain, frozenset(covers))
+                )
+        return candidates
+
+    def select(
+        self,
+        candidates: typing.List[MigrationCandidate],
+        bottlenecks: typing.Dict[EdgeKey, str],
+    ) -> typing.List[MigrationCandidate]:
+        """greedy minimum cover of back-pressured edges, one move per vertex and
+        no more moves into a domain than its free slots"""
+        free_slots: typing.Dict[str, int] = {}
+        uncovered = set(bottlenecks.keys())
+        moved: typing.Set[typing.Tuple[str, str]] = set()
+        selected = []
+        remaining = list(candidates)
+        while len(uncovered) > 0 and len(remaining) > 0:
+            best = max(remaining, key=lambda c: (len(c.covers & uncovered), c.gain))
+            if len(best.covers & uncovered) == 0:
+                break
+            remaining.remove(best)
+            if (best.graph, best.vertex) in moved:
+                continue
+            domain = self.scheduler.find_host_domain(best.dst)
+            if domain.name not in free_slots:
+                free_slots[domain.name] = domain.free_slots()
+            if free_slots[domain.name] <= 0:
+                continue
+            free_slots[domain.name] -= 1
+            moved.add((best.graph, best.vertex))
+            uncovered -= best.covers
+            selected.append(best)
+        return selected
+
+    # SECTION: migration
+
+    def migrate(
+        self, gid: str, moves: typing.Dict[str, typing.Set[str]]
+    ) -> typing.List[Migration]:
+        """move vertices of a graph, grouped by target host. if a move fails the
+        graph is put back where it was and no migration is made"""
+        sg = self.calculator.graph_map[gid]
+        self.calculator.remove_scheduled_graph(gid)
+        result = sg.result
+        for dst, vids in moves.items():
+            moved = self.scheduler.migrate(sg.graph, result, vids, dst)
+            if moved.status == SchedulingResultStatus.FAILED:
+                self.logger.debug("migration of %s failed: %s", gid, moved.reason)
+                result = self.restore(sg, result)
+                break
+            result = moved
+        if result is None:
+            return []
+        self.calculator.add_scheduled_graph(sg.graph, result)
+        migrations = []
+        for v in sg.graph.get_vertices():
+            src = sg.result.get_scheduled_node(v.uuid)
+            dst = result.get_scheduled_node(v.uuid)
+            if src != dst:
+                migrations.append(Migration(gid, v.uuid, src, dst))
+        return migrations
+
+    def restore(
+        self, sg: ScheduledGraph, placed: SchedulingResult
+    ) -> typing.Optional[SchedulingResult]:
+        """put a graph back on its original hosts after a failed move, placed is
+        the result of its vertices still placed. if the hosts were taken in the
+        meantime the graph is scheduled anew, or dropped if that fails too"""
+        self.scheduler.delete_graph(sg.graph, placed)
+        if self.scheduler.place_back(sg.graph, sg.result):
+            return sg.result
+        result = self.scheduler.schedule_multiple([sg.graph])[0]
+        if result.status != SchedulingResultStatus.FAILED:
+            return result
+        self.logger.warning("graph %s dropped: %s", sg.graph.uuid, result.reason)
+        return None
+
+    def step(self) -> typing.List[Migration]:
+        back_pressure = self.calculator.compute_edge_back_pressure()
+        bottlenecks = self.bottlenecks(back_pressure)
+        selected = self.select(self.candidates(bottlenecks), bottlenecks)
+        graph_moves: typing.Dict[str, typing.Dict[str, typing.Set[str]]] = {}
+        for c in selected:
+            graph_moves.setdefault(c.graph, defaultdict(set))[c.dst].add(c.vertex)
+        migrations = []
+        for gid, moves in graph_moves.items():
+            migrations += self.migrate(gid, moves)
+        return migrations
+
+    def revert(self, migrations: typing.List[Migration]) -> None:
+        graph_moves: typing.Dict[str, typing.Dict[str, typing.Set[str]]] = {}
+        for m in migrations:
+            graph_moves.setdefault(m.graph, defaultdict(set))[m.src].add(m.vertex)
+        for gid, moves in graph_moves.items():
+            self.migrate(gid, moves)
+
+    def run(self) -> ReschedulingStats:
+        initial_bp = bp = self.mean_back_pressure()
+        rounds = n_migrations = 0
+        while rounds < self.max_rounds and bp > 0:
+            rounds += 1
+            migrations = self.step()
+            if len(migrations) == 0:
+                break
+            new_bp = self.mean_back_pressure()
+            self.logger.debug(
+                "round %d: %d migrations, bp %.4f -> %.4f",
+                rounds,
+                len(migrations),
+                bp,
+                new_bp,
+            )
+            if new_bp > bp:
+                self.revert(migrations)
+                break
+            n_migrations += len(migrations)
+            if new_bp > bp - self.min_improvement:
+                bp = new_bp
+                break
+            bp = new_bp
+        bp = self.mean_back_pressure()
+        return ReschedulingStats(rounds, n_migrations, initial_bp, bp)
@@ -55,6 +55,15 @@ class SchedulingResult:
                 result.assign(self.get_scheduled_node(vid), vid)
         return result
 
+    def expand(self, groups: typing.Dict[str, typing.List[str]]):
+        """map vertices of a fused graph back to the vertices fused into them,
+        see ExecutionGraph.fused_groups"""
+        result = SchedulingResult(self.status, self.reason)
+        for vid, nid in self.get_assignments():
+            for member in groups.get(vid, [vid]):
+                result.assign(nid, member)
+        return result
+
     @classmethod
     def merge(cls, *results):
         merged_result = SchedulingResult()
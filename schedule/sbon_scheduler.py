@@ -8,6 +8,7 @@ from vivaldi import vivaldi_compute, constrained_balance, create_coordinate_clas
 
 from .result import SchedulingResult, SchedulingResultStatus
 from .scheduler import RandomScheduler, Scheduler, SourcedGraph
+from .trace import traced
 
 Coord3D = create_coordinate_class(3)
 
@@ -26,6 +27,7 @@ class SBONScheduler(Scheduler):
     def schedule(self, g: ExecutionGraph) -> SchedulingResult:
         return self.schedule_multiple([g])
 
+    @traced
     def schedule_multiple(
         self, graph_list: typing.List[ExecutionGraph]
     ) -> typing.List[SchedulingResult]:
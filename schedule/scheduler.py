@@ -3,13 +3,14 @@ import random
 import typing
 from abc import ABC, abstractmethod
 from collections import defaultdict
-from functools import partial
 
-from graph import ExecutionGraph
-from topo import Domain, Scenario, Topology
+from graph import ExecutionGraph, Vertex
+from topo import Domain, Resources, Scenario, Topology
 from utils import gen_uuid, get_logger
 
+from .packing import HEURISTICS, HostIndex
 from .result import SchedulingResult, SchedulingResultStatus
+from .trace import NULL_TRACER, Tracer, traced
 
 
 class SourcedGraph(typing.NamedTuple):
@@ -19,10 +20,16 @@ class SourcedGraph(typing.NamedTuple):
 
 class Scheduler(ABC):
     logger: logging.Logger
+    tracer: Tracer
 
     def __init__(self, scenario: Scenario) -> None:
         self.logger = get_logger(self.__class__.__name__)
         self.scenario = scenario
+        self.tracer = NULL_TRACER
+
+    def set_tracer(self, tracer: Tracer) -> None:
+        """report spans & counters of scheduling calls to tracer"""
+        self.tracer = tracer
 
     @abstractmethod
     def schedule(self, g: ExecutionGraph) -> SchedulingResult:
@@ -34,6 +41,14 @@ class Scheduler(ABC):
     ) -> typing.List[SchedulingResult]:
         raise NotImplementedError()
 
+    def delete_graph(self, graph: ExecutionGraph, result: SchedulingResult) -> None:
+        """release slots taken by a scheduled graph, links are released by
+        LatencyCalculator"""
+        for v in graph.get_vertices():
+            nid = result.get_scheduled_node(v.uuid)
+            if nid is not None:
+                self.scenario.topo.release_resources(nid, Resources.of_vertex(v))
+
     def if_source_in_single_domain(self, g: ExecutionGraph) -> typing.Optional[Domain]:
         domain_set = set()
         for s in g.get_sources():
@@ -47,12 +62,15 @@ class Scheduler(ABC):
     def if_source_fit(
         self, graph_list: typing.List[ExecutionGraph], domain: Domain
     ) -> bool:
-        host_vertex_count = defaultdict(int)
+        host_demand: typing.Dict[str, Resources] = defaultdict(Resources.zero)
         for g in graph_list:
             for s in g.get_sources():
-                host_vertex_count[s.domain_constraint["host"]] += 1
+                hostname = s.domain_constraint["host"]
+                host_demand[hostname] = host_demand[hostname].add(
+                    Resources.of_vertex(s)
+                )
 
-        for hostname, count in host_vertex_count.items():
+        for hostname, demand in host_demand.items():
             host = domain.find_host(hostname)
             if host is None:
                 return False
@@ -61,12 +79,20 @@ class Scheduler(ABC):
             #     count,
             #     host.node.slots - host.node.occupied,
             # )
-            if not domain.topo.slot_filter(count, host.node.uuid):
+            if not domain.topo.resource_filter(demand, host.node.uuid):
                 return False
         return True
 
 
 class RandomScheduler(Scheduler):
+    """heuristic -- random: a random host where the vertex's resource vector
+    (slots, memory, cpu) fits, or one of the vector bin packing HEURISTICS"""
+
+    def __init__(self, scenario: Scenario, heuristic: str = "random") -> None:
+        super().__init__(scenario)
+        assert heuristic == "random" or heuristic in HEURISTICS
+        self.heuristic = heuristic
+
     def schedule(self, graph: ExecutionGraph, topo: Topology) -> SchedulingResult:
         """schedule vertex in topological order (source would be scheduled first)"""
 
@@ -78,30 +104,58 @@ class RandomScheduler(Scheduler):
                 return SchedulingResult.failed("insufficient resource for sources")
 
         result = SchedulingResult()
+        index = HostIndex(topo)
         ordered_vertices = (
             graph.get_sources() + graph.get_operators() + graph.get_sinks()
         )
+        # NOTE replicas of a vertex are placed as a unit, one after another,
+        # spread over distinct hosts where possible
+        groups = graph.replica_groups()
+        group_order = []
         for v in ordered_vertices:
-            nid_list = list(
-                filter(
-                    partial(topo.slot_filter, 1),
-                    filter(
-                        partial(topo.label_filter, v.domain_constraint),
-                        [h.uuid for h in topo.get_hosts()],
-                    ),
-                )
-            )
-            if len(nid_list) == 0:
+            if v.replica_of is None:
+                group_order.append(v)
+            elif v.uuid == groups[v.replica_of][0]:
+                group_order += [graph.get_vertex(r) for r in groups[v.replica_of]]
+        ordered_vertices = group_order
+        group_hosts: typing.Dict[str, typing.Set[str]] = defaultdict(set)
+        for v in ordered_vertices:
+            demand = Resources.of_vertex(v)
+            nid = self.select_host(index, v, demand, group_hosts[v.replica_of])
+            if nid is None:
+                # NOTE roll back vertices occupied so far
+                for u in ordered_vertices:
+                    if result.get_scheduled_node(u.uuid) is not None:
+                        topo.release_resources(
+                            result.get_scheduled_node(u.uuid), Resources.of_vertex(u)
+                        )
                 return SchedulingResult.failed(
                     "no available host for {}".format(v.uuid)
                 )
-            nid = random.choice(nid_list)
             # self.logger.debug("Select node %s for vertex %s", nid, v.uuid)
             result.assign(nid, v.uuid)
-            topo.occupy_node(nid, 1)
+            index.commit(nid, demand)
+            assert topo.occupy_resources(nid, demand)
+            if v.replica_of is not None:
+                group_hosts[v.replica_of].add(nid)
 
         return result
 
+    def select_host(
+        self, index: HostIndex, v: Vertex, demand: Resources, avoid: typing.Set[str]
+    ) -> typing.Optional[str]:
+        """hosts not in avoid (taken by other replicas of the vertex) first"""
+        if self.heuristic == "random":
+            nid_list = index.feasible(demand, v.domain_constraint)
+            spread = [nid for nid in nid_list if nid not in avoid]
+            nid_list = spread if len(spread) > 0 else nid_list
+            return random.choice(nid_list) if len(nid_list) > 0 else None
+        nid = index.select(demand, v.domain_constraint, self.heuristic, avoid)
+        if nid is None and len(avoid) > 0:
+            nid = index.select(demand, v.domain_constraint, self.heuristic)
+        return nid
+
+    @traced
     def schedule_multiple(
         self, graph_list: typing.List[ExecutionGraph], topo: Topology
     ) -> typing.List[SchedulingResult]:
@@ -0,0 +1,52 @@
+import os
+
+import yaml
+from topo import Scenario
+
+from .flat_provisioner import FlatProvisioner
+from .test_flow_provisioner import graph1, graph2
+
+
+def load_scenario(name: str) -> Scenario:
+    with open(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "../samples", name),
+        "r",
+    ) as f:
+        return Scenario.from_dict(yaml.load(f.read(), Loader=yaml.Loader))
+
+
+def test_flat_domain_detection():
+    sc = load_scenario("1e3h.yaml")
+    assert FlatProvisioner.applicable(sc.get_cloud_domains()[0])
+    assert FlatProvisioner.applicable(sc.get_edge_domains()[0])
+
+
+def test_bulk_placement_and_deletion():
+    sc = load_scenario("1e3h.yaml")
+    domain = sc.get_edge_domains()[0]
+    provisioner = FlatProvisioner(domain)
+    # NOTE each rasp host has 8 slots
+    g1, g2 = graph1(), graph2()
+    results = provisioner.schedule_multiple([g2, g1])
+    assert results[0].check_complete(g2)
+    assert results[0].get_scheduled_node("v2_1") == "rasp1"
+    assert results[1].check_complete(g1)
+    assert sum([h.node.occupied for h in provisioner.hosts]) == len(g1) + len(g2)
+
+    provisioner.delete_graph(g1)
+    assert sum([h.node.occupied for h in provisioner.hosts]) == len(g2)
+    assert provisioner.schedule(graph1()).check_complete(g1)
+
+
+def test_only_taking_hosts_are_occupied():
+    sc = load_scenario("1e3h.yaml")
+    provisioner = FlatProvisioner(sc.get_edge_domains()[0])
+    occupied = []
+    for h in provisioner.hosts:
+        occupy = h.node.occupy_resources
+        h.node.occupy_resources = lambda demand, occupy=occupy, name=h.name: (
+            occupied.append(name) or occupy(demand)
+        )
+    # NOTE graph2 fits next to its source on rasp1
+    assert provisioner.schedule(graph2()).check_complete(graph2())
+    assert occupied == ["rasp1"]
@@ -7,6 +7,7 @@ from graph import ExecutionGraph, Vertex
 from topo import Node, Scenario
 from utils import gen_uuid, get_logger
 
+from .convergence import ConvergenceGuard
 from .flow_provisioner import ProvisionNode, TopologicalProvisioner
 
 logger = get_logger("Provisioner Test")
@@ -36,7 +37,7 @@ def test_single_node_provisioning():
     p_node.add_child(None)
     p_node.children_slots[0] = 3
     _, parent_scatter, child_scatters = p_node.step()
-    logger.info([v.uuid for v in p_node.scheduled_vertices])
+    logger.info(list(p_node.scheduled_vertices.keys()))
     logger.info(parent_scatter)
     logger.info(child_scatters)
 
@@ -98,7 +99,7 @@ def test_branch_offloading():
             n.name,
             n.local_slots - n.node.occupied,
             n.children_slots,
-            [v.uuid for v in n.scheduled_vertices],
+            list(n.scheduled_vertices.keys()),
         )
     )
 
@@ -141,3 +142,102 @@ def graph2() -> ExecutionGraph:
 
 def vs_to_set(vs: typing.List[Vertex]):
     return set([v.uuid for v in vs])
+
+
+def test_event_driven_rounds():
+    sc = Scenario.from_dict(
+        yaml.load(
+            open(
+                os.path.join(
+                    os.path.dirname(os.path.abspath(__file__)),
+                    "../samples/provisioner_1.yaml",
+                )
+            ),
+            Loader=yaml.Loader,
+        )
+    )
+    provisioner = TopologicalProvisioner(sc.get_edge_domains()[0])
+    assert len(provisioner.tree.dirty_nodes) == 0
+    rounds = provisioner.tree.step_count
+    node_steps = provisioner.tree.node_step_count
+
+    g2 = graph2()
+    g2 = g2.sub_graph(
+        vs_to_set(g2.get_sources()).union(vs_to_set(g2.get_operators())), g2.uuid
+    )
+    result = provisioner.schedule(g2)
+    assert result.check_complete(g2)
+    # NOTE only the source host and its ancestors are involved
+    involved = 0
+    node = provisioner.tree.name_lookup_map["rasp1"]
+    while node is not None:
+        involved += 1
+        node = node.parent
+    assert involved == 3
+    rounds = provisioner.tree.step_count - rounds
+    assert rounds > 0
+    assert provisioner.tree.node_step_count - node_steps <= rounds * involved
+    logger.info(
+        "rounds: %d, node steps: %d, messages: %d",
+        provisioner.tree.step_count,
+        provisioner.tree.node_step_count,
+        provisioner.tree.message_count,
+    )
+
+
+def test_fallback_placement_on_round_budget():
+    sc = Scenario.from_dict(
+        yaml.load(
+            open(
+                os.path.join(
+                    os.path.dirname(os.path.abspath(__file__)),
+                    "../samples/provisioner_1.yaml",
+                )
+            ),
+            Loader=yaml.Loader,
+        )
+    )
+    provisioner = TopologicalProvisioner(
+        sc.get_edge_domains()[0], ConvergenceGuard(max_rounds=1)
+    )
+    g1 = graph1()
+    g1 = g1.sub_graph(
+        vs_to_set(g1.get_sources()).union(vs_to_set(g1.get_operators())), g1.uuid
+    )
+    result = provisioner.schedule(g1)
+    assert result.check_complete(g1)
+    assert "fallback" in [e.kind for e in provisioner.guard.events]
+    assert len(provisioner.tree.dirty_nodes) == 0
+    # NOTE events are kept for the last rebalance only
+    provisioner.rebalance()
+    assert provisioner.guard.events == []
+
+
+def test_sync_slots_from_capacity():
+    sc = Scenario.from_dict(
+        yaml.load(
+            open(
+                os.path.join(
+                    os.path.dirname(os.path.abspath(__file__)),
+                    "../samples/provisioner_1.yaml",
+                )
+            ),
+            Loader=yaml.Loader,
+        )
+    )
+    domain = sc.get_edge_domains()[0]
+    provisioner = TopologicalProvisioner(domain)
+    # NOTE slots taken outside the provisioner, e.g. by another scheduler
+    assert domain.find_host("rasp1").node.occupy(1)
+    assert domain.find_host("rasp2").node.occupy(2)
+
+    g2 = graph2()
+    g2 = g2.sub_graph(
+        vs_to_set(g2.get_sources()).union(vs_to_set(g2.get_operators())), g2.uuid
+    )
+    result = provisioner.schedule(g2)
+    assert result.check_complete(g2)
+    assert result.get_scheduled_node("v2_2") == domain.find_host("rasp3").node.uuid
+    assert domain.free_slots() == 1
+    # NOTE with stale children slots, g2 bounces off rasp2 until fallback
+    assert len(provisioner.guard.events) == 0
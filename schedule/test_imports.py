@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# NOTE wall seconds, generous for slow machines. third party packages the
+# simulator cannot go without (networkx, numpy, yaml) are imported untimed
+PACKAGE_BUDGET = 0.05
+SCHEDULER_BUDGET = 0.3
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import schedule
+package = time.perf_counter() - start
+import networkx, numpy, yaml
+start = time.perf_counter()
+from schedule import FlowScheduler, LatencyCalculator
+flow = time.perf_counter() - start
+loaded = [m for m in {} if m in sys.modules]
+schedule.get_scheduler("sbon")
+print(json.dumps([package, flow, loaded, "vivaldi" in sys.modules]))
+"""
+
+
+def test_headless_import_budget():
+    heavy = ["IPython", "tqdm", "coloredlogs", "vivaldi", "schedule.sbon_scheduler"]
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy)],
+        cwd=ROOT,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    package, flow, loaded, sbon_loaded = json.loads(output)
+    assert loaded == []
+    assert sbon_loaded
+    assert package < PACKAGE_BUDGET, package
+    assert flow < SCHEDULER_BUDGET, flow
@@ -0,0 +1,127 @@
+import random
+
+from graph import ExecutionGraph, Vertex
+from topo import Resources
+
+from .local_search import Migration, PlacementOptimizer
+from .result import SchedulingResult
+from .test_latency import chain_graph, load_scenario, random_result
+from .test_packing import assert_not_oversubscribed
+
+
+def cross_host_bd(graphs, results):
+    total = 0
+    for g, r in zip(graphs, results):
+        for u, v, d in g.get_edges():
+            if r.get_scheduled_node(u) != r.get_scheduled_node(v):
+                total += d["unit_size"] * d["per_second"]
+    return total
+
+
+def test_annealing_improves_placement():
+    random.seed(0)
+    sc = load_scenario()
+    graphs = [chain_graph("g" + str(i), "rasp" + str(i % 3 + 1)) for i in range(6)]
+    results = [random_result(sc, g) for g in graphs]
+    occupied = {n.uuid: n.occupied for n in sc.topo.get_hosts()}
+
+    optimizer = PlacementOptimizer(sc.topo, rng=random.Random(0))
+    new_results, migrations = optimizer.optimize(graphs, results, max_moves=5000)
+    stats = optimizer.stats
+    assert stats.best_cost < stats.initial_cost
+    # NOTE incremental deltas add up to the full cost
+    assert abs(optimizer.total_cost() - stats.best_cost) < 1e-6
+    assert cross_host_bd(graphs, new_results) < cross_host_bd(graphs, results)
+
+    for g, r in zip(graphs, new_results):
+        assert r.check_complete(g)
+        for v in g.get_vertices():
+            if v.domain_constraint.get("host") is not None:
+                assert r.get_scheduled_node(v.uuid) == v.domain_constraint["host"]
+    # NOTE the topology is untouched until migrations are applied
+    assert {n.uuid: n.occupied for n in sc.topo.get_hosts()} == occupied
+    optimizer.apply_migrations(migrations)
+    placed = [
+        r.get_scheduled_node(v.uuid)
+        for g, r in zip(graphs, new_results)
+        for v in g.get_vertices()
+    ]
+    for n in sc.topo.get_hosts():
+        assert n.occupied == placed.count(n.uuid) <= n.slots
+
+
+def test_annealing_under_memory_limits():
+    random.seed(1)
+    sc = load_scenario()
+    graphs = [chain_graph("g" + str(i), "rasp" + str(i % 3 + 1)) for i in range(6)]
+    hosts = [h.uuid for h in sc.topo.get_hosts()]
+    results = []
+    for g in graphs:
+        result = SchedulingResult()
+        for v in g.get_vertices():
+            if v.type == "operator":
+                # NOTE 2 operators fill the memory of a rasp, not its 8 slots
+                v.data["memory"] = int(1.5e9)
+            demand = Resources.of_vertex(v)
+            host = v.domain_constraint.get("host")
+            if host is None:
+                nodes = [sc.topo.get_node(h) for h in hosts]
+                host = random.choice(
+                    [n.uuid for n in nodes if n.free_resources().fits(demand)]
+                )
+            assert sc.topo.occupy_resources(host, demand)
+            result.assign(host, v.uuid)
+        results.append(result)
+
+    optimizer = PlacementOptimizer(sc.topo, rng=random.Random(0))
+    new_results, migrations = optimizer.optimize(graphs, results, max_moves=5000)
+    stats = optimizer.stats
+    assert stats.best_cost < stats.initial_cost
+    assert abs(optimizer.total_cost() - stats.best_cost) < 1e-6
+    assert optimizer.apply_migrations(migrations)
+    assert_not_oversubscribed(sc)
+    # NOTE operators are drawn to their sources until memory, not slots, runs out
+    for i in range(1, 4):
+        free = sc.topo.get_node("rasp" + str(i)).free_resources()
+        assert free.memory < 1.5e9 and free.slots > 0
+
+
+def memory_bound_graph(name: str, source_host: str) -> ExecutionGraph:
+    """a 3 GB operator, 2 of which do not fit a rasp"""
+    g = ExecutionGraph(name)
+    source = Vertex.from_spec(name + "-s", "source", {"host": source_host}, 0, 0, 0, 0)
+    operator = Vertex.from_spec(name + "-o", "operator", {}, 0, 0, 0, int(3e9))
+    sink = Vertex.from_spec(name + "-t", "sink", {"host": "cloud1"}, 0, 0, 0, 0)
+    for v in [source, operator, sink]:
+        g.add_vertex(v)
+    g.connect(source, operator, 50000, 20)
+    g.connect(operator, sink, 1000, 10)
+    return g
+
+
+def test_memory_bound_migrations():
+    sc = load_scenario()
+    graphs = [memory_bound_graph("g0", "rasp1"), memory_bound_graph("g1", "rasp2")]
+    # NOTE each operator away from its source, moving one back needs a swap
+    placement = [["rasp1", "rasp2", "cloud1"], ["rasp2", "rasp1", "cloud1"]]
+    results = []
+    for g, hosts in zip(graphs, placement):
+        result = SchedulingResult()
+        for v, host in zip(g.get_vertices(), hosts):
+            result.assign(host, v.uuid)
+            assert sc.topo.occupy_resources(host, Resources.of_vertex(v))
+        results.append(result)
+
+    optimizer = PlacementOptimizer(sc.topo, rng=random.Random(0))
+    new_results, migrations = optimizer.optimize(graphs, results, max_moves=2000)
+    assert optimizer.stats.best_cost < optimizer.stats.initial_cost
+    assert new_results[0].get_scheduled_node("g0-o") == "rasp1"
+    assert new_results[1].get_scheduled_node("g1-o") == "rasp2"
+    assert optimizer.apply_migrations(migrations)
+    assert_not_oversubscribed(sc)
+
+    # NOTE a migration that does not fit leaves the topology as it was
+    state = sc.topo.get_state()
+    migrations = [Migration("g1", "g1-o", "rasp2", "rasp1")]
+    assert not optimizer.apply_migrations(migrations)
+    assert (sc.topo.get_state().node_usage == state.node_usage).all()
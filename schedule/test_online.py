@@ -0,0 +1,59 @@
+import random
+
+from .flow_scheduler import FlowScheduler
+from .online import Arrival, Histogram, OnlineEngine, poisson_arrivals
+from .test_latency import chain_graph, load_scenario
+
+
+def edge_hosts(sc):
+    return [h.name for d in sc.get_edge_domains() for hrg in d.hrgs for h in hrg.hosts]
+
+
+def test_online_engine_releases_resources():
+    random.seed(0)
+    sc = load_scenario()
+    free_slots = {d.name: d.free_slots() for d in sc.domains}
+    hosts = edge_hosts(sc)
+    graphs = (chain_graph("g" + str(i), random.choice(hosts)) for i in range(200))
+
+    engine = OnlineEngine(sc, FlowScheduler(sc))
+    engine.submit(poisson_arrivals(graphs, 1, 10, random.Random(0)))
+    stats = engine.run()
+    assert stats.arrivals == 200
+    assert stats.accepted + stats.rejected == 200
+    assert stats.departures == stats.accepted > 0
+    assert stats.latency.count == stats.accepted
+    # NOTE with ~10 graphs alive, 24 edge slots are not always enough
+    assert stats.rejected > 0
+    assert {d.name: d.free_slots() for d in sc.domains} == free_slots
+    assert sum([n.occupied for n in sc.topo.get_nodes()]) == 0
+    assert sum([d["occupied"] for _, _, d in sc.topo.g.edges(data=True)]) == 0
+
+
+def test_online_engine_batching_window():
+    random.seed(0)
+    sc = load_scenario()
+    hosts = edge_hosts(sc)
+    engine = OnlineEngine(sc, FlowScheduler(sc), window=5)
+    engine.submit(
+        [
+            Arrival(t, chain_graph("g" + str(t), random.choice(hosts)), 100)
+            for t in range(10)
+        ]
+    )
+    stats = engine.run(until=50)
+    # NOTE arrivals at [0, 5) and [5, 10) are scheduled in two batches
+    assert stats.schedule_time.count == 2
+    assert stats.waiting_time.max == 5
+    assert len(engine.running) == stats.accepted
+    engine.run()
+    assert len(engine.running) == 0
+
+
+def test_histogram():
+    h = Histogram()
+    for i in range(1, 101):
+        h.add(i)
+    assert h.count == 100 and h.mean() == 50.5
+    assert 45 <= h.percentile(50) <= 56
+    assert h.percentile(100) == 100
@@ -0,0 +1,179 @@
+import random
+
+from graph import ExecutionGraph, Vertex
+from topo import Resources
+
+from .flat_provisioner import FlatProvisioner
+from .flow_provisioner import TopologicalProvisioner
+from .flow_scheduler import FlowScheduler, gen_cut_options, keep_replica_groups
+from .packing import HostIndex, vector_binpack
+from .scheduler import RandomScheduler
+from .test_latency import chain_graph, load_scenario
+
+
+def cpu_graph(name: str, n_operator: int, mi: int, memory: int = 0) -> ExecutionGraph:
+    """source on rasp1, operators needing mi * 10 MIPS each, sink on cloud1"""
+    g = ExecutionGraph(name)
+    vs = [Vertex.from_spec(name + "-v0", "source", {"host": "rasp1"}, 0, 0, 0, 0)]
+    vs += [
+        Vertex.from_spec(
+            name + "-v" + str(i), "operator", {"machine": "rasp"}, 0, 0, mi, memory
+        )
+        for i in range(1, n_operator + 1)
+    ]
+    vs += [Vertex.from_spec(name + "-sink", "sink", {"host": "cloud1"}, 0, 0, 0, 0)]
+    for v in vs:
+        g.add_vertex(v)
+    for u, v in zip(vs[:-1], vs[1:]):
+        g.connect(u, v, 1000, 10)
+    return g
+
+
+def assert_not_oversubscribed(sc):
+    for node in sc.topo.get_hosts():
+        free = node.free_resources()
+        assert free.slots >= 0 and free.memory >= 0 and free.cpu >= -1e-6
+
+
+def test_host_index():
+    sc = load_scenario()
+    index = HostIndex(sc.topo)
+    assert index.candidates({"machine": "rasp"}) == ["rasp1", "rasp2", "rasp3"]
+    assert index.candidates({"host": "cloud1"}) == ["cloud1"]
+    assert index.candidates({"machine": "rasp", "host": "cloud1"}) == []
+
+    # NOTE rasp hosts: 8 slots, 4GB, 6000 MIPS
+    heavy_cpu = Resources(1, 0, 4000)
+    assert index.select(heavy_cpu, {"machine": "rasp"}, "first_fit") == "rasp1"
+    index.commit("rasp1", heavy_cpu)
+    assert index.select(heavy_cpu, {"machine": "rasp"}, "first_fit") == "rasp2"
+    assert index.select(heavy_cpu, {"machine": "rasp"}, "dot_product") == "rasp2"
+    assert index.select(Resources(1, 0, 1000), {"machine": "rasp"}, "norm") == "rasp1"
+
+    g = cpu_graph("g", 4, 400)
+    operators = [v for v in g.get_vertices() if v.type == "operator"]
+    assert vector_binpack(index, operators) is None
+    assert index.free["rasp1"].cpu == 2000
+    placement = vector_binpack(index, operators[:2])
+    assert sorted(placement.values()) == ["rasp2", "rasp3"]
+
+
+def test_random_scheduler_respects_cpu():
+    sc = load_scenario()
+    for heuristic in ["random", "dot_product"]:
+        g = cpu_graph("g-" + heuristic, 6, 300)
+        result = RandomScheduler(sc, heuristic).schedule(g, sc.topo)
+        assert result.check_complete(g)
+        assert_not_oversubscribed(sc)
+        for v in g.get_operators():
+            nid = result.get_scheduled_node(v.uuid)
+            assert sc.topo.get_computation_latency(nid, v.mi) == v.mi * 1000 // 3000
+        RandomScheduler(sc).delete_graph(g, result)
+    assert sum([n.occupied for n in sc.topo.get_nodes()]) == 0
+    assert sum([n.cpu_assigned for n in sc.topo.get_nodes()]) == 0
+
+    # NOTE 3 hosts of 6000 MIPS cannot take 7 operators of 3000 MIPS
+    g = cpu_graph("g", 7, 300)
+    assert RandomScheduler(sc).schedule(g, sc.topo).reason.startswith("no available")
+    assert sum([n.occupied for n in sc.topo.get_nodes()]) == 0
+
+
+def test_provisioners_respect_memory_and_cpu():
+    sc = load_scenario()
+    domain = sc.get_edge_domains()[0]
+    provisioner = TopologicalProvisioner(domain)
+    g = cpu_graph("g", 5, 300).sub_graph(
+        set(["g-v" + str(i) for i in range(6)]), "g"
+    )
+    result = provisioner.schedule(g)
+    assert result.check_complete(g)
+    assert provisioner.guard.events == []
+    assert_not_oversubscribed(sc)
+    # NOTE slots alone would keep the whole chain on rasp1
+    assert len(set([nid for _, nid in result.get_assignments()])) == 3
+    provisioner.delete_graph(g)
+    assert sum([n.cpu_assigned for n in sc.topo.get_nodes()]) == 0
+
+    flat = FlatProvisioner(domain)
+    g = cpu_graph("g", 3, 0, int(3e9)).sub_graph(
+        set(["g-v" + str(i) for i in range(4)]), "g"
+    )
+    result = flat.schedule(g)
+    assert result.check_complete(g)
+    assert_not_oversubscribed(sc)
+    assert result.get_scheduled_node("g-v0") == "rasp1"
+    assert len(set([result.get_scheduled_node("g-v" + str(i)) for i in range(4)])) == 3
+    flat.delete_graph(g)
+    assert sum([n.memory_assigned for n in sc.topo.get_nodes()]) == 0
+
+
+def test_memory_bound_cloud():
+    random.seed(0)
+    sc = load_scenario()
+    graphs = [chain_graph("g" + str(i), "rasp" + str(i % 3 + 1)) for i in range(6)]
+    for g in graphs:
+        for v in g.get_vertices():
+            v.data["memory"] = int(1e9)
+    # NOTE the cloud runs out of memory with thousands of slots free
+    cloud = sc.topo.get_node("cloud1")
+    assert sc.topo.occupy_resources(
+        "cloud1", Resources(0, cloud.memory_total - int(3e9), 0)
+    )
+    results = FlowScheduler(sc).schedule_multiple(graphs)
+    placed = [(g, r) for g, r in zip(graphs, results) if r.check_complete(g)]
+    assert 0 < len(placed) < len(graphs)
+    assert_not_oversubscribed(sc)
+    assert sum([n.occupied for n in sc.topo.get_hosts()]) == sum(
+        [len(g) for g, _ in placed]
+    )
+
+
+def test_replicas_placed_as_unit():
+    sc = load_scenario()
+    # NOTE one operator of 9000 MIPS fits no rasp host, three replicas do
+    g = cpu_graph("g", 1, 900)
+    assert RandomScheduler(sc).schedule(g, sc.topo).reason.startswith("no available")
+    assert g.scale_hot_operators(6000) == {"g-v1": 2}
+    g.get_vertex("g-v1").data["parallelism"] = 3
+    expanded = g.expand_parallelism()
+    assert expanded.get_vertex("g-v1#0").cpu == 3000
+    for heuristic in ["random", "first_fit"]:
+        result = RandomScheduler(sc, heuristic).schedule(expanded, sc.topo)
+        assert result.check_complete(expanded)
+        hosts = [result.get_scheduled_node("g-v1#" + str(i)) for i in range(3)]
+        assert sorted(hosts) == ["rasp1", "rasp2", "rasp3"]
+        RandomScheduler(sc).delete_graph(expanded, result)
+
+    groups = expanded.replica_groups()
+    s_cut, t_cut = keep_replica_groups(
+        expanded, groups, set(["g-v0", "g-v1#0"]), set(["g-v1#1", "g-v1#2", "g-sink"])
+    )
+    assert s_cut == set(["g-v0"])
+    for option in gen_cut_options(expanded):
+        assert len(set(groups["g-v1"]) & option.s_cut) in [0, 3]
+
+
+def test_provisioners_keep_replicas_together():
+    # NOTE a prefix of rasp1 would end inside the replica group of g-b
+    g = ExecutionGraph("g")
+    vs = [
+        Vertex.from_spec("g-v0", "source", {"host": "rasp1"}, 0, 0, 0, 0),
+        Vertex.from_spec("g-a", "operator", {}, 0, 0, 0, 0),
+        Vertex.from_spec("g-b", "operator", {}, 0, 0, 0, 0, parallelism=3),
+        Vertex.from_spec("g-sink", "sink", {}, 0, 0, 0, 0),
+    ]
+    for v in vs:
+        g.add_vertex(v)
+    for u, v in zip(vs[:-1], vs[1:]):
+        g.connect(u, v, 1000, 10)
+    expanded = g.expand_parallelism()
+    for provisioner_type in [FlatProvisioner, TopologicalProvisioner]:
+        sc = load_scenario()
+        domain = sc.get_edge_domains()[0]
+        for node in domain.topo.get_hosts():
+            assert node.occupy(node.slots - 3)
+        result = provisioner_type(domain).schedule(expanded)
+        assert result.check_complete(expanded)
+        hosts = [result.get_scheduled_node("g-b#" + str(i)) for i in range(3)]
+        assert len(set(hosts)) == 1
+        assert hosts[0] != "rasp1"
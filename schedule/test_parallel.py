@@ -0,0 +1,122 @@
+import copy
+import multiprocessing
+import os
+import random
+
+import yaml
+from topo import Resources, Scenario
+
+from .flow_scheduler import FlowScheduler
+from .parallel import CloudBroker, ParallelFlowScheduler
+from .result import SchedulingResultStatus
+from .test_latency import chain_graph, load_scenario
+from .test_packing import assert_not_oversubscribed
+
+
+def multi_domain_scenario(n_domain: int) -> Scenario:
+    """1e3h with the edge domain repeated, hosts named rasp_<domain>_<i>"""
+    with open(
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "../samples/1e3h.yaml"
+        ),
+        "r",
+    ) as f:
+        data = yaml.load(f.read(), Loader=yaml.Loader)
+    edge = [d for d in data["domains"] if d["type"] == "edge"][0]
+    data["domains"] = [d for d in data["domains"] if d["type"] != "edge"]
+    for i in range(n_domain):
+        domain = copy.deepcopy(edge)
+        domain["name"] = "edge" + str(i)
+        domain["hrgs"][0]["name"] = "rasp_{}_".format(i)
+        data["domains"].append(domain)
+    return Scenario.from_dict(data)
+
+
+def edge_graphs(sc: Scenario, n: int):
+    hosts = [h.uuid for d in sc.get_edge_domains() for h in d.topo.get_hosts()]
+    return [chain_graph("g" + str(i), random.choice(hosts)) for i in range(n)]
+
+
+def test_parallel_matches_sequential():
+    assignments = []
+    for scheduler_cls in [FlowScheduler, ParallelFlowScheduler]:
+        random.seed(0)
+        sc = multi_domain_scenario(4)
+        graphs = edge_graphs(sc, 24)
+        scheduler = scheduler_cls(sc)
+        # NOTE two calls on one pool, workers see the graphs deleted in between
+        results = scheduler.schedule_multiple(graphs[:12])
+        for g, r in zip(graphs[:4], results[:4]):
+            scheduler.delete_graph(g, r)
+        graphs = graphs[4:]
+        results = results[4:] + scheduler.schedule_multiple(graphs[8:])
+        # NOTE some sources of the second call find their hosts full
+        placed = [
+            (g, r)
+            for g, r in zip(graphs, results)
+            if r.status != SchedulingResultStatus.FAILED
+        ]
+        assert 0 < len(placed) < len(graphs)
+        assert all([r.check_complete(g) for g, r in placed])
+        occupied = {n.uuid: n.occupied for n in sc.topo.get_hosts()}
+        assert sum(occupied.values()) == sum([len(g) for g, _ in placed])
+        assert [d.free_slots() for d in sc.domains] == [
+            sum([n.slots - n.occupied for n in d.topo.get_hosts()]) for d in sc.domains
+        ]
+        assignments.append([(r.status, sorted(r.get_assignments())) for r in results])
+
+        # NOTE placements made in workers are released by the parent
+        for g, r in placed:
+            scheduler.delete_graph(g, r)
+        assert sum([n.occupied for n in sc.topo.get_nodes()]) == 0
+        assert sum([n.cpu_assigned for n in sc.topo.get_nodes()]) == 0
+        if scheduler_cls is ParallelFlowScheduler:
+            assert scheduler.pool is not None
+            scheduler.close()
+    assert assignments[0] == assignments[1]
+
+
+def test_cloud_broker_claims_resources():
+    sc = load_scenario()
+    cloud = sc.topo.get_node("cloud1")
+    assert sc.topo.occupy_resources(
+        "cloud1", Resources(0, cloud.memory_total - int(5e9), 0)
+    )
+    broker = CloudBroker(["cloud1"], multiprocessing.get_context("fork"))
+    broker.reset([cloud])
+    # NOTE thousands of slots are free, memory runs out
+    assert not broker.claim([Resources(1, int(3e9), 0), Resources(1, int(3e9), 0)])
+    assert broker.claim([Resources(1, int(3e9), 0)])
+    assert not broker.claim([Resources(1, int(3e9), 0)])
+    assert broker.claim([Resources(1, int(2e9), 0)])
+    assert list(broker.rows[0]) == [cloud.slots - 2, 0, cloud.cpu_total]
+
+
+def test_parallel_memory_bound_cloud():
+    random.seed(0)
+    sc = multi_domain_scenario(4)
+    graphs = edge_graphs(sc, 12)
+    for g in graphs:
+        for v in g.get_vertices():
+            v.data["memory"] = int(1e9)
+    cloud = sc.topo.get_node("cloud1")
+    assert sc.topo.occupy_resources(
+        "cloud1", Resources(0, cloud.memory_total - int(6e9), 0)
+    )
+    scheduler = ParallelFlowScheduler(sc)
+    results = scheduler.schedule_multiple(graphs)
+    scheduler.close()
+    placed = [g for g, r in zip(graphs, results) if r.check_complete(g)]
+    assert 0 < len(placed) < len(graphs)
+    # NOTE t-sides the broker admits fit the cloud, the others fail in workers
+    assert all(
+        [
+            r.reason == "cloud resources not enough"
+            for r in results
+            if r.status == SchedulingResultStatus.FAILED
+        ]
+    )
+    assert_not_oversubscribed(sc)
+    assert sum([n.occupied for n in sc.topo.get_hosts()]) == sum(
+        [len(g) for g in placed]
+    )
@@ -0,0 +1,142 @@
+import random
+from collections import Counter
+
+from .flow_scheduler import FlowScheduler
+from .latency import IncrementalLatencyCalculator
+from .rescheduler import BackPressureRescheduler
+from .test_latency import chain_graph, load_scenario
+from .test_online import edge_hosts
+
+
+def heavy_graphs(sc, n):
+    hosts = edge_hosts(sc)
+    graphs = [chain_graph("g" + str(i), random.choice(hosts)) for i in range(n)]
+    for g in graphs:
+        for _, _, d in g.get_edges():
+            d["unit_size"] *= 100
+    return graphs
+
+
+def assert_consistent(sc, calculator):
+    occupied = Counter()
+    for sg in calculator.graph_list:
+        for v in sg.graph.get_vertices():
+            occupied[sg.result.get_scheduled_node(v.uuid)] += 1
+    assert {n.uuid: n.occupied for n in sc.topo.get_hosts() if n.occupied > 0} == dict(
+        occupied
+    )
+
+
+def test_migrate_round_trip():
+    random.seed(1)
+    sc = load_scenario()
+    scheduler = FlowScheduler(sc, "auto")
+    graphs = heavy_graphs(sc, 8)
+    results = scheduler.schedule_multiple(graphs)
+    calculator = IncrementalLatencyCalculator(sc.topo)
+    for g, r in zip(graphs, results):
+        calculator.add_scheduled_graph(g, r)
+
+    g, r = graphs[1], results[1]
+    vids = set([v.uuid for v in g.get_operators()])
+    origin = r.get_scheduled_node(list(vids)[0])
+    calculator.remove_scheduled_graph(g.uuid)
+    moved = scheduler.migrate(g, r, vids, "rasp1")
+    assert moved.check_complete(g)
+    assert all([moved.get_scheduled_node(vid).startswith("rasp") for vid in vids])
+    calculator.add_scheduled_graph(g, moved)
+    assert_consistent(sc, calculator)
+
+    calculator.remove_scheduled_graph(g.uuid)
+    back = scheduler.migrate(g, moved, vids, origin)
+    calculator.add_scheduled_graph(g, back)
+    assert back.get_scheduled_node(list(vids)[0]) == origin
+    assert_consistent(sc, calculator)
+
+
+def test_back_pressure_rescheduler():
+    random.seed(1)
+    sc = load_scenario()
+    scheduler = FlowScheduler(sc)
+    graphs = heavy_graphs(sc, 8)
+    results = scheduler.schedule_multiple(graphs)
+    calculator = IncrementalLatencyCalculator(sc.topo)
+    for g, r in zip(graphs, results):
+        calculator.add_scheduled_graph(g, r)
+    assert len(calculator.compute_edge_back_pressure()) > 0
+
+    stats = BackPressureRescheduler(scheduler, calculator).run()
+    assert stats.migrations > 0
+    assert stats.final_bp < stats.initial_bp
+    assert_consistent(sc, calculator)
+    for g in graphs:
+        assert calculator.graph_map[g.uuid].result.check_complete(g)
+
+    for g in graphs:
+        sg = calculator.graph_map[g.uuid]
+        calculator.remove_scheduled_graph(g.uuid)
+        scheduler.delete_graph(sg.graph, sg.result)
+    assert sum([n.occupied for n in sc.topo.get_nodes()]) == 0
+    assert sum([d["occupied"] for _, _, d in sc.topo.g.edges(data=True)]) == 0
+
+
+def fill(hosts):
+    """occupy all free resources of the hosts, as other placements would"""
+    taken = [(n, n.free_resources()) for n in hosts]
+    for n, free in taken:
+        assert n.occupy_resources(free)
+    return taken
+
+
+def release(taken):
+    for n, free in taken:
+        n.release_resources(free)
+
+
+def test_failed_migration_keeps_graph():
+    random.seed(1)
+    sc = load_scenario()
+    scheduler = FlowScheduler(sc)
+    graphs = heavy_graphs(sc, 8)
+    results = scheduler.schedule_multiple(graphs)
+    calculator = IncrementalLatencyCalculator(sc.topo)
+    for g, r in zip(graphs, results):
+        calculator.add_scheduled_graph(g, r)
+    rescheduler = BackPressureRescheduler(scheduler, calculator)
+    cloud_nodes = [n for d in sc.get_cloud_domains() for n in d.topo.get_hosts()]
+    edge_nodes = [n for d in sc.get_edge_domains() for n in d.topo.get_hosts()]
+    cloud = scheduler.get_provisioner(sc.get_cloud_domains()[0].name)
+    schedule_near = cloud.schedule_near
+
+    def moves(g, r):
+        cloud_ids = set([n.uuid for n in cloud_nodes])
+        vids = [v.uuid for v in g.get_operators()]
+        return {"rasp1": set([v for v in vids if r.get_scheduled_node(v) in cloud_ids])}
+
+    # NOTE the target is full, and so is the origin while vertices are restored
+    def transient_full_near(graph, hostname):
+        taken = fill(cloud_nodes)
+        result = schedule_near(graph, hostname)
+        release(taken)
+        return result
+
+    edge_taken = fill(edge_nodes)
+    cloud.schedule_near = transient_full_near
+    g, r = graphs[1], results[1]
+    assert len(moves(g, r)["rasp1"]) > 0
+    assert rescheduler.migrate(g.uuid, moves(g, r)) == []
+    assert calculator.graph_map[g.uuid].result is r
+    release(edge_taken)
+    assert_consistent(sc, calculator)
+
+    # NOTE the freed slots of the origin are taken for good, the graph is dropped
+    cloud_taken = []
+    cloud.schedule_near = lambda graph, hostname: (
+        cloud_taken.extend(fill(cloud_nodes)) or schedule_near(graph, hostname)
+    )
+    edge_taken = fill(edge_nodes)
+    g, r = graphs[3], results[3]
+    assert rescheduler.migrate(g.uuid, moves(g, r)) == []
+    assert g.uuid not in calculator.graph_map
+    release(edge_taken + cloud_taken)
+    assert_consistent(sc, calculator)
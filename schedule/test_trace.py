@@ -0,0 +1,73 @@
+import json
+import os
+import random
+import tempfile
+
+from .flow_scheduler import FlowScheduler
+from .test_latency import chain_graph, load_scenario
+from .trace import (
+    NULL_SPAN,
+    NULL_TRACER,
+    ChromeTraceSink,
+    JsonLinesSink,
+    MemorySink,
+    Tracer,
+)
+
+
+def test_flow_scheduler_phases():
+    assert NULL_TRACER.span("x") is NULL_SPAN
+    random.seed(0)
+    sc = load_scenario()
+    scheduler = FlowScheduler(sc)
+    sink = MemorySink()
+    scheduler.set_tracer(Tracer(sink))
+    # NOTE more vertices than edge slots, so that the knapsack runs
+    graphs = [chain_graph("g" + str(i), "rasp" + str(i % 3 + 1)) for i in range(14)]
+    results = scheduler.schedule_multiple(graphs)
+    assert all([r.check_complete(g) for g, r in zip(graphs, results)])
+
+    durations = sink.durations()
+    for name in [
+        "FlowScheduler.schedule_multiple",
+        "group_domains",
+        "if_source_fit",
+        "cut",
+        "knapsack",
+        "edge_provision",
+        "cloud_provision",
+        "merge",
+        "TopologicalProvisioner.schedule_multiple",
+    ]:
+        assert name in durations
+    outermost = [s for s in sink.spans if s.depth == 0]
+    assert [s.name for s in outermost] == ["FlowScheduler.schedule_multiple"]
+    assert sum([durations[n] for n in ["cut", "merge"]]) <= outermost[0].duration
+    parents = set(
+        [s.parent for s in sink.spans if s.name.startswith("TopologicalProvisioner")]
+    )
+    assert parents == set(["edge_provision", "cloud_provision"])
+    for counter in ["cut_rounds", "dp_cells", "provisioner_rounds", "sub_graph_copies"]:
+        assert sink.totals[counter] > 0
+
+
+def test_file_sinks():
+    with tempfile.TemporaryDirectory() as path:
+        json_path = os.path.join(path, "trace.jsonl")
+        chrome_path = os.path.join(path, "trace.json")
+        for sink in [JsonLinesSink(json_path), ChromeTraceSink(chrome_path)]:
+            random.seed(0)
+            sc = load_scenario()
+            scheduler = FlowScheduler(sc)
+            tracer = Tracer(sink)
+            scheduler.set_tracer(tracer)
+            scheduler.schedule_multiple([chain_graph("g", "rasp1")])
+            tracer.close()
+
+        with open(json_path, "r") as f:
+            lines = [json.loads(line) for line in f]
+        assert lines[-1]["type"] == "counters" and lines[-1]["cut_rounds"] > 0
+        assert lines[-2]["name"] == "FlowScheduler.schedule_multiple"
+        with open(chrome_path, "r") as f:
+            events = json.load(f)["traceEvents"]
+        assert set([e["ph"] for e in events]) == set(["X", "C"])
@@ -0,0 +1,187 @@
+import functools
+import json
+import os
+import threading
+import time
+import typing
+from collections import defaultdict
+
+
+class SpanRecord(typing.NamedTuple):
+    name: str
+    start: float  # perf_counter seconds
+    duration: float
+    depth: int  # 0 for outermost spans
+    parent: typing.Optional[str]
+
+
+class Sink:
+    """receives closed spans, and the counter totals whenever an outermost span
+    closes"""
+
+    def span(self, record: SpanRecord) -> None:
+        pass
+
+    def counters(self, at: float, counters: typing.Dict[str, int]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySink(Sink):
+    spans: typing.List[SpanRecord]
+    totals: typing.Dict[str, int]
+
+    def __init__(self) -> None:
+        self.spans = []
+        self.totals = {}
+
+    def span(self, record: SpanRecord) -> None:
+        self.spans.append(record)
+
+    def counters(self, at: float, counters: typing.Dict[str, int]) -> None:
+        self.totals = dict(counters)
+
+    def durations(self) -> typing.Dict[str, float]:
+        """total seconds spent in spans of every name"""
+        durations: typing.Dict[str, float] = defaultdict(float)
+        for record in self.spans:
+            durations[record.name] += record.duration
+        return dict(durations)
+
+
+class JsonLinesSink(Sink):
+    """one json object per span or counter snapshot, appended to path"""
+
+    def __init__(self, path: str) -> None:
+        self.f = open(path, "a")
+
+    def span(self, record: SpanRecord) -> None:
+        self.f.write(json.dumps(dict(type="span", **record._asdict())) + "\n")
+
+    def counters(self, at: float, counters: typing.Dict[str, int]) -> None:
+        self.f.write(json.dumps(dict(type="counters", at=at, **counters)) + "\n")
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class ChromeTraceSink(Sink):
+    """trace event format, for chrome://tracing or Perfetto. written on close"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.events: typing.List[typing.Dict] = []
+
+    def span(self, record: SpanRecord) -> None:
+        self.events.append(
+            {
+                "name": record.name,
+                "ph": "X",
+                "ts": record.start * 1e6,
+                "dur": record.duration * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+            }
+        )
+
+    def counters(self, at: float, counters: typing.Dict[str, int]) -> None:
+        self.events.append(
+            {
+                "name": "counters",
+                "ph": "C",
+                "ts": at * 1e6,
+                "pid": os.getpid(),
+                "args": dict(counters),
+            }
+        )
+
+    def close(self) -> None:
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+class Span:
+    __slots__ = ["tracer", "name", "start"]
+
+    def __init__(self, tracer: "Tracer", name: str) -> None:
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self) -> "Span":
+        self.tracer.stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter()
+        tracer = self.tracer
+        tracer.stack.pop()
+        depth = len(tracer.stack)
+        tracer.sink.span(
+            SpanRecord(
+                self.name,
+                self.start,
+                end - self.start,
+                depth,
+                tracer.stack[-1] if depth > 0 else None,
+            )
+        )
+        if depth == 0:
+            tracer.sink.counters(end, tracer.counters)
+
+
+class NullSpan:
+    __slots__ = []
+
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """nested timing spans & counters reported to a sink. without a sink every
+    call returns at once, span() hands out a shared no-op context"""
+
+    counters: typing.Dict[str, int]
+
+    def __init__(self, sink: Sink = None) -> None:
+        self.sink = sink
+        self.enabled = sink is not None
+        self.stack: typing.List[str] = []
+        self.counters = defaultdict(int)
+
+    def span(self, name: str) -> typing.Union[Span, NullSpan]:
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] += n
+
+    def close(self) -> None:
+        if self.enabled:
+            self.sink.close()
+
+
+NULL_TRACER = Tracer()
+
+
+def traced(method):
+    """time a method of an object with a tracer, as <class>.<method>"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self.tracer.enabled:
+            return method(self, *args, **kwargs)
+        with self.tracer.span(type(self).__name__ + "." + method.__name__):
+            return method(self, *args, **kwargs)
+
+    return wrapper
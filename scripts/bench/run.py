@@ -0,0 +1,61 @@
+"""time the scheduler hot paths, run from this directory.
+
+timings are machine-specific, so no baseline is committed. save one on the
+machine to compare on, before the change under test:
+
+    python run.py --out baseline.json
+
+then compare a later run with it, exiting non-zero on regressions:
+
+    python run.py --baseline baseline.json
+"""
+import sys
+
+sys.path.insert(0, "../..")
+
+import argparse
+import logging
+
+from bench import SIZES, compare, gen_cases, load_timings, run_suite, save_timings
+
+
+def run():
+    parser = argparse.ArgumentParser(description="benchmark scheduler hot paths")
+    parser.add_argument("--size", choices=list(SIZES.keys()), default="default")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="run cases whose key contains")
+    parser.add_argument("--out", default="bench.json", help="timings json")
+    parser.add_argument("--baseline", default=None, help="timings json to compare")
+    parser.add_argument("--time-threshold", type=float, default=0.25)
+    parser.add_argument("--memory-threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    cases = [c for c in gen_cases(args.size) if args.filter in c.key]
+    timings = run_suite(
+        cases,
+        args.repeat,
+        lambda t: print(
+            "{:<72} {:>10.4f}s {:>10.1f}KB".format(
+                t.key, t.median, t.peak_memory / 1024
+            )
+        ),
+    )
+    save_timings(timings, args.out)
+    if args.baseline is None:
+        return
+    regressions = compare(
+        timings, load_timings(args.baseline), args.time_threshold, args.memory_threshold
+    )
+    for r in regressions:
+        print(
+            "REGRESSION {} {}: {:.4g} -> {:.4g} ({:.2f}x)".format(
+                r.key, r.metric, r.baseline, r.current, r.ratio
+            )
+        )
+    if len(regressions) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
@@ -1,16 +1,14 @@
-import logging
 import subprocess
 import typing
 from collections import defaultdict
 
-import coloredlogs
 from graph import ExecutionGraph
 from topo import Scenario
+from utils import get_logger
 
 from flow_cut import SourcedGraph, extract_edge_domain
 
-logger = logging.getLogger(__name__)
-coloredlogs.install(level="debug", logger=logger)
+logger = get_logger(__name__)
 
 
 def best_cut(
@@ -31,7 +29,7 @@ def best_cut(
     for domain_name, sg_list in edge_domain_map.items():
         edge_domain = scenario.find_domain(domain_name)
         assert edge_domain is not None
-        free_slots = sum([n.slots - n.occupied for n in edge_domain.topo.get_nodes()])
+        free_slots = edge_domain.free_slots()
 
         with open("glpk/data", "w") as f:
             index_op_map = gen_data_file(f, sg_list, free_slots)
@@ -1,17 +1,14 @@
-import logging
 import os
 import sys
 import typing
 from collections import defaultdict
 
-import coloredlogs
 from algo import min_cut, min_cut2
 from graph import ExecutionGraph
 from topo import Domain, Scenario
-from utils import gen_uuid, grouped_exactly_one_binpack
+from utils import gen_uuid, get_logger, grouped_exactly_one_binpack
 
-logger = logging.getLogger(__name__)
-coloredlogs.install(level="debug", logger=logger)
+logger = get_logger(__name__)
 
 
 class SourcedGraph(typing.NamedTuple):
@@ -50,7 +47,7 @@ def flow_cut(
             logger.error("no option provided")
             continue
 
-        free_slots = sum([n.slots - n.occupied for n in edge_domain.topo.get_nodes()])
+        free_slots = edge_domain.free_slots()
         if (
             sum(
                 [
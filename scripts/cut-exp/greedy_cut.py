@@ -1,16 +1,14 @@
-import logging
 import typing
 from collections import defaultdict
 
-import coloredlogs
 import networkx as nx
 from graph import ExecutionGraph
 from topo import Scenario
+from utils import get_logger
 
 from flow_cut import SourcedGraph, extract_edge_domain
 
-logger = logging.getLogger(__name__)
-coloredlogs.install(level="debug", logger=logger)
+logger = get_logger(__name__)
 
 
 def greedy_cut(
@@ -46,9 +44,9 @@ def greedy_cut(
             for v in sg.g.get_sinks() + sg.g.get_sources():
                 big_g.remove_node(v.uuid)
 
-        free_slots = sum(
-            [n.slots - n.occupied for n in edge_domain.topo.get_nodes()]
-        ) - sum([len(sg.g.get_sources()) for sg in sg_list])
+        free_slots = edge_domain.free_slots() - sum(
+            [len(sg.g.get_sources()) for sg in sg_list]
+        )
         while free_slots > 0:
             free_slots -= 1
 
@@ -105,9 +103,9 @@ def greedy_cut2(
             for v in sg.g.get_sinks():
                 big_g.remove_node(v.uuid)
 
-        free_slots = sum(
-            [n.slots - n.occupied for n in edge_domain.topo.get_nodes()]
-        ) - sum([len(sg.g.get_sources()) for sg in sg_list])
+        free_slots = edge_domain.free_slots() - sum(
+            [len(sg.g.get_sources()) for sg in sg_list]
+        )
         while free_slots > 0:
             free_slots -= 1
 
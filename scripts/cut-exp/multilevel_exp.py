@@ -0,0 +1,47 @@
+import sys
+
+sys.path.insert(0, "../..")
+
+import argparse
+import random
+import types
+
+import graph
+from algo import compare_cuts
+
+
+def gen_graphs(args: argparse.Namespace):
+    gen_args = {
+        "total_rank": args.total_rank,
+        "max_node_per_rank": args.max_node_per_rank,
+        "max_predecessors": 3,
+        "mi_cb": lambda: 1,
+        "memory_cb": lambda: int(1e8),
+        "unit_size_cb": lambda r: random.randint(100, 10000),
+        "unit_rate_cb": lambda: random.randint(1, 10),
+        "source_hosts": types.SimpleNamespace(select=lambda: "rasp1"),
+        "sink_hosts": ["cloud1"],
+    }
+    return [
+        graph.GraphGenerator("g" + str(i), **gen_args).gen_dag_graph()
+        for i in range(args.graphs)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="cut bd & runtime of multilevel_cut against min_cut2"
+    )
+    parser.add_argument("--graphs", type=int, default=5)
+    parser.add_argument("--total-rank", type=int, default=50)
+    parser.add_argument("--max-node-per-rank", type=int, default=20)
+    parser.add_argument("--coarsest", type=int, default=64)
+    # NOTE min_cut2 takes minutes on a few hundred vertices
+    parser.add_argument("--baseline-limit", type=int, default=300)
+    args = parser.parse_args()
+
+    print("uuid,vertices,min_cut_flow,min_cut_time,multilevel_flow,multilevel_time")
+    for report in compare_cuts(
+        gen_graphs(args), args.baseline_limit, coarsest=args.coarsest
+    ):
+        print(",".join([str(i) for i in report]))
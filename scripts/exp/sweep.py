@@ -0,0 +1,32 @@
+import sys
+
+sys.path.insert(0, "../..")
+
+import argparse
+import logging
+
+from experiment import SweepSpec, run_sweep
+
+
+def run():
+    parser = argparse.ArgumentParser(description="run a scheduling sweep")
+    parser.add_argument("spec", help="sweep yaml, see sweep.yaml")
+    parser.add_argument("out", help="result directory, resumed if it exists")
+    parser.add_argument("-p", "--processes", type=int, default=None)
+    parser.add_argument("--npz", default=None, help="also save columns as npz")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    spec = SweepSpec.load(args.spec)
+    store = run_sweep(
+        spec,
+        args.out,
+        args.processes,
+        lambda key, done, total: print("[{}/{}] {}".format(done, total, key)),
+    )
+    if args.npz is not None:
+        store.save_npz(args.npz)
+
+
+if __name__ == "__main__":
+    run()
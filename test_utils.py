@@ -0,0 +1,58 @@
+import logging
+import random
+
+from utils import (
+    LOG_LEVEL,
+    LOGGER_ROOT,
+    DisjointSet,
+    FullBinpackTable,
+    configure_logging,
+    get_logger,
+    grouped_exactly_one_full_binpack,
+)
+
+
+def random_group(size: int):
+    return [(v_count, random.randint(0, 100)) for v_count in range(size + 1)]
+
+
+def test_binpack_table_matches_full_binpack():
+    random.seed(0)
+    groups = [random_group(random.randint(1, 6)) for _ in range(8)]
+    table = FullBinpackTable()
+    n_slot = 20
+    while n_slot > 3:
+        assert table.solve(n_slot, groups) == grouped_exactly_one_full_binpack(
+            n_slot, groups
+        )
+        # NOTE replace the last group, only it should be recomputed
+        computed = table.computed_groups
+        groups = groups[:-1] + [random_group(random.randint(1, 6))]
+        n_slot -= 3
+        assert table.solve(n_slot, groups) == grouped_exactly_one_full_binpack(
+            n_slot, groups
+        )
+        assert table.computed_groups == computed + 1
+
+
+def test_loggers_share_one_handler():
+    loggers = [get_logger("Node[{}]".format(i)) for i in range(100)]
+    root = logging.getLogger(LOGGER_ROOT)
+    assert len(root.handlers) == 1
+    assert all([len(logger.handlers) == 0 for logger in loggers])
+    assert all([logger.parent is root for logger in loggers])
+
+    configure_logging("info")
+    assert not loggers[0].isEnabledFor(logging.DEBUG)
+    assert len(root.handlers) == 1
+    configure_logging(LOG_LEVEL)
+    assert loggers[0].isEnabledFor(logging.DEBUG)
+
+
+def test_disjoint_set_joins_roots():
+    # NOTE 3 is linked to 0 first, then joined with 1 through 2
+    d_set = DisjointSet(4)
+    d_set.union(0, 3)
+    d_set.union(1, 2)
+    d_set.union(2, 3)
+    assert d_set.unique_roots() == {0}
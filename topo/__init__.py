@@ -1,7 +1,9 @@
+from .capacity import CapacityTracker
 from .domain import Domain
 from .host import Host
 from .node import Node
+from .resource import Resources
 from .router import Router
 from .scenario import Scenario
 from .switch import Switch
-from .topology import Link, Topology
+from .topology import Link, ResourceState, Topology
@@ -0,0 +1,43 @@
+import typing
+
+from .node import Node
+
+
+class CapacityTracker:
+    """free slots aggregated along router -> switch -> host, updated by Node and
+    Topology on occupy & release, so free slots of any subtree are O(1)"""
+
+    parent: typing.Dict[str, typing.Optional[str]]
+    free: typing.Dict[str, int]
+
+    def __init__(self) -> None:
+        self.parent = {}
+        self.free = {}
+
+    def add_node(self, node: Node, parent: typing.Optional[str]) -> None:
+        assert parent is None or parent in self.parent
+        self.parent[node.uuid] = parent
+        self.free[node.uuid] = 0
+        node.data["capacity"] = self
+        self.update(node.uuid, node.slots - node.occupied)
+
+    def update(self, nid: str, diff: int) -> None:
+        if diff == 0:
+            return
+        while nid is not None:
+            self.free[nid] += diff
+            nid = self.parent[nid]
+
+    def free_slots(self, nid: str) -> int:
+        return self.free[nid]
+
+    @classmethod
+    def from_domains(cls, domains: typing.List):
+        tracker = cls()
+        for d in domains:
+            tracker.add_node(d.router.node, None)
+            for hrg in d.hrgs:
+                tracker.add_node(hrg.switch.node, d.router.node.uuid)
+                for host in hrg.hosts:
+                    tracker.add_node(host.node, hrg.switch.node.uuid)
+        return tracker
@@ -23,6 +23,7 @@ class Domain:
         self.hrgs = hrgs
         self.topo = Topology()
         self.link_topo()
+        self.capacity = None
         self.host_lookup_table = {}
         for hrg in self.hrgs:
             for host in hrg.hosts:
@@ -38,6 +39,11 @@ class Domain:
     def find_host(self, hostname: str) -> typing.Optional[Host]:
         return self.host_lookup_table.get(hostname, None)
 
+    def free_slots(self) -> int:
+        if self.capacity is not None:
+            return self.capacity.free_slots(self.router.node.uuid)
+        return sum([n.slots - n.occupied for n in self.topo.get_nodes()])
+
     def replace_graph(self, g: nx.Graph):
         self.topo.replace_graph(g.subgraph([n.uuid for n in self.topo.get_nodes()]))
         self.router.replace_node(self.topo.get_node(self.router.node.uuid))
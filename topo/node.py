@@ -1,9 +1,21 @@
-import threading
 import typing
 
+from .resource import Resources
+
 SLOT_MEMORY_SIZE = int(5e8)
 
 
+def cpu_share(cores: int, capacity: Resources, used: Resources) -> float:
+    """fraction of its mips a vertex on a host computes at. vertices placed
+    with their resource vector share the cpu in proportion to their demand,
+    slowed down only if oversubscribed, others share the cores per slot"""
+    if used.cpu > 0:
+        return min(capacity.cpu / used.cpu, 1)
+    if used.slots > 0:
+        return min(cores / used.slots, 1)
+    return 1
+
+
 class Node:
     uuid: str
 
@@ -37,9 +49,11 @@ class Node:
             "memory_total": memory_total,
             "memory_assigned": memory_assigned,
             "memory_used": memory_used,
-            "memory_lock": threading.Lock(),
+            "cpu_total": mips * cores,
+            "cpu_assigned": 0.0,
             "labels": labels,
             "occupied": 0,
+            "capacity": None,
         }
         return cls(uuid, data)
 
@@ -76,25 +90,79 @@ class Node:
         return self.data["memory_used"]
 
     @property
-    def memory_lock(self) -> threading.Lock:
-        return self.data["memory_lock"]
+    def cpu_total(self) -> int:
+        """million instructions per second over all cores"""
+        return self.data["cpu_total"]
+
+    @property
+    def cpu_assigned(self) -> float:
+        return self.data["cpu_assigned"]
 
     @property
     def labels(self) -> typing.Dict[str, str]:
         return self.data["labels"]
 
+    @property
+    def capacity(self):
+        """CapacityTracker aggregating this node, None if untracked"""
+        return self.data.get("capacity")
+
     @property
     def occupied(self) -> int:
-        self.data["memory_lock"].acquire()
-        occupied = self.data["occupied"]
-        self.data["memory_lock"].release()
-        return occupied
+        return self.data["occupied"]
 
     def occupy(self, n: int) -> bool:
         succeed = False
-        self.data["memory_lock"].acquire()
         if self.data["slots"] - self.data["occupied"] >= n:
             succeed = True
             self.data["occupied"] += n
-        self.data["memory_lock"].release()
+            if self.capacity is not None:
+                self.capacity.update(self.uuid, -n)
+        return succeed
+
+    def release(self, n: int) -> None:
+        released = min(self.data["occupied"], n)
+        self.data["occupied"] -= released
+        if self.capacity is not None:
+            self.capacity.update(self.uuid, released)
+
+    def total_resources(self) -> Resources:
+        return Resources(self.slots, self.memory_total, self.cpu_total)
+
+    def cpu_share(self) -> float:
+        total = self.total_resources()
+        return cpu_share(self.cores, total, total.sub(self.free_resources()))
+
+    def free_resources(self) -> Resources:
+        return Resources(
+            self.data["slots"] - self.data["occupied"],
+            self.data["memory_total"] - self.data["memory_assigned"],
+            self.data["cpu_total"] - self.data["cpu_assigned"],
+        )
+
+    def occupy_resources(self, demand: Resources) -> bool:
+        """occupy slots, memory & cpu at once, nothing is taken if any does not fit"""
+        succeed = False
+        free = Resources(
+            self.data["slots"] - self.data["occupied"],
+            self.data["memory_total"] - self.data["memory_assigned"],
+            self.data["cpu_total"] - self.data["cpu_assigned"],
+        )
+        if free.fits(demand):
+            succeed = True
+            self.data["occupied"] += demand.slots
+            self.data["memory_assigned"] += demand.memory
+            self.data["cpu_assigned"] += demand.cpu
+            if self.capacity is not None:
+                self.capacity.update(self.uuid, -demand.slots)
         return succeed
+
+    def release_resources(self, demand: Resources) -> None:
+        released = min(self.data["occupied"], demand.slots)
+        self.data["occupied"] -= released
+        self.data["memory_assigned"] = max(
+            self.data["memory_assigned"] - demand.memory, 0
+        )
+        self.data["cpu_assigned"] = max(self.data["cpu_assigned"] - demand.cpu, 0.0)
+        if self.capacity is not None:
+            self.capacity.update(self.uuid, released)
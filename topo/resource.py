@@ -0,0 +1,53 @@
+import typing
+
+EPS = 1e-9
+
+
+class Resources(typing.NamedTuple):
+    """resource vector of a host (capacity, free) or of a vertex (demand)"""
+
+    slots: int
+    memory: int  # bytes
+    cpu: float  # million instructions per second
+
+    @classmethod
+    def zero(cls):
+        return cls(0, 0, 0.0)
+
+    @classmethod
+    def of_vertex(cls, v):
+        """demand of a vertex: one slot, its memory and mi at its tuple rate"""
+        return cls(1, v.memory, v.cpu)
+
+    def add(self, other):
+        return Resources(
+            self.slots + other.slots,
+            self.memory + other.memory,
+            self.cpu + other.cpu,
+        )
+
+    def sub(self, other):
+        return Resources(
+            self.slots - other.slots,
+            self.memory - other.memory,
+            self.cpu - other.cpu,
+        )
+
+    def fits(self, demand) -> bool:
+        """if the demand fits into this (free) vector"""
+        return (
+            demand.slots <= self.slots
+            and demand.memory <= self.memory
+            and demand.cpu <= self.cpu + EPS
+        )
+
+    def normalize(self, capacity) -> typing.Tuple[float, float, float]:
+        """fractions of the capacity, dimensions without capacity are 0"""
+        return tuple([a / c if c > 0 else 0.0 for a, c in zip(self, capacity)])
+
+    @classmethod
+    def total(cls, vectors: typing.Iterable):
+        acc = cls.zero()
+        for v in vectors:
+            acc = acc.add(v)
+        return acc
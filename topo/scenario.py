@@ -1,17 +1,40 @@
 import typing
 import uuid
 
+from topo.capacity import CapacityTracker
 from topo.domain import Domain
 from topo.topology import Topology
 
 
+class InterdomainLink(typing.NamedTuple):
+    from_domain: str
+    to_domain: str
+    bd: int
+    delay: int
+
+
 class Scenario:
-    def __init__(self, domains: typing.List[Domain], bd: int, delay: int) -> None:
+    # NOTE domain types from the data sources up
+    TIERS = ["edge", "fog", "cloud"]
+
+    def __init__(
+        self,
+        domains: typing.List[Domain],
+        bd: int,
+        delay: int,
+        links: typing.List[InterdomainLink] = None,
+    ) -> None:
         self.domains = domains
         self.bd = bd
         self.delay = delay
+        # NOTE routers are fully meshed with bd & delay unless links are given
+        self.links = links
         self.topo = Topology()
         self.link_topo()
+        # NOTE built after link_topo, so that it hooks the shared node data
+        self.capacity = CapacityTracker.from_domains(self.domains)
+        for d in self.domains:
+            d.capacity = self.capacity
         self.domain_lookup_table = {}
         for d in self.domains:
             self.domain_lookup_table[d.name] = d
@@ -20,25 +43,56 @@ class Scenario:
         for d in self.domains:
             self.topo.add_nodes_from(d.topo.get_nodes())
             self.topo.add_links_from(d.topo.get_links())
-        length = len(self.domains)
-        for i in range(length):
-            for j in range(i + 1, length):
+        routers = {d.name: d.router.node for d in self.domains}
+        if self.links is not None:
+            for link in self.links:
                 self.topo.connect(
-                    self.domains[i].router.node,
-                    self.domains[j].router.node,
+                    routers[link.from_domain],
+                    routers[link.to_domain],
                     str(uuid.uuid4())[:8],
-                    self.bd,
-                    self.delay,
+                    link.bd,
+                    link.delay,
                 )
+        else:
+            length = len(self.domains)
+            for i in range(length):
+                for j in range(i + 1, length):
+                    self.topo.connect(
+                        self.domains[i].router.node,
+                        self.domains[j].router.node,
+                        str(uuid.uuid4())[:8],
+                        self.bd,
+                        self.delay,
+                    )
         for d in self.domains:
             d.replace_graph(self.topo.g)
 
     def get_edge_domains(self) -> typing.List[Domain]:
         return [d for d in self.domains if d.type == "edge"]
 
+    def get_fog_domains(self) -> typing.List[Domain]:
+        return [d for d in self.domains if d.type == "fog"]
+
     def get_cloud_domains(self) -> typing.List[Domain]:
         return [d for d in self.domains if d.type == "cloud"]
 
+    def get_tiers(self) -> typing.List[str]:
+        """domain types present in the scenario, from the edge up"""
+        types = set([d.type for d in self.domains])
+        return [t for t in self.TIERS if t in types]
+
+    def nearest_domain(self, domain: Domain, type: str) -> typing.Optional[Domain]:
+        """domain of the given type closest to domain by router-to-router delay"""
+        candidates = [d for d in self.domains if d.type == type]
+        if len(candidates) == 0:
+            return None
+        return min(
+            candidates,
+            key=lambda d: self.topo.get_n2n_intrinsic_latency(
+                domain.router.node.uuid, d.router.node.uuid
+            ),
+        )
+
     def find_domain(self, domain_name: str) -> typing.Optional[Domain]:
         return self.domain_lookup_table.get(domain_name, None)
 
@@ -46,9 +100,22 @@ class Scenario:
     def from_dict(cls, data):
         domains = []
         for d in data["domains"]:
+            assert d["type"] in cls.TIERS
             domains.append(Domain.from_dict(d))
+        links = None
+        if data["interdomain"].get("links") is not None:
+            links = [
+                InterdomainLink(
+                    link["from"],
+                    link["to"],
+                    int(link["bd"] * 1e6),
+                    int(link["delay"]),
+                )
+                for link in data["interdomain"]["links"]
+            ]
         return cls(
             domains,
             int(data["interdomain"]["bd"] * 1e6),
             int(data["interdomain"]["delay"]),
+            links,
         )
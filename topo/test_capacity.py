@@ -0,0 +1,41 @@
+import os
+
+import yaml
+from yaml.loader import Loader
+
+from topo.scenario import Scenario
+
+
+def test_capacity_tracker():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../samples")
+    with open(os.path.join(path, "1e12h.yaml"), "r") as f:
+        sc = Scenario.from_dict(yaml.load(f.read(), Loader=Loader))
+
+    def brute_force(nodes):
+        return sum([n.slots - n.occupied for n in nodes])
+
+    def check():
+        for d in sc.domains:
+            assert d.free_slots() == brute_force(d.topo.get_nodes())
+            for hrg in d.hrgs:
+                assert sc.capacity.free_slots(hrg.switch.node.uuid) == brute_force(
+                    [hrg.switch.node] + [h.node for h in hrg.hosts]
+                )
+
+    check()
+    d = sc.domains[0]
+    host = d.hrgs[0].hosts[0]
+    assert host.node.occupy(2)
+    check()
+    assert sc.topo.occupy_node(d.hrgs[-1].hosts[-1].node.uuid, 1)
+    check()
+    # NOTE failed occupation and over-release leave aggregates untouched
+    assert not host.node.occupy(host.node.slots)
+    host.node.release(5)
+    check()
+    sc.topo.release_node(d.hrgs[-1].hosts[-1].node.uuid, 1)
+    check()
+    assert d.topo.occupy_node(host.node.uuid, 1)
+    d.topo.clear_occupied()
+    check()
+    assert d.free_slots() == brute_force(d.topo.get_nodes()) > 0
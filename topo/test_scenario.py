@@ -1,8 +1,10 @@
 import os
+import pickle
 
 import yaml
 from yaml.loader import Loader
 
+from topo.resource import Resources
 from topo.scenario import Scenario
 
 
@@ -14,3 +16,31 @@ def test_create_scenario_from_yaml():
         data = yaml.load(f.read(), Loader=Loader)
         sc = Scenario.from_dict(data)
         print(sc.topo.get_nodes())
+
+
+def test_pickle_scenario_and_state():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../samples")
+    with open(os.path.join(path, "1e12h.yaml"), "r") as f:
+        sc = Scenario.from_dict(yaml.load(f.read(), Loader=Loader))
+    domain = sc.get_edge_domains()[0]
+    host = domain.hrgs[0].hosts[0].node
+    assert host.occupy_resources(Resources(2, int(1e9), 1000))
+    sc.topo.occupy_link(host.uuid, domain.router.node.uuid, 100)
+    state = sc.topo.get_state()
+
+    copied = pickle.loads(pickle.dumps(sc))
+    copied_domain = copied.find_domain(domain.name)
+    # NOTE node data stays shared by the scenario, domain & host views
+    copied_host = copied_domain.find_host(host.uuid).node
+    assert copied_host.data is copied.topo.g.nodes[host.uuid]
+    assert copied_host.data is copied_domain.topo.g.nodes[host.uuid]
+    assert copied_host.free_resources() == host.free_resources()
+    assert copied_domain.free_slots() == domain.free_slots()
+
+    copied.topo.clear_occupied()
+    assert copied_domain.free_slots() == domain.free_slots() + 2
+    copied.topo.set_state(state)
+    assert copied_host.free_resources() == host.free_resources()
+    assert copied_domain.free_slots() == domain.free_slots()
+    assert (copied.topo.get_state().link_usage == state.link_usage).all()
+    assert (copied.topo.get_state().node_usage == state.node_usage).all()
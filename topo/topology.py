@@ -1,12 +1,13 @@
 import logging
-import threading
 import typing
 from typing import NamedTuple
 from utils import get_logger
 
 import networkx as nx
+import numpy as np
 
 from .node import Node
+from .resource import EPS, Resources
 
 LOCAL_BANDWIDTH = int(1e8)
 
@@ -17,6 +18,17 @@ class Link(NamedTuple):
     delay: int
 
 
+class ResourceState(NamedTuple):
+    """mutable part of a topology, the rest never changes once built. rows of
+    node_usage are occupied slots, assigned memory & cpu of nodes, link_usage
+    the occupied bd of links, both in the order of nodes & links"""
+
+    nodes: typing.List[str]
+    node_usage: np.ndarray
+    links: typing.List[typing.Tuple[str, str]]
+    link_usage: np.ndarray
+
+
 class Topology:
     g: nx.Graph
     logger: logging.Logger
@@ -24,6 +36,7 @@ class Topology:
     def __init__(self) -> None:
         self.g = nx.Graph()
         self.logger = get_logger(self.__class__.__name__)
+        self.oversubscribed: typing.Set[str] = set()
 
     def replace_graph(self, g: nx.Graph) -> None:
         self.g = g
@@ -38,9 +51,11 @@ class Topology:
             memory_total=n.memory_total,
             memory_assigned=n.memory_assigned,
             memory_used=n.memory_used,
-            memory_lock=n.memory_lock,
+            cpu_total=n.cpu_total,
+            cpu_assigned=n.cpu_assigned,
             labels=n.labels,
             occupied=n.occupied,
+            capacity=n.capacity,
         )
 
     def add_nodes_from(self, nodes: typing.Iterable[Node]) -> None:
@@ -136,21 +151,41 @@ class Topology:
         assume all tasks are executed in single thread
         """
         node = self.g.nodes[nid]
-        return int(
-            mi / (min(node["cores"] / node["occupied"], 1) * node["mips"]) * 1000
-        )
+        share = Node.from_networkx(nid, node).cpu_share()
+        if node["cpu_assigned"] > 0 and share < 1 and nid not in self.oversubscribed:
+            self.oversubscribed.add(nid)
+            self.logger.warning(
+                "cpu of %s oversubscribed: %.0f / %d MIPS",
+                nid,
+                node["cpu_assigned"],
+                node["cpu_total"],
+            )
+        return int(mi / (share * node["mips"]) * 1000)
 
     def occupy_node(self, nid: str, slot_required: int = 1) -> bool:
         succeed = True
         n = self.g.nodes[nid]
-        n["memory_lock"].acquire()
         if n["occupied"] + slot_required <= n["slots"]:
             n["occupied"] += slot_required
+            if n.get("capacity") is not None:
+                n["capacity"].update(nid, -slot_required)
         else:
             succeed = False
-        n["memory_lock"].release()
         return succeed
 
+    def occupy_resources(self, nid: str, demand: Resources) -> bool:
+        return Node.from_networkx(nid, self.g.nodes[nid]).occupy_resources(demand)
+
+    def release_resources(self, nid: str, demand: Resources) -> None:
+        Node.from_networkx(nid, self.g.nodes[nid]).release_resources(demand)
+
+    def release_node(self, nid: str, slot_released: int = 1) -> None:
+        n = self.g.nodes[nid]
+        released = min(n["occupied"], slot_released)
+        n["occupied"] -= released
+        if n.get("capacity") is not None:
+            n["capacity"].update(nid, released)
+
     def occupy_link(self, n1: str, n2: str, bd: int):
         """NOTE: shortest path is used"""
         if n1 == n2:
@@ -161,21 +196,100 @@ class Topology:
             self.g.edges[(path[i], path[i + 1])]["occupied"] += bd
             i += 1
 
+    def release_link(self, n1: str, n2: str, bd: int):
+        """NOTE: shortest path is used"""
+        if n1 == n2:
+            return
+        path = nx.shortest_path(self.g, n1, n2)
+        i = 0
+        while i < len(path) - 1:
+            e = self.g.edges[(path[i], path[i + 1])]
+            e["occupied"] = max(e["occupied"] - bd, 0)
+            i += 1
+
+    def get_n2n_links(self, n1: str, n2: str) -> typing.List[str]:
+        """return uuids of links on the path, NOTE: shortest path is used"""
+        if n1 == n2:
+            return []
+        path = nx.shortest_path(self.g, n1, n2)
+        return [
+            self.g.edges[(path[i], path[i + 1])]["uuid"] for i in range(len(path) - 1)
+        ]
+
+    def get_n2n_route(self, n1: str, n2: str) -> typing.List[Link]:
+        """NOTE: shortest path is used"""
+        if n1 == n2:
+            return []
+        path = nx.shortest_path(self.g, n1, n2)
+        return [
+            self.g.edges[(path[i], path[i + 1])]["link"] for i in range(len(path) - 1)
+        ]
+
     def clear_occupied(self):
-        for _, d in self.g.nodes(data=True):
+        for nid, d in self.g.nodes(data=True):
+            if d.get("capacity") is not None:
+                d["capacity"].update(nid, d["occupied"])
             d["occupied"] = 0
+            d["memory_assigned"] = 0
+            d["cpu_assigned"] = 0.0
         for _, _, d in self.g.edges(data=True):
             d["occupied"] = 0
 
+    def get_state(self, nids: typing.Iterable[str] = None) -> ResourceState:
+        """state of the given nodes (all by default) and of links between them"""
+        nodes = list(nids) if nids is not None else list(self.g.nodes())
+        node_set = set(nodes)
+        links = [(u, v) for u, v in self.g.edges() if u in node_set and v in node_set]
+        return ResourceState(
+            nodes,
+            np.array(
+                [
+                    [
+                        self.g.nodes[nid]["occupied"],
+                        self.g.nodes[nid]["memory_assigned"],
+                        self.g.nodes[nid]["cpu_assigned"],
+                    ]
+                    for nid in nodes
+                ],
+                dtype=np.float64,
+            ).reshape((-1, 3)),
+            links,
+            np.array([self.g.edges[e]["occupied"] for e in links], dtype=np.float64),
+        )
+
+    def set_state(self, state: ResourceState) -> None:
+        """overwrite the state of the nodes & links in state, keeping capacity
+        trackers in sync"""
+        for nid, (occupied, memory, cpu) in zip(state.nodes, state.node_usage):
+            n = self.g.nodes[nid]
+            diff = n["occupied"] - int(occupied)
+            n["occupied"] = int(occupied)
+            n["memory_assigned"] = int(memory)
+            n["cpu_assigned"] = float(cpu)
+            if n.get("capacity") is not None:
+                n["capacity"].update(nid, diff)
+        for e, occupied in zip(state.links, state.link_usage):
+            self.g.edges[e]["occupied"] = int(occupied)
+
     def memory_filter(self, memory_required: int, nid: str) -> bool:
         valid = False
         n = self.g.nodes[nid]
-        n["memory_lock"].acquire()
         if n["memory_total"] - n["memory_assigned"] >= memory_required:
             valid = True
-        n["memory_lock"].release()
         return valid
 
+    def cpu_filter(self, cpu_required: float, nid: str) -> bool:
+        n = self.g.nodes[nid]
+        return n["cpu_total"] - n["cpu_assigned"] + EPS >= cpu_required
+
+    def resource_filter(self, demand: Resources, nid: str) -> bool:
+        """slots, memory & cpu"""
+        return (
+            self.slot_filter(demand.slots, nid)
+            and self.memory_filter(demand.memory, nid)
+            and self.cpu_filter(demand.cpu, nid)
+        )
+
     def label_filter(self, required_labels: typing.Dict[str, str], nid: str) -> bool:
         valid = True
         n = self.g.nodes[nid]
@@ -187,8 +301,6 @@ class Topology:
     def slot_filter(self, slot_required: int, nid: str) -> bool:
         valid = False
         n = self.g.nodes[nid]
-        n["memory_lock"].acquire()
         if n["occupied"] + slot_required <= n["slots"]:
             valid = True
-        n["memory_lock"].release()
         return valid
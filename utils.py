@@ -3,10 +3,11 @@ import typing
 import uuid
 from typing import NamedTuple
 
-import coloredlogs
 import numpy as np
 
 LOG_LEVEL = "debug"
+# NOTE parent of all loggers of the simulator, the only one with a handler
+LOGGER_ROOT = "simulator"
 MAX = int(1e18)
 
 
@@ -21,10 +22,32 @@ def gen_uuid():
     return str(uuid.uuid4())[:8]
 
 
-def get_logger(name: str):
-    logger = logging.getLogger(name)
-    coloredlogs.install(level=LOG_LEVEL, logger=logger)
-    return logger
+def configure_logging(level: str = None) -> logging.Logger:
+    """install the handler shared by all loggers of the simulator, colored if
+    coloredlogs is available, once. level -- change the level of all of them"""
+    root = logging.getLogger(LOGGER_ROOT)
+    if not root.handlers:
+        try:
+            import coloredlogs
+
+            coloredlogs.install(level=level or LOG_LEVEL, logger=root)
+        except ImportError:
+            handler = logging.StreamHandler()
+            handler.setFormatter(
+                logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
+            )
+            root.addHandler(handler)
+            level = level or LOG_LEVEL
+    if level is not None:
+        root.setLevel(level.upper())
+    return root
+
+
+def get_logger(name: str) -> logging.Logger:
+    """child of the shared simulator logger, cheap enough to call per object"""
+    if not logging.getLogger(LOGGER_ROOT).handlers:
+        configure_logging()
+    return logging.getLogger(LOGGER_ROOT + "." + name)
 
 
 def avg(*args):
@@ -39,11 +62,14 @@ class DisjointSet:
         self.roots = [i for i in range(size)]
 
     def union(self, a: int, b: int) -> None:
+        # NOTE link the roots, relinking b alone would split its set
+        a = self.find(a)
+        b = self.find(b)
         if a > b:
             tmp = a
             a = b
             b = tmp
-        self.roots[b] = self.find(a)
+        self.roots[b] = a
 
     def find(self, a: int) -> int:
         if self.roots[a] == a:
@@ -57,6 +83,44 @@ class DisjointSet:
         return set(self.roots)
 
 
+def binpack_group_step(
+    dp: np.ndarray,
+    selected: np.ndarray,
+    choices: np.ndarray,
+    gid: int,
+    group: typing.List[typing.Tuple[int, int]],
+    n_slot: int,
+) -> None:
+    """update dp & selected in place with group gid, record choices for the group"""
+    for capacity in range(n_slot, -1, -1):
+        for eid, ele in enumerate(group):
+            volume, value = ele
+            if capacity < volume:
+                continue
+            # NOTE only when previous groups are selected
+            # NOTE if selected[capacity] not be overwrited at this round, it cannot be used at next round
+            if selected[capacity - volume] == gid and (
+                dp[capacity - volume] + value < dp[capacity]
+                or selected[capacity] <= gid
+            ):
+                dp[capacity] = dp[capacity - volume] + value
+                selected[capacity] = gid + 1
+                choices[capacity] = eid
+
+
+def binpack_backtrace(
+    backtrace: int,
+    groups: typing.List[typing.List[typing.Tuple[int, int]]],
+    choices: typing.List[np.ndarray],
+) -> typing.List[int]:
+    solution: typing.List[int] = [None for _ in range(len(groups))]
+    for gid in range(len(groups) - 1, -1, -1):
+        assert choices[gid][backtrace] >= 0
+        solution[gid] = choices[gid][backtrace]
+        backtrace -= groups[gid][solution[gid]][0]
+    return solution
+
+
 def grouped_exactly_one_nonfull_binpack(
     n_slot: int, groups: typing.List[typing.List[typing.Tuple[int, int]]]
 ) -> typing.List[int]:
@@ -70,28 +134,10 @@ def grouped_exactly_one_nonfull_binpack(
     choices = np.full((len(groups), n_slot + 1), -1, dtype=np.int32)
     dp[0] = 0
     for gid, group in enumerate(groups):
-        for capacity in range(n_slot, -1, -1):
-            for eid, ele in enumerate(group):
-                volume, value = ele
-                if capacity < volume:
-                    continue
-                # NOTE only when previous groups are selected
-                # NOTE if selected[capacity] not be overwrited at this round, it cannot be used at next round
-                if selected[capacity - volume] == gid and (
-                    dp[capacity - volume] + value < dp[capacity]
-                    or selected[capacity] <= gid
-                ):
-                    dp[capacity] = dp[capacity - volume] + value
-                    selected[capacity] = gid + 1
-                    choices[gid, capacity] = eid
+        binpack_group_step(dp, selected, choices[gid], gid, group, n_slot)
     valid_idx = np.where(selected == len(groups))[0]
     backtrace = valid_idx[np.argmin(dp[valid_idx])]
-    solution: typing.List[int] = [None for _ in range(len(groups))]
-    for gid in range(len(groups) - 1, -1, -1):
-        assert choices[gid, backtrace] >= 0
-        solution[gid] = choices[gid, backtrace]
-        backtrace -= groups[gid][solution[gid]][0]
-    return solution
+    return binpack_backtrace(backtrace, groups, choices)
 
 
 def grouped_exactly_one_full_binpack(
@@ -107,27 +153,58 @@ def grouped_exactly_one_full_binpack(
     choices = np.full((len(groups), n_slot + 1), -1, dtype=np.int32)
     dp[0] = 0
     for gid, group in enumerate(groups):
-        for capacity in range(n_slot, -1, -1):
-            for eid, ele in enumerate(group):
-                volume, value = ele
-                if capacity < volume:
-                    continue
-                # NOTE only when previous groups are selected
-                # NOTE if selected[capacity] not be overwrited at this round, it cannot be used at next round
-                if selected[capacity - volume] == gid and (
-                    dp[capacity - volume] + value < dp[capacity]
-                    or selected[capacity] <= gid
-                ):
-                    dp[capacity] = dp[capacity - volume] + value
-                    selected[capacity] = gid + 1
-                    choices[gid, capacity] = eid
+        binpack_group_step(dp, selected, choices[gid], gid, group, n_slot)
     # valid_idx = np.where(selected == len(groups))[0]
     assert selected[n_slot] == len(groups)
-    backtrace = n_slot
     # backtrace = valid_idx[-1]
-    solution: typing.List[int] = [None for _ in range(len(groups))]
-    for gid in range(len(groups) - 1, -1, -1):
-        assert choices[gid, backtrace] >= 0
-        solution[gid] = choices[gid, backtrace]
-        backtrace -= groups[gid][solution[gid]][0]
-    return solution
+    return binpack_backtrace(n_slot, groups, choices)
+
+
+class FullBinpackTable:
+    """grouped_exactly_one_full_binpack keeping the dp state after every group.
+    dp[c] only depends on capacities <= c, so a later call sharing a prefix of
+    groups (compared by identity) with a capacity not larger than the previous
+    one only recomputes the groups after the shared prefix"""
+
+    def __init__(self) -> None:
+        self.n_slot = -1
+        self.groups: typing.List[typing.List[typing.Tuple[int, int]]] = []
+        self.dp_rows: typing.List[np.ndarray] = []
+        self.selected_rows: typing.List[np.ndarray] = []
+        self.choices_rows: typing.List[np.ndarray] = []
+        self.computed_groups = 0
+
+    def solve(
+        self, n_slot: int, groups: typing.List[typing.List[typing.Tuple[int, int]]]
+    ) -> typing.List[int]:
+        shared = 0
+        if n_slot <= self.n_slot:
+            while (
+                shared < min(len(groups), len(self.groups))
+                and groups[shared] is self.groups[shared]
+            ):
+                shared += 1
+        self.groups = list(groups)
+        self.n_slot = n_slot
+        self.dp_rows = [r[: n_slot + 1] for r in self.dp_rows[:shared]]
+        self.selected_rows = [r[: n_slot + 1] for r in self.selected_rows[:shared]]
+        self.choices_rows = [r[: n_slot + 1] for r in self.choices_rows[:shared]]
+
+        if shared == 0:
+            dp = np.full((n_slot + 1,), MAX, dtype=np.int64)
+            selected = np.full((n_slot + 1,), -1, dtype=np.int32)
+            selected[0] = 0
+            dp[0] = 0
+        else:
+            dp = self.dp_rows[-1].copy()
+            selected = self.selected_rows[-1].copy()
+        for gid in range(shared, len(groups)):
+            choices = np.full((n_slot + 1,), -1, dtype=np.int32)
+            binpack_group_step(dp, selected, choices, gid, groups[gid], n_slot)
+            self.dp_rows.append(dp.copy())
+            self.selected_rows.append(selected.copy())
+            self.choices_rows.append(choices)
+            self.computed_groups += 1
+
+        assert selected[n_slot] == len(groups)
+        return binpack_backtrace(n_slot, groups, self.choices_rows)
@@ -1,22 +1,17 @@
 from collections import defaultdict, namedtuple
-import logging
 import math
 import random
 import typing
 
-import coloredlogs
 import graph
 from topo import Node, Topology
-from tqdm import trange
+from utils import get_logger
 
 from vivaldi.coordinate import Coordinate
 
 STEP_WEIGHT = 0.05
 STEP_SCALE = 0.05
 
-logger = logging.getLogger(__name__)
-coloredlogs.install(level="DEBUG", logger=logger)
-
 
 def get_latency_matrix(
     topo: Topology, nids: typing.List[str]
@@ -50,6 +45,7 @@ def vivaldi_compute(
 ) -> typing.Dict[str, Coordinate]:
     if len(coords) == 0:
         return coords
+    logger = get_logger(__name__)
 
     lat_matrix = get_latency_matrix(topo, list(coords.keys()))
     err = matrix_error(lat_matrix, coords) / len(coords)
@@ -59,8 +55,7 @@ def vivaldi_compute(
     keys = list(coords.keys())
     it = 0
 
-    t_range = trange(max_iteration, disable=True)
-    for _ in t_range:
+    for _ in range(max_iteration):
         if err <= max_tolerance:
             break
         for i in range(len(keys)):
@@ -81,7 +76,8 @@ def vivaldi_compute(
             coords[ki] += force * (STEP_WEIGHT + STEP_SCALE * random.random())
         # logger.debug({k: str(v) for k, v in coords.items()})
         err = matrix_error(lat_matrix, coords)
-        t_range.set_description("error: {:.3f}".format(err))
+        it += 1
+    logger.debug("error: %.3f after %d iterations", err, it)
 
     return coords
 
@@ -100,6 +96,7 @@ def constrained_balance(
 ) -> typing.Dict[str, Coordinate]:
     if len(coords) == 0:
         return coords
+    logger = get_logger(__name__)
 
     max_bd = 0
     for _, _, e in graph.get_edges():
@@ -125,9 +122,9 @@ def constrained_balance(
 
     coords = {k: v for k, v in coords.items()}
     keys = list(coords.keys())
+    it = force_sum = 0
 
-    t_range = trange(max_iteration, disable=True)
-    for _ in t_range:
+    for _ in range(max_iteration):
         vote_to_hault = 0
         force_sum = 0
         for k in keys:
@@ -151,6 +148,7 @@ def constrained_balance(
                 force_sum += abs(force)
         if vote_to_hault == len(keys):
             break
-        t_range.set_description("avg force: {:.3f}".format(force_sum))
+        it += 1
+    logger.debug("avg force: %.3f after %d iterations", force_sum, it)
 
     return coords